@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from datetime import datetime
+
+import asyncpg
+
+import alerts
+import collector_logging
+import db_writer
+import metrics
+import outliers
+import sensor_collector_host as sensor
+import weather_collector as weather
+from light_sensor import LightSampler
+
+logger = logging.getLogger("async_collector")
+
+# Runs the Sense HAT loop, the WeatherAPI poller and one database writer as
+# tasks on a single event loop, in one container with one small connection
+# pool. Reading, parsing and logging are the collectors' own functions; the
+# blocking Sense HAT and HTTP calls run in worker threads so neither task
+# holds up the other.
+
+# Database configuration
+DB_HOST = os.environ.get("DB_HOST", "postgres")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+DB_NAME = os.environ.get("DB_NAME", "sensordata")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+
+# Port for the Prometheus-style /metrics endpoint (0 disables it)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9103"))
+
+# Which producers to run; the weather task needs WEATHER_API_KEY, the sensor task the Sense HAT
+ENABLE_SENSOR = os.environ.get("ENABLE_SENSOR", "1") == "1"
+ENABLE_WEATHER = os.environ.get("ENABLE_WEATHER", "1") == "1"
+SENSOR_INTERVAL = float(os.environ.get("SENSOR_INTERVAL", "30"))
+WEATHER_INTERVAL = float(os.environ.get("WEATHER_INTERVAL", "300"))
+
+# Rows buffered between the producers and the writer. When the database is
+# down the writer keeps retrying the batch it holds, the queue fills, and the
+# producers wait for room instead of readings being dropped.
+WRITE_QUEUE_SIZE = int(os.environ.get("WRITE_QUEUE_SIZE", "1000"))
+# Most rows taken off the queue for one write
+WRITE_BATCH_SIZE = 100
+# Connections in the pool: the writer needs one, the second covers a reconnect
+DB_POOL_SIZE = 2
+# Upper bound of the doubling delay between write retries
+RETRY_DELAY_MAX = 60.0
+# Seconds to keep writing queued rows after SIGTERM
+SHUTDOWN_DRAIN_SECONDS = 10.0
+
+TABLE_COLUMNS = {
+    "sensor_readings": sensor.SENSOR_COLUMNS,
+    "weather_api_data": weather.WEATHER_COLUMNS,
+}
+
+# Errors that mean the database is unreachable rather than that the rows are bad
+RETRYABLE_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+)
+
+# Runtime metrics; the insert metrics are shared with the standalone collectors
+TASK_SECONDS = metrics.histogram(
+    "async_collector_task_seconds", "Time spent per producer iteration, excluding the sleep", ["task"])
+WRITE_QUEUE_DEPTH = metrics.gauge(
+    "async_collector_write_queue_depth", "Rows waiting for the database writer")
+WRITE_QUEUE_WAIT_SECONDS = metrics.histogram(
+    "async_collector_write_queue_wait_seconds", "Time producers waited for room in the write queue")
+WRITE_BATCH_ROWS = metrics.histogram(
+    "async_collector_write_batch_rows", "Rows per database write", buckets=(1, 2, 5, 10, 25, 50, 100))
+
+
+# Parameterized INSERT for a table, in the column order of its row builder
+def insert_statement(table):
+    columns = TABLE_COLUMNS[table]
+    placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+# Create or migrate both tables once at startup with the collectors' own DDL
+def ensure_tables():
+    # Only needed here, for the collectors' DDL helpers
+    import psycopg2
+
+    conn = psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD
+    )
+    try:
+        sensor.ensure_table_exists(conn)
+        weather.ensure_table_exists(conn)
+    finally:
+        conn.close()
+
+
+# Open the shared pool, waiting for the database like the collectors do
+async def connect(stopping):
+    while not stopping.is_set():
+        logger.info("Attempting to connect to database...")
+        try:
+            await asyncio.to_thread(ensure_tables)
+            return await asyncpg.create_pool(
+                host=DB_HOST,
+                port=int(DB_PORT),
+                database=DB_NAME,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                min_size=1,
+                max_size=DB_POOL_SIZE,
+                server_settings={
+                    "application_name": "async_collector",
+                    "synchronous_commit": db_writer.SYNCHRONOUS_COMMIT,
+                },
+            )
+        except (*db_writer.connection_errors(), *RETRYABLE_ERRORS) as e:
+            logger.warning("Database not available yet (%s), waiting 5 seconds...", e)
+            await sleep_unless_stopped(stopping, 5)
+    return None
+
+
+# Sleep for `seconds`, returning early once shutdown has been requested
+async def sleep_unless_stopped(stopping, seconds):
+    try:
+        await asyncio.wait_for(stopping.wait(), timeout=max(seconds, 0))
+    except asyncio.TimeoutError:
+        pass
+
+
+# Queue a row for the writer, waiting while the queue is full
+async def enqueue(writes, table, row):
+    started = time.perf_counter()
+    await writes.put((table, row))
+    WRITE_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started)
+    WRITE_QUEUE_DEPTH.set(writes.qsize())
+
+
+# Evaluate alert rules on a row, using the table's column names
+def observe(alert_engine, table, row):
+    if alert_engine is None:
+        return
+    reading = dict(zip(TABLE_COLUMNS[table], row))
+    quality = reading.pop("quality", None)
+    alert_engine.observe(table, reading.pop("timestamp"), outliers.clear_flagged(reading, quality))
+
+
+# Sense HAT producer: one reading every SENSOR_INTERVAL seconds
+async def sensor_task(writes, alert_engine, summary, stopping):
+    from sense_hat import SenseHat
+    sensor.sense = await asyncio.to_thread(SenseHat)
+    light_sampler = LightSampler(sensor.sense, sensor.LIGHT_SAMPLE_INTERVAL, sensor.sense_lock)
+    light_sampler.start()
+    ring = sensor.open_ring_buffer()
+    quality_filter = sensor.open_quality_filter()
+    try:
+        while not stopping.is_set():
+            started = time.perf_counter()
+            now = datetime.now()
+            try:
+                temperature, humidity, pressure = await asyncio.to_thread(sensor.read_sensors)
+            except Exception as e:
+                logger.error("Sensor read error: %s", e)
+                summary.count("read_failures")
+            else:
+                cpu_temperature = sensor.read_cpu_temperature()
+                light_sampler.trigger()
+                light = light_sampler.latest(max_age=light_sampler.max_age(SENSOR_INTERVAL))
+                summary.count("readings")
+                logger.info(
+                    "reading",
+                    extra={"rate_limit": "sensor", "source": "sensor_readings", "timestamp": now,
+                           "temperature": temperature, "humidity": humidity, "pressure": pressure,
+                           "cpu_temperature": cpu_temperature}
+                )
+                quality = sensor.check_quality(quality_filter, temperature, humidity, pressure, now)
+                if quality:
+                    summary.count("outliers")
+                row = sensor.sensor_row(temperature, humidity, pressure, now, light, cpu_temperature, quality)
+                if sensor.keep_reading(quality):
+                    if ring is not None:
+                        ring.append(now, row[1:])
+                    await enqueue(writes, "sensor_readings", row)
+                observe(alert_engine, "sensor_readings", row)
+            elapsed = time.perf_counter() - started
+            TASK_SECONDS.labels(task="sensor").observe(elapsed)
+            await sleep_unless_stopped(stopping, SENSOR_INTERVAL - elapsed)
+    finally:
+        light_sampler.stop()
+
+
+# WeatherAPI producer: one poll every WEATHER_INTERVAL seconds
+async def weather_task(writes, alert_engine, summary, stopping):
+    while not stopping.is_set():
+        started = time.perf_counter()
+        data = await asyncio.to_thread(weather.fetch_weather_data)
+        if data:
+            try:
+                row = weather.weather_row(data)
+            except (KeyError, TypeError) as e:
+                logger.error("Unexpected weather API response: %s", e)
+                summary.count("fetch_failures")
+            else:
+                summary.count("polls")
+                logger.info(
+                    "reading",
+                    extra={"rate_limit": "weather", "source": "weather_api_data",
+                           "temperature": row[1], "humidity": row[2], "pressure": row[3],
+                           "condition": row[4], "aqi": row[8]}
+                )
+                await enqueue(writes, "weather_api_data", row)
+                observe(alert_engine, "weather_api_data", row)
+        else:
+            logger.warning("Failed to fetch weather data")
+            summary.count("fetch_failures")
+        elapsed = time.perf_counter() - started
+        TASK_SECONDS.labels(task="weather").observe(elapsed)
+        await sleep_unless_stopped(stopping, WEATHER_INTERVAL - elapsed)
+
+
+# Insert one table's rows in a single transaction. Connection errors are
+# retried with backoff, holding the rows (and so, once the queue is full,
+# the producers); rows the database rejects are logged and dropped.
+async def write_rows(pool, table, rows, summary):
+    statement = insert_statement(table)
+    delay = 1.0
+    while True:
+        try:
+            with sensor.DB_INSERT_SECONDS.labels(table=table).time():
+                async with pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.executemany(statement, rows)
+            WRITE_BATCH_ROWS.observe(len(rows))
+            return
+        except RETRYABLE_ERRORS as e:
+            sensor.DB_INSERT_FAILURES.labels(table=table).inc()
+            sensor.DB_RECONNECTS.inc()
+            summary.count("insert_failures")
+            logger.error("Data insertion error (retrying in %.0fs): %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_DELAY_MAX)
+        except Exception as e:
+            sensor.DB_INSERT_FAILURES.labels(table=table).inc()
+            summary.count("insert_failures")
+            logger.error("Dropping %d %s rows the database rejected: %s", len(rows), table, e)
+            return
+
+
+# Database writer: takes whatever is queued (up to WRITE_BATCH_SIZE rows),
+# groups it by table and writes it. Stops at the None sent on shutdown.
+async def writer_task(pool, writes, summary, imports_seconds):
+    startup_pending = True
+    while True:
+        item = await writes.get()
+        batch = {}
+        done = item is None
+        while item is not None:
+            table, row = item
+            batch.setdefault(table, []).append(row)
+            if sum(len(rows) for rows in batch.values()) >= WRITE_BATCH_SIZE or writes.empty():
+                break
+            item = writes.get_nowait()
+            done = item is None
+        WRITE_QUEUE_DEPTH.set(writes.qsize())
+        for table, rows in batch.items():
+            await write_rows(pool, table, rows, summary)
+        if batch and startup_pending:
+            startup_pending = False
+            collector_logging.report_startup(logger, imports_seconds, sensor.STARTUP_SECONDS)
+        if done:
+            return
+
+
+async def run(summary, imports_seconds):
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    pool = await connect(stopping)
+    if pool is None:
+        return
+    logger.info("Connected to database successfully")
+
+    alert_engine = alerts.engine_from_env()
+    writes = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+    writer = asyncio.create_task(writer_task(pool, writes, summary, imports_seconds), name="writer")
+    producers = []
+    if ENABLE_SENSOR:
+        producers.append(asyncio.create_task(sensor_task(writes, alert_engine, summary, stopping), name="sensor"))
+    if ENABLE_WEATHER:
+        producers.append(asyncio.create_task(weather_task(writes, alert_engine, summary, stopping), name="weather"))
+    logger.info("Running tasks: %s", ", ".join(task.get_name() for task in producers) or "none")
+
+    try:
+        # Producers return once stopping is set; one that fails (e.g. no Sense
+        # HAT attached) is logged and the others keep running
+        for task in asyncio.as_completed(producers):
+            try:
+                await task
+            except Exception as e:
+                logger.error("Collector task failed: %s", e)
+    finally:
+        stopping.set()
+        # Let the writer flush what was already read, then close the pool
+        try:
+            await asyncio.wait_for(writes.put(None), timeout=SHUTDOWN_DRAIN_SECONDS)
+            await asyncio.wait_for(writer, timeout=SHUTDOWN_DRAIN_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Stopped with %d rows still queued", writes.qsize())
+            writer.cancel()
+        await pool.close()
+
+
+def main():
+    imports_seconds = collector_logging.process_uptime()
+    _, summary = collector_logging.setup_logging("async_collector")
+    logger.info("Starting async data collection...")
+    metrics.start_metrics_server(METRICS_PORT)
+    asyncio.run(run(summary, imports_seconds))
+    logger.info("Data collection stopped")
+
+
+if __name__ == "__main__":
+    main()
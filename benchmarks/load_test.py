@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+from websockets.sync.client import connect
+
+# Importing run_benchmarks puts the services' modules on sys.path
+from run_benchmarks import REPO_ROOT, get_db_connection, parse_size, report_metadata, seed
+
+from streamlit.proto.BackMsg_pb2 import BackMsg  # noqa: E402
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+
+# Simulates concurrent dashboard viewers against a real `streamlit run`
+# server. Each session is one websocket connection speaking the browser's
+# protocol: it asks for a rerun every refresh interval (what the
+# dashboard's auto-refresh does in an open tab), now and then with a
+# different time range and data source, and times each rerun until the
+# server reports the script finished.
+
+APP_DIR = REPO_ROOT / "dashboard"
+TIME_RANGES = ["Last hour", "Last 24 hours", "Last 7 days"]
+DATA_SOURCES = ["Sense HAT Only", "Weather API Only", "Both (Comparison)"]
+TIME_RANGE_LABEL = "Select Time Range"
+DATA_SOURCE_LABEL = "Data Source"
+
+# Seconds to wait for the server to start and for a single rerun
+STARTUP_TIMEOUT = 60
+RERUN_TIMEOUT = 300
+# ScriptFinishedStatus.FINISHED_WITH_COMPILE_ERROR
+COMPILE_ERROR = 1
+
+
+# Latency percentile of sorted samples (nearest rank)
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+# Resident and peak memory of a process in MB, from /proc
+def memory_mb(pid):
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "VmHWM"):
+                values[name] = int(value.split()[0]) / 1024
+    return values.get("VmRSS"), values.get("VmHWM")
+
+
+# Transactions committed or rolled back and rows returned by the database so
+# far, from pg_stat_database. Every dashboard query runs in its own
+# transaction, so the transaction rate is the query rate.
+def database_counters(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT xact_commit + xact_rollback, tup_returned FROM pg_stat_database WHERE datname = current_database()"
+    )
+    transactions, rows = cursor.fetchone()
+    cursor.close()
+    conn.rollback()
+    return transactions, rows
+
+
+# Start the dashboard on `port` with this process's database settings and
+# wait until it answers its health check
+def start_server(port, cache_ttl):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [
+        str(REPO_ROOT / "common"), os.environ.get("PYTHONPATH")
+    ])))
+    if cache_ttl is not None:
+        env["DASHBOARD_CACHE_TTL"] = str(cache_ttl)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py", "--server.port", str(port),
+         "--server.address", "127.0.0.1", "--server.headless", "true"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.5)
+    server.kill()
+    raise RuntimeError(f"dashboard did not start on port {port}")
+
+
+# Request one rerun with the given {widget id: value} states and read the
+# messages until the script finishes. Returns (seconds, {label: widget id}
+# of the selectboxes and radios drawn, error message or None).
+def rerun(websocket, states):
+    message = BackMsg()
+    message.rerun_script.query_string = ""
+    for widget_id, value in states.items():
+        widget = message.rerun_script.widget_states.widgets.add()
+        widget.id = widget_id
+        widget.string_value = value
+
+    started = time.perf_counter()
+    websocket.send(message.SerializeToString())
+    widgets = {}
+    error = None
+    while True:
+        reply = ForwardMsg()
+        reply.ParseFromString(websocket.recv(timeout=RERUN_TIMEOUT))
+        kind = reply.WhichOneof("type")
+        if kind == "delta" and reply.delta.WhichOneof("type") == "new_element":
+            element = reply.delta.new_element
+            element_type = element.WhichOneof("type")
+            if element_type in ("selectbox", "radio"):
+                widget = getattr(element, element_type)
+                widgets[widget.label] = widget.id
+            elif element_type == "exception" and error is None:
+                error = element.exception.message or element.exception.type
+        elif kind == "script_finished":
+            if reply.script_finished == COMPILE_ERROR and error is None:
+                error = "script failed to compile"
+            return time.perf_counter() - started, widgets, error
+
+
+# One viewer: rerun the app every `interval` seconds until `deadline`,
+# switching time range and data source with probability `switch`
+def run_session(url, samples, errors, lock, deadline, interval, switch, rng):
+    # Open tabs do not refresh in lockstep
+    time.sleep(rng.uniform(0, interval))
+    selection = {}
+    widgets = {}
+    try:
+        with connect(url, subprotocols=["streamlit"], max_size=None) as websocket:
+            while time.monotonic() < deadline:
+                if widgets and rng.random() < switch:
+                    selection = {TIME_RANGE_LABEL: rng.choice(TIME_RANGES), DATA_SOURCE_LABEL: rng.choice(DATA_SOURCES)}
+                states = {widgets[label]: value for label, value in selection.items() if label in widgets}
+                elapsed, widgets, error = rerun(websocket, states)
+                with lock:
+                    samples.append(elapsed * 1000)
+                    if error:
+                        errors.append(error)
+                time.sleep(max(interval - elapsed, 0) * rng.uniform(0.9, 1.1))
+    except Exception as e:
+        with lock:
+            errors.append(repr(e))
+
+
+# Run `sessions` concurrent viewers for `duration` seconds and summarize
+# rerun latency, database load and server memory
+def run_level(url, server_pid, conn, sessions, duration, interval, switch, rng):
+    samples, errors, lock = [], [], threading.Lock()
+    deadline = time.monotonic() + duration
+    transactions_before, rows_before = database_counters(conn)
+    started = time.monotonic()
+    threads = [
+        threading.Thread(
+            target=run_session,
+            args=(url, samples, errors, lock, deadline, interval, switch, random.Random(rng.random())),
+            name=f"session-{i}", daemon=True,
+        )
+        for i in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    # Backends report their statistics to pg_stat_database with a short delay
+    time.sleep(1)
+    transactions_after, rows_after = database_counters(conn)
+
+    ordered = sorted(samples)
+    result = {
+        "sessions": sessions,
+        "reruns": len(ordered),
+        "reruns_per_s": round(len(ordered) / elapsed, 2),
+        "errors": len(errors),
+        "seconds": round(elapsed, 1),
+        # Less the counter query itself
+        "db_queries_per_s": round((transactions_after - transactions_before - 1) / elapsed, 2),
+        "db_rows_per_s": round((rows_after - rows_before) / elapsed, 1),
+    }
+    if ordered:
+        result.update({
+            "p50_ms": round(percentile(ordered, 0.50), 1),
+            "p95_ms": round(percentile(ordered, 0.95), 1),
+            "p99_ms": round(percentile(ordered, 0.99), 1),
+            "max_ms": round(ordered[-1], 1),
+        })
+    if server_pid is not None:
+        rss, peak = memory_mb(server_pid)
+        result.update({"rss_mb": round(rss, 1), "peak_rss_mb": round(peak, 1)})
+    if errors:
+        result["first_error"] = errors[0][:500]
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load-test the dashboard with concurrent viewer sessions and report rerun latency, "
+                    "database queries per second and server memory per session count."
+    )
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="Comma-separated concurrent session counts")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds to run each session count")
+    parser.add_argument("--interval", type=float, default=30,
+                        help="Seconds between reruns of a session (the dashboard's auto-refresh is 30)")
+    parser.add_argument("--switch", type=float, default=0.3,
+                        help="Chance a rerun picks a new time range and data source (default 0.3)")
+    parser.add_argument("--port", type=int, default=8599, help="Port for the dashboard server this starts")
+    parser.add_argument("--url", help="Test an already running dashboard instead, e.g. ws://dashboard:8501 "
+                                      "(memory is then only reported with --pid)")
+    parser.add_argument("--pid", type=int, help="Process id of the dashboard given with --url")
+    parser.add_argument("--cache-ttl", type=float,
+                        help="DASHBOARD_CACHE_TTL for the started server (0 sends every rerun to the database)")
+    parser.add_argument("--seed", type=parse_size,
+                        help="Seed this many synthetic sensor rows first (the benchmark database only)")
+    parser.add_argument("--random-seed", type=int, default=1, help="Seed for the sessions' choices")
+    parser.add_argument("--output", help="Report path (default: results/loadtest-<timestamp>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.random_seed)
+    conn = get_db_connection()
+    report = {"meta": report_metadata(conn), "config": vars(args), "results": []}
+    if args.seed:
+        print(f"Seeding {args.seed:,} sensor rows...")
+        seed(conn, args.seed)
+
+    server = None
+    if args.url:
+        url, server_pid = args.url.rstrip("/") + "/_stcore/stream", args.pid
+    else:
+        server = start_server(args.port, args.cache_ttl)
+        url, server_pid = f"ws://127.0.0.1:{args.port}/_stcore/stream", server.pid
+
+    try:
+        # One rerun first pays for the imports, so the first level is not skewed
+        with connect(url, subprotocols=["streamlit"], max_size=None) as websocket:
+            warmup, _, error = rerun(websocket, {})
+        if error:
+            print(f"Warm-up rerun failed: {error}")
+        report["meta"]["warmup_seconds"] = round(warmup, 2)
+        if server_pid is not None:
+            report["meta"]["idle_rss_mb"] = round(memory_mb(server_pid)[0], 1)
+        print(f"Warm-up rerun {warmup:.2f}s" + (
+            f", server RSS {report['meta']['idle_rss_mb']:.0f} MB" if server_pid is not None else ""
+        ))
+
+        print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'queries/s':>10} {'RSS MB':>8} {'errors':>7}")
+        for sessions in (int(count) for count in args.sessions.split(",")):
+            result = run_level(url, server_pid, conn, sessions, args.duration, args.interval, args.switch, rng)
+            report["results"].append(result)
+            print(f"{sessions:>8} {result['reruns']:>7} {result.get('p50_ms', 0):>8.0f} "
+                  f"{result.get('p95_ms', 0):>8.0f} {result.get('p99_ms', 0):>8.0f} "
+                  f"{result['db_queries_per_s']:>10.2f} {result.get('rss_mb', 0):>8.0f} {result['errors']:>7}")
+            if result["errors"]:
+                print(f"         first error: {result['first_error'][:200]}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        conn.close()
+
+    output = Path(args.output) if args.output else (
+        Path(__file__).resolve().parent / "results" / f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"\nReport written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Make the services' modules importable so the benchmarks exercise the real
+# code paths (store_sensor_data, query_sensor_data, calculate_stats, ...)
+REPO_ROOT = Path(__file__).resolve().parent.parent
+for service_dir in ("common", "sensor_collector", "dashboard", "tools"):
+    sys.path.insert(0, str(REPO_ROOT / service_dir))
+
+import psycopg2  # noqa: E402
+from psycopg2.extras import execute_values  # noqa: E402
+
+import charts  # noqa: E402
+import data  # noqa: E402
+import db_writer  # noqa: E402
+import import_readings  # noqa: E402
+import sensor_collector_host  # noqa: E402
+
+TIME_RANGES = ["Last hour", "Last 24 hours", "Last 7 days", "All data"]
+
+# Collection intervals used to lay out the synthetic history
+SENSOR_INTERVAL_SECONDS = 30
+WEATHER_INTERVAL_SECONDS = 300
+
+# Metrics compared by --compare and whether a larger value is better
+COMPARED_METRICS = {"median_ms": False, "rows_per_s": True}
+
+# Timings below this are dominated by noise and are not flagged as regressions
+NOISE_FLOOR_MS = 1.0
+
+
+# Parse sizes such as 1M, 250k or 1000000
+def parse_size(text):
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    number = text[:-1] if text[-1] in "km" else text
+    return int(float(number) * multiplier)
+
+
+def get_db_connection():
+    return psycopg2.connect(
+        host=data.DB_HOST,
+        port=data.DB_PORT,
+        database=data.DB_NAME,
+        user=data.DB_USER,
+        password=data.DB_PASSWORD
+    )
+
+
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[p95_index], 3),
+        "min_ms": round(ordered[0], 3),
+        "runs": len(ordered),
+    }
+
+
+# Call func repeatedly and return (timing summary, last result)
+def time_calls(func, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples), result
+
+
+# Apply the production schema, then lay out a synthetic history ending now.
+# Rows are generated server-side and the timestamp indexes rebuilt afterwards,
+# which keeps 100M-row seeding practical.
+def seed(conn, sensor_rows):
+    weather_rows = max(1, sensor_rows * SENSOR_INTERVAL_SECONDS // WEATHER_INTERVAL_SECONDS)
+    cursor = conn.cursor()
+    cursor.execute((REPO_ROOT / "database" / "init.sql").read_text())
+    cursor.execute("TRUNCATE sensor_readings, weather_api_data RESTART IDENTITY")
+    cursor.execute("DROP INDEX IF EXISTS idx_timestamp")
+    cursor.execute("DROP INDEX IF EXISTS idx_timestamp_weather")
+    cursor.execute(
+        """
+        INSERT INTO sensor_readings (timestamp, temperature, humidity, pressure)
+        SELECT date_trunc('second', NOW()::timestamp) - make_interval(secs => g * %s),
+               21 + 4 * sin(g / 2880.0 * 2 * pi()) + random(),
+               45 + 10 * cos(g / 2880.0 * 2 * pi()) + random(),
+               1013 + 5 * sin(g / 40000.0) + random()
+        FROM generate_series(0, %s - 1) AS g
+        """,
+        (SENSOR_INTERVAL_SECONDS, sensor_rows)
+    )
+    cursor.execute(
+        """
+        INSERT INTO weather_api_data
+        (timestamp, temperature, humidity, pressure, condition, wind_speed, wind_direction, location,
+         aqi, pm2_5, pm10, o3, no2, so2, co, us_epa_index, gb_defra_index)
+        SELECT date_trunc('second', NOW()::timestamp) - make_interval(secs => g * %s),
+               18 + 6 * sin(g / 288.0 * 2 * pi()) + random(),
+               55 + 15 * cos(g / 288.0 * 2 * pi()) + random(),
+               1012 + 5 * sin(g / 4000.0) + random(),
+               (ARRAY['Sunny', 'Partly cloudy', 'Overcast', 'Light rain'])[1 + g %% 4],
+               random() * 25,
+               (ARRAY['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW'])[1 + g %% 8],
+               'Benchmark City',
+               20 + random() * 60, 5 + random() * 20, 10 + random() * 30, 30 + random() * 60,
+               5 + random() * 30, 1 + random() * 5, 200 + random() * 400,
+               1 + g %% 3, 1 + g %% 4
+        FROM generate_series(0, %s - 1) AS g
+        """,
+        (WEATHER_INTERVAL_SECONDS, weather_rows)
+    )
+    cursor.execute("CREATE INDEX idx_timestamp ON sensor_readings(timestamp)")
+    cursor.execute("CREATE INDEX idx_timestamp_weather ON weather_api_data(timestamp)")
+    conn.commit()
+    # VACUUM cannot run inside a transaction block
+    conn.autocommit = True
+    cursor.execute("VACUUM ANALYZE sensor_readings")
+    cursor.execute("VACUUM ANALYZE weather_api_data")
+    conn.autocommit = False
+    cursor.close()
+    return weather_rows
+
+
+def synthetic_readings(count):
+    start = datetime.now() + timedelta(days=1)
+    return [
+        (start + timedelta(seconds=i), 21.0 + (i % 50) / 10, 45.0 + (i % 30) / 10, 1013.0 + (i % 20) / 10)
+        for i in range(count)
+    ]
+
+
+# Insert throughput for the three write strategies. Rows land in the future
+# and are deleted afterwards so the read benchmarks see the seeded history.
+def bench_inserts(conn, single_rows, batched_rows, copy_rows, batch_size):
+    results = {}
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM sensor_readings")
+    max_id = cursor.fetchone()[0]
+
+    # One prepared INSERT per reading through the collector's writer,
+    # exactly as the collector does
+    writer = db_writer.DbWriter(data.DB_HOST, data.DB_PORT, data.DB_NAME, data.DB_USER, data.DB_PASSWORD,
+                                "run_benchmarks")
+    writer.connect()
+    readings = synthetic_readings(single_rows)
+    started = time.perf_counter()
+    for timestamp, temperature, humidity, pressure in readings:
+        sensor_collector_host.store_sensor_data(writer, temperature, humidity, pressure, timestamp)
+    elapsed = time.perf_counter() - started
+    writer.close()
+    results["single_row"] = {"rows": single_rows, "seconds": round(elapsed, 3),
+                             "rows_per_s": round(single_rows / elapsed, 1)}
+
+    # Multi-row INSERT ... VALUES, one commit per batch
+    readings = synthetic_readings(batched_rows)
+    started = time.perf_counter()
+    for offset in range(0, batched_rows, batch_size):
+        execute_values(
+            cursor,
+            "INSERT INTO sensor_readings (timestamp, temperature, humidity, pressure) VALUES %s",
+            readings[offset:offset + batch_size],
+            page_size=batch_size
+        )
+        conn.commit()
+    elapsed = time.perf_counter() - started
+    results["batched"] = {"rows": batched_rows, "batch_size": batch_size, "seconds": round(elapsed, 3),
+                          "rows_per_s": round(batched_rows / elapsed, 1)}
+
+    # COPY FROM STDIN through the import tool's helper
+    columns = import_readings.TABLES["sensor_readings"]["columns"]
+    readings = [
+        (timestamp, "bench", temperature, humidity, pressure)
+        for timestamp, temperature, humidity, pressure in synthetic_readings(copy_rows)
+    ]
+    started = time.perf_counter()
+    import_readings.copy_chunk(cursor, "sensor_readings", columns, readings)
+    conn.commit()
+    elapsed = time.perf_counter() - started
+    results["copy"] = {"rows": copy_rows, "seconds": round(elapsed, 3),
+                       "rows_per_s": round(copy_rows / elapsed, 1)}
+
+    cursor.execute("DELETE FROM sensor_readings WHERE id > %s", (max_id,))
+    conn.commit()
+    cursor.close()
+    return results
+
+
+# Loader latency, statistics and figure build time for every time range
+def bench_reads(repeat, max_all_rows, total_rows):
+    results = {}
+    for time_range in TIME_RANGES:
+        if time_range == "All data" and total_rows > max_all_rows:
+            results[time_range] = {"skipped": f"more than {max_all_rows} rows (raise --max-all-rows)"}
+            continue
+
+        entry = {}
+        entry["load_sensor"], sensor_df = time_calls(lambda: data.query_sensor_data(time_range), repeat)
+        entry["load_sensor"]["rows"] = len(sensor_df)
+        entry["load_weather"], weather_df = time_calls(lambda: data.query_weather_data(time_range), repeat)
+        entry["load_weather"]["rows"] = len(weather_df)
+
+        entry["stats_sensor"], _ = time_calls(lambda: data.calculate_stats(sensor_df), repeat)
+        entry["stats_weather"], _ = time_calls(lambda: data.calculate_weather_stats(weather_df), repeat)
+
+        entry["figure_comparison"], _ = time_calls(
+            lambda: charts.create_comparison_chart(
+                sensor_df, weather_df, "temperature", "Temperature Comparison", "Temperature (°C)"),
+            repeat
+        )
+        entry["figure_time_series"], _ = time_calls(
+            lambda: charts.create_time_series(
+                weather_df, "wind_speed", "Wind Speed Over Time", "Wind Speed (km/h)", "#43A047"),
+            repeat
+        )
+        results[time_range] = entry
+        print(f"    {time_range}: sensor load {entry['load_sensor']['median_ms']:.1f} ms "
+              f"({entry['load_sensor']['rows']} rows)")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def report_metadata(conn):
+    cursor = conn.cursor()
+    cursor.execute("SHOW server_version")
+    server_version = cursor.fetchone()[0]
+    cursor.close()
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "postgres": server_version,
+    }
+
+
+# Flatten nested results into {"path/to/metric": value} for comparison
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif key in COMPARED_METRICS and isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+# Print metric changes against a baseline report; returns True on regression
+def compare_reports(baseline, current, threshold):
+    base = flatten(baseline["results"])
+    new = flatten(current["results"])
+    regressed = False
+    print(f"\nComparison against baseline ({baseline['meta'].get('git_revision')}):")
+    for path in sorted(set(base) & set(new)):
+        higher_is_better = COMPARED_METRICS[path.rsplit("/", 1)[-1]]
+        old_value, new_value = base[path], new[path]
+        if not old_value:
+            continue
+        change = (new_value - old_value) / old_value
+        worse = -change if higher_is_better else change
+        flag = ""
+        below_noise = not higher_is_better and max(old_value, new_value) < NOISE_FLOOR_MS
+        if worse > threshold and not below_noise:
+            flag = "  <-- REGRESSION"
+            regressed = True
+        print(f"  {path}: {old_value} -> {new_value} ({change:+.1%}){flag}")
+    return regressed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest and dashboard query paths against Postgres.")
+    parser.add_argument("--sizes", default="1M", help="Comma-separated sensor table sizes, e.g. 1M,10M,100M")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per read benchmark")
+    parser.add_argument("--single-rows", type=int, default=1000, help="Rows for the single-row insert benchmark")
+    parser.add_argument("--batched-rows", type=int, default=20000, help="Rows for the batched insert benchmark")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per batched INSERT")
+    parser.add_argument("--copy-rows", type=int, default=200000, help="Rows for the COPY benchmark")
+    parser.add_argument("--max-all-rows", type=parse_size, default=parse_size("10M"),
+                        help="Skip the 'All data' range above this many rows")
+    parser.add_argument("--output", help="Report path (default: results/report-<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown that counts as a regression (default 0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = get_db_connection()
+    report = {"meta": report_metadata(conn), "config": vars(args), "results": {}}
+
+    for size_text in args.sizes.split(","):
+        rows = parse_size(size_text)
+        label = size_text.strip()
+        print(f"Seeding {rows:,} sensor rows...")
+        started = time.perf_counter()
+        weather_rows = seed(conn, rows)
+        print(f"  seeded in {time.perf_counter() - started:.1f}s ({weather_rows:,} weather rows)")
+
+        print("  Insert throughput...")
+        inserts = bench_inserts(conn, args.single_rows, args.batched_rows, args.copy_rows, args.batch_size)
+        for name, result in inserts.items():
+            print(f"    {name}: {result['rows_per_s']:,.0f} rows/s")
+
+        print("  Read path...")
+        reads = bench_reads(args.repeat, args.max_all_rows, rows)
+        report["results"][label] = {"sensor_rows": rows, "weather_rows": weather_rows,
+                                    "insert": inserts, "read": reads}
+    conn.close()
+
+    output = Path(args.output) if args.output else (
+        Path(__file__).resolve().parent / "results" / f"report-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"\nReport written to {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare_reports(baseline, report, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
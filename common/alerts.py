@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Alerting configuration
+ALERT_RULES_FILE = os.environ.get("ALERT_RULES_FILE", "")  # JSON list of rules; built-in defaults when unset
+ALERT_FILE = os.environ.get("ALERT_FILE", "")  # append alerts as JSON lines
+ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL", "")  # POST each alert as JSON
+ALERT_WEBHOOK_TIMEOUT = float(os.environ.get("ALERT_WEBHOOK_TIMEOUT", "5"))
+# Alerts buffered between the collection loop and the notifier thread
+ALERT_QUEUE_SIZE = 1000
+
+# Used when no rules file is configured
+DEFAULT_RULES = [
+    {"name": "sensor_temperature_high", "source": "sensor_readings", "type": "threshold",
+     "field": "temperature", "op": ">", "value": 35, "for_minutes": 10},
+    # A fall of 3 hPa or more in 3 hours usually means a storm is on its way
+    {"name": "pressure_falling", "source": "sensor_readings", "type": "rate",
+     "field": "pressure", "change": -3, "window_minutes": 180},
+    {"name": "air_quality_unhealthy", "source": "weather_api_data", "type": "threshold",
+     "field": "us_epa_index", "op": ">=", "value": 4, "for_minutes": 0},
+]
+
+OPERATORS = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+# Seconds between readings of each source (as in coverage.py); a threshold
+# restarts its hold after a gap of more than MAX_GAP_INTERVALS of them
+READING_INTERVALS = {"sensor_readings": 30, "weather_api_data": 300}
+MAX_GAP_INTERVALS = 3
+
+ALERTS_TOTAL = metrics.counter(
+    "alerts_total", "Alert state changes", ["rule", "state"])
+ALERTS_DROPPED = metrics.counter(
+    "alert_notifications_dropped_total", "Alerts dropped because the notifier queue was full")
+ALERT_SINK_FAILURES = metrics.counter(
+    "alert_sink_failures_total", "Alerts a sink failed to deliver", ["sink"])
+
+
+# Fires when a field has satisfied `op value` continuously for for_minutes.
+# State is the time the condition started holding and the time of the last
+# reading: a gap longer than max_gap_minutes (by default MAX_GAP_INTERVALS
+# reading intervals of the source) restarts the hold, so breaches on either
+# side of a collector outage do not count as one sustained breach.
+class ThresholdRule:
+    def __init__(self, name, source, field, op, value, for_minutes=0, max_gap_minutes=None):
+        if op not in OPERATORS:
+            raise ValueError(f"rule {name}: unknown operator {op!r}")
+        self.name = name
+        self.source = source
+        self.field = field
+        self.op = op
+        self.value = value
+        self.duration = for_minutes * 60
+        if max_gap_minutes is None:
+            self.max_gap = READING_INTERVALS.get(source, 300) * MAX_GAP_INTERVALS
+        else:
+            self.max_gap = max_gap_minutes * 60
+        self._since = None
+        self._last = None
+
+    def evaluate(self, ts, value):
+        if self._last is not None and ts - self._last > self.max_gap:
+            self._since = None
+        self._last = ts
+        if not OPERATORS[self.op](value, self.value):
+            self._since = None
+            return False, f"{self.field} {value} no longer {self.op} {self.value}"
+        if self._since is None:
+            self._since = ts
+        held = ts - self._since
+        return held >= self.duration, f"{self.field} {value} {self.op} {self.value} for {held / 60:.0f} min"
+
+
+# Fires when a field moved by `change` or more (a negative change means a
+# fall) within the last window_minutes. Readings older than the window are
+# evicted from the deque as new ones arrive, so each update is amortized O(1).
+class RateRule:
+    def __init__(self, name, source, field, change, window_minutes):
+        self.name = name
+        self.source = source
+        self.field = field
+        self.change = change
+        self.window = window_minutes * 60
+        self._window = deque()
+
+    def evaluate(self, ts, value):
+        self._window.append((ts, value))
+        while ts - self._window[0][0] > self.window:
+            self._window.popleft()
+        oldest_ts, oldest = self._window[0]
+        delta = value - oldest
+        firing = delta <= self.change if self.change < 0 else delta >= self.change
+        return firing, f"{self.field} changed {delta:+.2f} in {(ts - oldest_ts) / 60:.0f} min"
+
+
+RULE_TYPES = {
+    "threshold": ThresholdRule,
+    "rate": RateRule,
+}
+
+
+def build_rule(spec):
+    spec = dict(spec)
+    rule_type = spec.pop("type", "threshold")
+    if rule_type not in RULE_TYPES:
+        raise ValueError(f"rule {spec.get('name')}: unknown type {rule_type!r}")
+    return RULE_TYPES[rule_type](**spec)
+
+
+def load_rules(path=ALERT_RULES_FILE):
+    if not path:
+        return [build_rule(spec) for spec in DEFAULT_RULES]
+    with open(path) as f:
+        return [build_rule(spec) for spec in json.load(f)]
+
+
+# Appends one JSON object per alert
+class FileSink:
+    name = "file"
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alert):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(alert, default=str) + "\n")
+
+
+# POSTs each alert as a JSON body
+class WebhookSink:
+    name = "webhook"
+
+    def __init__(self, url, timeout=ALERT_WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        # Imported on first use: most deployments never configure a webhook
+        import urllib.request
+
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(alert, default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+# Evaluates rules against readings as the collectors take them and emits an
+# alert when a rule starts firing and again when it resolves. Delivery runs
+# on a daemon thread behind a bounded queue, so a slow webhook never delays
+# a reading; when the queue is full alerts are dropped and counted.
+class AlertEngine:
+    def __init__(self, rules, sinks):
+        self.rules = rules
+        self.sinks = sinks
+        self._firing = set()
+        self._queue = queue.Queue(maxsize=ALERT_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._deliver, name="alert-notifier", daemon=True)
+        self._thread.start()
+
+    # Feed one reading (a dict of field values) taken from `source`
+    def observe(self, source, timestamp, reading):
+        ts = timestamp.timestamp()
+        for rule in self.rules:
+            if rule.source != source:
+                continue
+            value = reading.get(rule.field)
+            if value is None:
+                continue
+            try:
+                firing, detail = rule.evaluate(ts, value)
+            except Exception as e:
+                logger.error("Alert rule %s failed: %s", rule.name, e)
+                continue
+            was_firing = rule.name in self._firing
+            if firing and not was_firing:
+                self._firing.add(rule.name)
+                self._emit(rule, "firing", timestamp, value, detail)
+            elif not firing and was_firing:
+                self._firing.discard(rule.name)
+                self._emit(rule, "resolved", timestamp, value, detail)
+
+    def _emit(self, rule, state, timestamp, value, detail):
+        ALERTS_TOTAL.labels(rule=rule.name, state=state).inc()
+        alert = {
+            "rule": rule.name,
+            "state": state,
+            "source": rule.source,
+            "field": rule.field,
+            "value": value,
+            "timestamp": timestamp.isoformat(),
+            "detail": detail,
+            "emitted_at": datetime.now().isoformat(),
+        }
+        logger.warning("alert %s %s", rule.name, state, extra={"alert": alert})
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            ALERTS_DROPPED.inc()
+
+    def _deliver(self):
+        while True:
+            alert = self._queue.get()
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    ALERT_SINK_FAILURES.labels(sink=sink.name).inc()
+                    logger.error("Alert delivery to %s failed: %s", sink.name, e)
+
+
+# Build the engine from the ALERT_* environment. Alerts are always logged;
+# the file and webhook sinks are added when configured. Returns None if the
+# rules cannot be loaded so a bad rules file never stops data collection.
+def engine_from_env():
+    try:
+        rules = load_rules()
+    except Exception as e:
+        logger.error("Could not load alert rules: %s", e)
+        return None
+    sinks = []
+    if ALERT_FILE:
+        sinks.append(FileSink(ALERT_FILE))
+    if ALERT_WEBHOOK_URL:
+        sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+    logger.info("Evaluating %d alert rules", len(rules))
+    return AlertEngine(rules, sinks)
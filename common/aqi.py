@@ -0,0 +1,104 @@
+import numpy as np
+
+# US EPA Air Quality Index from pollutant concentrations, vectorized so the
+# same code scores a single API poll at ingest and a whole table in bulk.
+#
+# WeatherAPI reports every pollutant in µg/m³ as a current (not 8-/24-hour
+# averaged) concentration, so the result is an instantaneous AQI computed
+# with the standard breakpoints rather than an official reporting value.
+
+POLLUTANTS = ("pm2_5", "pm10", "o3", "no2", "so2", "co")
+
+# Molar volume of an ideal gas at 25 °C and 1 atm, in litres
+MOLAR_VOLUME = 24.45
+
+# Molecular weights (g/mol) for converting gases from µg/m³ to ppb
+MOLECULAR_WEIGHTS = {
+    "o3": 48.00,
+    "no2": 46.01,
+    "so2": 64.07,
+    "co": 28.01,
+}
+
+# AQI value bands shared by every pollutant
+INDEX_BREAKPOINTS = np.array([
+    (0, 50), (51, 100), (101, 150), (151, 200), (201, 300), (301, 500),
+], dtype=float)
+
+# Concentration breakpoints (Clo, Chi) per index band, in the units the EPA
+# tables use, plus the decimals concentrations are truncated to first
+CONCENTRATION_BREAKPOINTS = {
+    # 24-hour µg/m³, 2024 revision of the PM2.5 NAAQS
+    "pm2_5": (np.array([
+        (0.0, 9.0), (9.1, 35.4), (35.5, 55.4), (55.5, 125.4), (125.5, 225.4), (225.5, 325.4),
+    ]), 1),
+    # 24-hour µg/m³
+    "pm10": (np.array([
+        (0, 54), (55, 154), (155, 254), (255, 354), (355, 424), (425, 604),
+    ]), 0),
+    # ppb: 8-hour table up to 200, 1-hour table for the two highest bands
+    "o3": (np.array([
+        (0, 54), (55, 70), (71, 85), (86, 105), (106, 200), (405, 604),
+    ]), 0),
+    # 1-hour ppb
+    "no2": (np.array([
+        (0, 53), (54, 100), (101, 360), (361, 649), (650, 1249), (1250, 2049),
+    ]), 0),
+    # 1-hour ppb
+    "so2": (np.array([
+        (0, 35), (36, 75), (76, 185), (186, 304), (305, 604), (605, 1004),
+    ]), 0),
+    # 8-hour ppm
+    "co": (np.array([
+        (0.0, 4.4), (4.5, 9.4), (9.5, 12.4), (12.5, 15.4), (15.5, 30.4), (30.5, 50.4),
+    ]), 1),
+}
+
+
+# Convert µg/m³ to the units of the pollutant's breakpoint table
+def to_epa_units(pollutant, concentration):
+    concentration = np.asarray(concentration, dtype=float)
+    weight = MOLECULAR_WEIGHTS.get(pollutant)
+    if weight is None:
+        return concentration
+    ppb = concentration * MOLAR_VOLUME / weight
+    return ppb / 1000.0 if pollutant == "co" else ppb
+
+
+# AQI for one pollutant: I = (Ihi - Ilo) / (Chi - Clo) * (C - Clo) + Ilo.
+# Each value is matched to the last band whose Clo it reaches, so readings
+# in the small gaps between bands (or the 1-hour ozone gap) never fall
+# through. Values above the top band are extrapolated from it; missing or
+# negative concentrations give NaN.
+def pollutant_aqi(pollutant, concentration):
+    breakpoints, decimals = CONCENTRATION_BREAKPOINTS[pollutant]
+    scale = 10.0 ** decimals
+    c = np.floor(to_epa_units(pollutant, concentration) * scale) / scale
+
+    band = np.clip(np.searchsorted(breakpoints[:, 0], c, side="right") - 1, 0, len(breakpoints) - 1)
+    c_lo, c_hi = breakpoints[band, 0], breakpoints[band, 1]
+    i_lo, i_hi = INDEX_BREAKPOINTS[band, 0], INDEX_BREAKPOINTS[band, 1]
+
+    index = (i_hi - i_lo) / (c_hi - c_lo) * (c - c_lo) + i_lo
+    index = np.where(band < len(breakpoints) - 1, np.minimum(index, i_hi), index)
+    return np.where(np.isnan(c) | (c < 0), np.nan, np.round(index))
+
+
+# Overall AQI: the highest pollutant AQI per row. `concentrations` maps
+# pollutant names to µg/m³ scalars or equal-length arrays (None for missing).
+# Rows with no usable pollutant give NaN.
+def overall_aqi(concentrations):
+    indexes = [
+        pollutant_aqi(name, np.asarray(concentrations[name], dtype=float))
+        for name in POLLUTANTS
+        if concentrations.get(name) is not None
+    ]
+    if not indexes:
+        return np.nan
+    return np.fmax.reduce(np.broadcast_arrays(*indexes))
+
+
+# AQI of a single reading as a float, or None if no pollutant is available
+def reading_aqi(concentrations):
+    value = float(overall_aqi(concentrations))
+    return None if np.isnan(value) else value
@@ -0,0 +1,204 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Logging configuration
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # "json" or "text"
+# Minimum seconds between two sampled per-reading lines (0 logs every reading)
+READING_LOG_INTERVAL = float(os.environ.get("READING_LOG_INTERVAL", "300"))
+# Seconds between periodic activity summary lines (0 disables them)
+LOG_SUMMARY_INTERVAL = float(os.environ.get("LOG_SUMMARY_INTERVAL", "600"))
+# Records buffered between the collection loop and the writer thread
+LOG_QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _record_fields(record):
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in _RECORD_ATTRS and not key.startswith("_") and key != "rate_limit"
+    }
+
+
+# One JSON object per line so log shippers can parse the fields
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_record_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# Human-readable variant: "<ts> LEVEL logger: message key=value ..."
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = (
+            f"{datetime.fromtimestamp(record.created).isoformat(timespec='seconds')} "
+            f"{record.levelname} {record.name}: {record.getMessage()}"
+        )
+        fields = _record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+# Lets records tagged with extra={"rate_limit": key} through at most once per
+# interval per key. The number of suppressed records is attached to the next
+# one that passes so nothing disappears silently.
+class RateLimitFilter(logging.Filter):
+    def __init__(self, interval):
+        super().__init__()
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_emitted = {}
+        self._suppressed = {}
+
+    def filter(self, record):
+        key = getattr(record, "rate_limit", None)
+        if key is None or self.interval <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_emitted.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last_emitted[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+# QueueHandler that never blocks the caller: when the writer thread falls
+# behind and the queue is full, records are dropped and counted instead.
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Counts events between summary lines and logs rates from a daemon thread,
+# e.g. "activity summary readings_per_min=2.0 insert_failures=0"
+class ActivitySummary:
+    def __init__(self, logger, interval, handler=None):
+        self.logger = logger
+        self.interval = interval
+        self.handler = handler
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._window_started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="log-summary", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.emit()
+
+    def emit(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            started, self._window_started = self._window_started, time.monotonic()
+        minutes = max((time.monotonic() - started) / 60, 1e-9)
+        fields = {"window_s": round(minutes * 60, 1)}
+        for name, value in sorted(counts.items()):
+            fields[name] = value
+            fields[f"{name}_per_min"] = round(value / minutes, 2)
+        if self.handler is not None and self.handler.dropped:
+            fields["log_records_dropped"] = self.handler.dropped
+        self.logger.info("activity summary", extra=fields)
+
+
+# Seconds since this process was started, read from /proc (None where that
+# is unavailable). Unlike a timer started in main() this includes the
+# interpreter start-up and the module imports.
+def process_uptime():
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(system_uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+
+
+# Log one "startup" line once the first reading is stored, and set the
+# phases on `gauge` (labelled by phase) if given. `imports_seconds` is
+# process_uptime() taken on entering main(), i.e. after the module imports.
+def report_startup(logger, imports_seconds, gauge=None):
+    phases = {"imports": imports_seconds, "ready": process_uptime()}
+    phases = {phase: seconds for phase, seconds in phases.items() if seconds is not None}
+    for phase, seconds in phases.items():
+        if gauge is not None:
+            gauge.labels(phase=phase).set(seconds)
+    logger.info("startup", extra={f"{phase}_s": round(seconds, 2) for phase, seconds in phases.items()})
+
+
+_listener = None
+_handler = None
+
+
+# Route all logging through a bounded queue drained by a background thread,
+# so formatting and writing to stdout never stall the collection loop.
+# Returns the named logger and an ActivitySummary for periodic rate lines.
+def setup_logging(name):
+    global _listener, _handler
+
+    if _listener is None:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+
+        _handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        _handler.addFilter(RateLimitFilter(READING_LOG_INTERVAL))
+
+        root = logging.getLogger()
+        root.handlers[:] = [_handler]
+        root.setLevel(LOG_LEVEL)
+
+        _listener = logging.handlers.QueueListener(_handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    logger = logging.getLogger(name)
+    summary = ActivitySummary(logger, LOG_SUMMARY_INTERVAL, _handler)
+    summary.start()
+    return logger, summary
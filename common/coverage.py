@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# Gap and uptime calculations over the hourly reading counts kept in the
+# reading_coverage table, shared by the dashboard and tools/find_gaps.py
+
+# Seconds between the readings each collector stores
+EXPECTED_INTERVALS = {
+    "sensor_readings": 30,
+    "weather_api_data": 300,
+}
+
+# Hours with at most this fraction of their expected readings count as gaps
+GAP_THRESHOLD = 0.5
+
+HOUR = pd.Timedelta(hours=1)
+
+
+# Readings stored, expected and their ratio (capped at 1) for every hour from
+# start to end, from a frame of reading_coverage rows (hour, readings) for one
+# source and device. Hours without a row have no readings. The hour holding
+# `end` is only expected to be filled up to one interval before it, so the
+# newest reading has time to arrive.
+def hourly_coverage(counts, start, end, interval):
+    end = pd.Timestamp(end) - timedelta(seconds=interval)
+    hours = pd.date_range(pd.Timestamp(start).floor("h"), end, freq="h")
+    expected = (np.minimum(hours + HOUR, end) - hours).total_seconds().to_numpy() / interval
+    if counts.empty:
+        readings = np.zeros(len(hours))
+    else:
+        readings = counts.set_index("hour")["readings"].reindex(hours, fill_value=0).to_numpy(dtype=float)
+    coverage = pd.DataFrame(
+        {"readings": readings, "expected": expected, "coverage": np.minimum(readings / expected, 1.0)},
+        index=hours,
+    )
+    return coverage[coverage["expected"] > 0]
+
+
+# Share of the expected readings that were stored, or None for an empty range
+def uptime(coverage):
+    if coverage.empty:
+        return None
+    return float(np.minimum(coverage["readings"], coverage["expected"]).sum() / coverage["expected"].sum())
+
+
+# Runs of consecutive hours at or below `threshold`, oldest first, as a frame
+# of start, end (exclusive), hours and the readings missing from them
+def find_gaps(coverage, threshold=GAP_THRESHOLD):
+    low = coverage["coverage"] <= threshold
+    if not low.any():
+        return pd.DataFrame(columns=["start", "end", "hours", "missing"])
+    runs = (low != low.shift()).cumsum()[low]
+    gaps = []
+    for _, run in coverage[low].groupby(runs):
+        gaps.append({
+            "start": run.index[0],
+            "end": run.index[-1] + HOUR,
+            "hours": len(run),
+            "missing": int(round((run["expected"] - run["readings"]).clip(lower=0).sum())),
+        })
+    return pd.DataFrame(gaps)
@@ -0,0 +1,177 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger("db_writer")
+
+# Single-row telemetry writes for the collectors: one keepalive-managed
+# psycopg2 connection per collector with prepared INSERTs in autocommit
+# mode, so a reading is one EXECUTE round trip (no BEGIN/COMMIT) and the
+# statement is parsed and planned once per connection.
+#
+# A dead connection is noticed by TCP keepalives while idle and by
+# tcp_user_timeout while a write is unacknowledged, instead of after the
+# kernel's retransmissions give up (many minutes). A write that fails on a
+# broken connection reconnects at once and is retried once, and one that
+# sat idle longer than IDLE_PING_SECONDS is checked with a ping first; when the
+# database stays down, reconnects back off so the collection loop keeps
+# its schedule.
+
+# Seconds to wait for a new connection
+CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "5"))
+# Idle seconds before the first keepalive probe, seconds between probes and
+# probes lost before the connection counts as dead
+KEEPALIVES_IDLE = 10
+KEEPALIVES_INTERVAL = 5
+KEEPALIVES_COUNT = 3
+# Milliseconds written data may stay unacknowledged before the connection is dropped
+TCP_USER_TIMEOUT = 10000
+
+# "off" acknowledges a commit before its WAL reaches disk: a database crash
+# can lose the last fraction of a second of readings, never corrupt them
+SYNCHRONOUS_COMMIT = os.environ.get("DB_SYNCHRONOUS_COMMIT", "off")
+
+# A connection idle for longer than this is pinged before the next write
+# (the weather collector writes every 5 minutes, the sensor loop every 30 s)
+IDLE_PING_SECONDS = float(os.environ.get("DB_IDLE_PING_SECONDS", "60"))
+
+# Upper bound of the doubling delay between reconnect attempts
+RECONNECT_DELAY_MAX = 30.0
+
+
+# Errors that mean the connection is gone rather than that the row is bad.
+# psycopg2 is imported on first use, so importing a collector (e.g. from the
+# benchmarks or the async collector) does not pay for it.
+def connection_errors():
+    import psycopg2
+
+    return (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class DbWriter:
+    # `on_connect(conn)` runs after every (re)connect, e.g. to create tables;
+    # `reconnects` is an optional metrics counter of reconnect attempts
+    def __init__(self, host, port, database, user, password, application_name, on_connect=None, reconnects=None):
+        self.params = dict(
+            host=host,
+            port=port,
+            database=database,
+            user=user,
+            password=password,
+            application_name=application_name,
+            connect_timeout=CONNECT_TIMEOUT,
+            keepalives=1,
+            keepalives_idle=KEEPALIVES_IDLE,
+            keepalives_interval=KEEPALIVES_INTERVAL,
+            keepalives_count=KEEPALIVES_COUNT,
+            tcp_user_timeout=TCP_USER_TIMEOUT,
+            options=f"-c synchronous_commit={SYNCHRONOUS_COMMIT}",
+        )
+        self.on_connect = on_connect
+        self.reconnects = reconnects
+        self.conn = None
+        self._prepared = {}
+        self._delay = 1.0
+        self._retry_at = 0.0
+        self._last_used = 0.0
+
+    @property
+    def connected(self):
+        return self.conn is not None and not self.conn.closed
+
+    # Open a fresh connection; returns False (and backs off further attempts)
+    # when the database is unreachable
+    def connect(self):
+        import psycopg2
+
+        self.close()
+        try:
+            conn = psycopg2.connect(**self.params)
+            conn.autocommit = True
+            if self.on_connect is not None:
+                self.on_connect(conn)
+        except Exception as e:
+            logger.error("Database connection error: %s", e)
+            self._retry_at = time.monotonic() + self._delay
+            self._delay = min(self._delay * 2, RECONNECT_DELAY_MAX)
+            return False
+        self.conn = conn
+        self._delay = 1.0
+        self._last_used = time.monotonic()
+        return True
+
+    # Reconnect unless the last attempt failed too recently
+    def reconnect(self):
+        if time.monotonic() < self._retry_at:
+            return False
+        if self.reconnects is not None:
+            self.reconnects.inc()
+        return self.connect()
+
+    # Round trip to the server; drops the connection if it fails
+    def ping(self):
+        if not self.connected:
+            return False
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            self._last_used = time.monotonic()
+            return True
+        except connection_errors():
+            self.close()
+            return False
+
+    # Name of the prepared INSERT for (table, columns), preparing it on this
+    # connection first if needed
+    def _statement(self, table, columns):
+        key = (table, tuple(columns))
+        name = self._prepared.get(key)
+        if name is None:
+            name = f"insert_{table}_{len(self._prepared)}"
+            placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+            with self.conn.cursor() as cursor:
+                cursor.execute(f"PREPARE {name} AS INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})")
+            self._prepared[key] = name
+        return name
+
+    def _execute(self, table, columns, row):
+        name = self._statement(table, columns)
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(row))})", row)
+
+    # Insert one row; returns False when it could not be stored. A broken
+    # connection is replaced and the row retried once right away.
+    def insert(self, table, columns, row):
+        # An idle connection may have died unnoticed (e.g. a database restart
+        # closed it between writes); a failed ping closes it
+        if self.connected and time.monotonic() - self._last_used > IDLE_PING_SECONDS and not self.ping():
+            logger.warning("Idle database connection lost, reconnecting")
+        if not self.connected and not self.reconnect():
+            return False
+        try:
+            self._execute(table, columns, row)
+            self._last_used = time.monotonic()
+            return True
+        except connection_errors() as e:
+            logger.warning("Database connection lost (%s), reconnecting", e)
+            if not self.reconnect():
+                return False
+            try:
+                self._execute(table, columns, row)
+                self._last_used = time.monotonic()
+                return True
+            except Exception as e:
+                logger.error("Data insertion error: %s", e)
+                return False
+        except Exception as e:
+            logger.error("Data insertion error: %s", e)
+            return False
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+        self._prepared = {}
@@ -0,0 +1,143 @@
+import bisect
+import warnings
+from collections import deque
+
+import numpy as np
+
+# Hampel outlier filter for the Sense HAT readings: a value is an outlier
+# when it lies more than THRESHOLD scaled median absolute deviations (MAD)
+# from the median of the readings around it. The collectors check each
+# reading as it is taken against a trailing window, at a fixed cost per
+# reading; the dashboard runs the vectorized version over a loaded frame
+# with a centred window.
+#
+# Flags are stored as bits of sensor_readings.quality: 0 when every column
+# passed, NULL when the reading was never checked (rows stored before the
+# column existed, imports).
+
+# Bit per checked column in the quality flag
+QUALITY_BITS = {"temperature": 1, "humidity": 2, "pressure": 4}
+
+# Readings per window (five minutes at one reading per 30 s) and the
+# allowed deviation in scaled MADs
+WINDOW = 11
+THRESHOLD = 3.0
+# MAD to standard deviation for normally distributed noise
+MAD_SCALE = 1.4826
+# Smallest deviation that counts, per column. Readings are rounded to two
+# decimals, so a steady stretch has a MAD of 0 and every small change would
+# otherwise be an outlier.
+MIN_DEVIATIONS = {"temperature": 1.0, "humidity": 3.0, "pressure": 1.0}
+# Readings a window needs before it judges anything
+MIN_HISTORY = 5
+
+# Rows per block of the vectorized filter, bounding its (rows x WINDOW) copies
+CHUNK_SIZE = 50000
+
+
+def _median(ordered):
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+# Streaming filter for one series. The window is kept sorted alongside the
+# arrival order, so each reading costs a bounded amount of work however long
+# the collector runs.
+class HampelFilter:
+    def __init__(self, window=WINDOW, threshold=THRESHOLD, min_deviation=0.0):
+        self.values = deque(maxlen=window)
+        self.ordered = []
+        self.threshold = threshold
+        self.min_deviation = min_deviation
+
+    # True if `value` is an outlier against the readings before it. The value
+    # joins the window either way, so a genuine step change stops being
+    # flagged once it fills half the window. Missing values are ignored.
+    def update(self, value):
+        if value is None:
+            return False
+        outlier = False
+        if len(self.ordered) >= MIN_HISTORY:
+            median = _median(self.ordered)
+            mad = _median(sorted(abs(v - median) for v in self.ordered))
+            outlier = abs(value - median) > max(self.threshold * MAD_SCALE * mad, self.min_deviation)
+        if len(self.values) == self.values.maxlen:
+            del self.ordered[bisect.bisect_left(self.ordered, self.values[0])]
+        self.values.append(value)
+        bisect.insort(self.ordered, value)
+        return outlier
+
+
+# One HampelFilter per checked column of a device's readings
+class QualityFilter:
+    def __init__(self, window=WINDOW, threshold=THRESHOLD):
+        self.filters = {
+            column: HampelFilter(window, threshold, MIN_DEVIATIONS[column]) for column in QUALITY_BITS
+        }
+
+    # Quality flag of one reading given as {column: value}
+    def check(self, reading):
+        quality = 0
+        for column, hampel in self.filters.items():
+            if hampel.update(reading.get(column)):
+                quality |= QUALITY_BITS[column]
+        return quality
+
+
+# Names of the columns set in a quality flag
+def flagged_columns(quality):
+    if not quality:
+        return []
+    return [column for column, bit in QUALITY_BITS.items() if quality & bit]
+
+
+# Copy of a reading {column: value} with its flagged columns set to None
+def clear_flagged(reading, quality):
+    flagged = flagged_columns(quality)
+    if not flagged:
+        return reading
+    return {column: None if column in flagged else value for column, value in reading.items()}
+
+
+# Outlier mask of a series in time order (either direction), each value
+# judged against the centred window around it. Missing values (NaN) are
+# never outliers and are left out of their neighbours' windows.
+def hampel_mask(values, window=WINDOW, threshold=THRESHOLD, min_deviation=0.0):
+    values = np.asarray(values, dtype=float)
+    mask = np.zeros(len(values), dtype=bool)
+    if np.count_nonzero(~np.isnan(values)) < MIN_HISTORY:
+        return mask
+    half = window // 2
+    padded = np.pad(values, half, constant_values=np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * half + 1)
+    with warnings.catch_warnings():
+        # Windows of only NaN have no median; they are masked by `enough` below
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for start in range(0, len(values), CHUNK_SIZE):
+            block = windows[start:start + CHUNK_SIZE]
+            median = np.nanmedian(block, axis=1)
+            mad = np.nanmedian(np.abs(block - median[:, None]), axis=1)
+            enough = np.count_nonzero(~np.isnan(block), axis=1) >= MIN_HISTORY
+            deviation = np.abs(values[start:start + CHUNK_SIZE] - median)
+            limit = np.maximum(threshold * MAD_SCALE * mad, min_deviation)
+            mask[start:start + CHUNK_SIZE] = enough & (deviation > limit)
+    return mask
+
+
+# Quality flags of every row of a reading frame in time order, per device
+# when the frame has a device column
+def quality_flags(df, window=WINDOW, threshold=THRESHOLD):
+    flags = np.zeros(len(df), dtype=np.int16)
+    if 'device' in df.columns:
+        groups = list(df.groupby('device', sort=False).indices.values())
+    else:
+        groups = [np.arange(len(df))]
+    for column, bit in QUALITY_BITS.items():
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy(dtype=float)
+        for rows in groups:
+            flags[rows[hampel_mask(values[rows], window, threshold, MIN_DEVIATIONS[column])]] |= bit
+    return flags
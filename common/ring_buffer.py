@@ -0,0 +1,141 @@
+import mmap
+import os
+import time
+
+import numpy as np
+
+# Fixed-size ring of recent readings in a memory-mapped file, written by a
+# collector and read by the dashboard on the same host (through a tmpfs
+# volume), so short time ranges never need a database query.
+#
+# Layout: a 512-byte header, then `capacity` float64 timestamps, then one
+# contiguous float32 array of `capacity` values per column. Readers map the
+# file and view the arrays in place; a snapshot is one copy of the slots in
+# use, with nothing to parse or deserialize.
+#
+# A single writer publishes each row under a sequence lock: the sequence is
+# odd while a slot is being written and bumped to the next even number when
+# it is done, and a reader retries if the sequence moved while it copied.
+
+MAGIC = b"RBUF"
+VERSION = 1
+HEADER_SIZE = 512
+NAMES_SIZE = 448
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u4"),
+    ("capacity", "<u4"),
+    ("columns", "<u4"),
+    ("sequence", "<u8"),
+    ("count", "<u8"),
+    ("names", f"S{NAMES_SIZE}"),
+])
+
+# Timestamps are stored as seconds since 1970-01-01 of the naive local
+# datetimes the collectors write to Postgres, so they convert back to the
+# same wall-clock values without any time zone handling
+EPOCH = np.datetime64("1970-01-01T00:00:00", "us")
+
+# Times a reader retries a copy the writer overlapped before giving up
+READ_RETRIES = 100
+
+
+def _file_size(capacity, columns):
+    return HEADER_SIZE + capacity * 8 + capacity * columns * 4
+
+
+class RingBuffer:
+    # Raises ValueError for anything but a complete ring buffer file (e.g. a
+    # truncated one), so callers can recreate it
+    def __init__(self, mm):
+        if len(mm) < HEADER_SIZE:
+            raise ValueError("ring buffer file is shorter than its header")
+        self._mm = mm
+        self._header = np.ndarray((), dtype=HEADER_DTYPE, buffer=mm)
+        if self._header["magic"].item() != MAGIC or int(self._header["version"]) != VERSION:
+            raise ValueError("not a ring buffer file")
+        self.capacity = int(self._header["capacity"])
+        self.columns = tuple(self._header["names"].item().decode("ascii").split(","))
+        expected = _file_size(self.capacity, len(self.columns))
+        if len(self.columns) != int(self._header["columns"]) or len(mm) != expected:
+            raise ValueError("ring buffer file size does not match its header")
+        self._timestamps = np.ndarray((self.capacity,), dtype="<f8", buffer=mm, offset=HEADER_SIZE)
+        self._values = np.ndarray(
+            (len(self.columns), self.capacity), dtype="<f4", buffer=mm, offset=HEADER_SIZE + self.capacity * 8
+        )
+
+    # Open (or create) the writer's file. An existing file with the same
+    # columns and capacity is reused so a restarted collector keeps its
+    # history; otherwise a fresh file is renamed into place and readers pick
+    # it up the next time they open the path.
+    @classmethod
+    def create(cls, path, columns, capacity):
+        columns = tuple(columns)
+        try:
+            ring = cls.open(path, writable=True)
+            if ring.columns == columns and ring.capacity == capacity:
+                return ring
+            ring.close()
+        except (OSError, ValueError):
+            pass
+
+        names = ",".join(columns).encode("ascii")
+        if len(names) > NAMES_SIZE:
+            raise ValueError("too many column names for the ring buffer header")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.truncate(_file_size(capacity, len(columns)))
+            header = np.zeros((), dtype=HEADER_DTYPE)
+            header["magic"] = MAGIC
+            header["version"] = VERSION
+            header["capacity"] = capacity
+            header["columns"] = len(columns)
+            header["names"] = names
+            f.write(header.tobytes())
+        os.replace(tmp_path, path)
+        return cls.open(path, writable=True)
+
+    @classmethod
+    def open(cls, path, writable=False):
+        with open(path, "r+b" if writable else "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        try:
+            return cls(mm)
+        except Exception:
+            mm.close()
+            raise
+
+    def close(self):
+        self._header = self._timestamps = self._values = None
+        self._mm.close()
+
+    # Append one reading; None values are stored as NaN
+    def append(self, timestamp, values):
+        count = int(self._header["count"])
+        sequence = int(self._header["sequence"])
+        slot = count % self.capacity
+        self._header["sequence"] = sequence + 1
+        self._timestamps[slot] = (np.datetime64(timestamp, "us") - EPOCH) / np.timedelta64(1, "s")
+        self._values[:, slot] = [np.nan if value is None else value for value in values]
+        self._header["count"] = count + 1
+        self._header["sequence"] = sequence + 2
+
+    # Copy the readings held, oldest first, as (datetime64 timestamps,
+    # {column: float32 array}). Returns None if the writer kept overlapping
+    # the copy.
+    def snapshot(self):
+        for _ in range(READ_RETRIES):
+            sequence = int(self._header["sequence"])
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            count = int(self._header["count"])
+            slots = np.arange(count - min(count, self.capacity), count) % self.capacity
+            seconds = self._timestamps[slots]
+            values = self._values[:, slots]
+            if int(self._header["sequence"]) == sequence:
+                timestamps = EPOCH + (seconds * 1e6).round().astype("timedelta64[us]")
+                return timestamps, dict(zip(self.columns, values))
+        return None
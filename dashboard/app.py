@@ -1,10 +1,29 @@
-import streamlit as st
-from streamlit_autorefresh import st_autorefresh
-import pandas as pd
-from sqlalchemy import create_engine, text
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+import profiling
+
+# Start timing this rerun (no-op unless DASHBOARD_PROFILE is set)
+render_profile = profiling.start_run()
+
+# Only the first rerun in a process pays for these (pandas, plotly and
+# SQLAlchemy load with them), so its profile shows the cold-start import cost.
+# Every rerun draws widgets, frames and figures and queries the database, so
+# they are needed up front; modules only one section uses are imported there.
+with profiling.stage("import.modules"):
+    import streamlit as st
+    from streamlit_autorefresh import st_autorefresh
+    import pandas as pd
+    import plotly.graph_objects as go
+    from datetime import datetime, timedelta
+
+    from charts import (
+        create_comparison_chart, create_coverage_heatmap, create_detail_chart, create_time_series, get_aqi_info,
+    )
+    from data import (
+        apply_calibration, calculate_stats, calculate_weather_stats, exclude_latest_outliers, exclude_outliers,
+        load_calibration, load_coverage, load_detail, load_latest_readings, load_sensor_data, load_time_bounds,
+        load_weather_data, time_range_bounds,
+    )
+    from figure_cache import cached_figure
+    from smoothing import METHODS, WINDOWS, overlay
 
 # Page configuration
 st.set_page_config(
@@ -22,288 +41,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Database connection parameters
-DB_HOST = "postgres"  # Docker service name
-DB_PORT = "5432"
-DB_NAME = "sensordata"
-DB_USER = "postgres"
-DB_PASSWORD = "postgres"
-
-# Create SQLAlchemy engine
-engine = create_engine(
-    f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
-
-# Function to get database connection
-def get_db_connection():
-    try:
-        return engine.connect()
-    except Exception as e:
-        st.error(f"Database connection error: {e}")
-        return None
-
-# Function to load sensor data
-def load_sensor_data(time_range):
-    conn = get_db_connection()
-    if not conn:
-        return pd.DataFrame()
-        
-    try:
-        if time_range == "Last hour":
-            time_filter = "timestamp > NOW() - INTERVAL '1 hour'"
-        elif time_range == "Last 24 hours":
-            time_filter = "timestamp > NOW() - INTERVAL '24 hours'"
-        elif time_range == "Last 7 days":
-            time_filter = "timestamp > NOW() - INTERVAL '7 days'"
-        else:  # All data
-            time_filter = "TRUE"
-        
-        query = f"""
-        SELECT * FROM sensor_readings 
-        WHERE {time_filter}
-        ORDER BY timestamp DESC
-        """
-        
-        with conn:
-            df = pd.read_sql(text(query), conn)
-        
-        # Convert timestamp to datetime if not already
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-        return df
-    except Exception as e:
-        st.error(f"Error loading sensor data: {e}")
-        return pd.DataFrame()
-    finally:
-        conn.close()
-
-# Function to load weather API data
-def load_weather_data(time_range):
-    conn = get_db_connection()
-    if not conn:
-        return pd.DataFrame()
-        
-    try:
-        if time_range == "Last hour":
-            time_filter = "timestamp > NOW() - INTERVAL '1 hour'"
-        elif time_range == "Last 24 hours":
-            time_filter = "timestamp > NOW() - INTERVAL '24 hours'"
-        elif time_range == "Last 7 days":
-            time_filter = "timestamp > NOW() - INTERVAL '7 days'"
-        else:  # All data
-            time_filter = "TRUE"
-        
-        query = f"""
-        SELECT * FROM weather_api_data 
-        WHERE {time_filter}
-        ORDER BY timestamp DESC
-        """
-        
-        df = pd.read_sql(query, conn)
-        
-        # Convert timestamp to datetime if not already
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-        return df
-    except Exception as e:
-        st.error(f"Error loading weather data: {e}")
-        return pd.DataFrame()
-    finally:
-        conn.close()
-
-# Calculate statistics for sensor data
-def calculate_stats(df):
-    if df.empty:
-        return {}
-        
-    stats = {
-        "temp_current": df['temperature'].iloc[0],
-        "temp_min": df['temperature'].min(),
-        "temp_max": df['temperature'].max(),
-        "temp_avg": df['temperature'].mean(),
-        
-        "humidity_current": df['humidity'].iloc[0],
-        "humidity_min": df['humidity'].min(),
-        "humidity_max": df['humidity'].max(),
-        "humidity_avg": df['humidity'].mean(),
-        
-        "pressure_current": df['pressure'].iloc[0],
-        "pressure_min": df['pressure'].min(),
-        "pressure_max": df['pressure'].max(),
-        "pressure_avg": df['pressure'].mean(),
-        
-        "reading_count": len(df),
-        "first_reading": df['timestamp'].min(),
-        "last_reading": df['timestamp'].max(),
-    }
-    return stats
-
-# Calculate statistics for weather API data
-def calculate_weather_stats(df):
-    if df.empty:
-        return {}
-        
-    stats = {
-        "temp_current": df['temperature'].iloc[0],
-        "temp_min": df['temperature'].min(),
-        "temp_max": df['temperature'].max(),
-        "temp_avg": df['temperature'].mean(),
-        
-        "humidity_current": df['humidity'].iloc[0],
-        "humidity_min": df['humidity'].min(),
-        "humidity_max": df['humidity'].max(),
-        "humidity_avg": df['humidity'].mean(),
-        
-        "pressure_current": df['pressure'].iloc[0],
-        "pressure_min": df['pressure'].min(),
-        "pressure_max": df['pressure'].max(),
-        "pressure_avg": df['pressure'].mean(),
-        
-        "wind_speed_current": df['wind_speed'].iloc[0],
-        "wind_direction_current": df['wind_direction'].iloc[0],
-        "condition_current": df['condition'].iloc[0],
-        "location": df['location'].iloc[0],
-        
-        "reading_count": len(df),
-        "first_reading": df['timestamp'].min(),
-        "last_reading": df['timestamp'].max(),
-    }
-    
-    # Add AQI statistics if available
-    if 'aqi' in df.columns and not df['aqi'].isna().all():
-        stats["aqi_current"] = df['aqi'].iloc[0] if not pd.isna(df['aqi'].iloc[0]) else None
-        stats["aqi_min"] = df['aqi'].min() if not df['aqi'].isna().all() else None
-        stats["aqi_max"] = df['aqi'].max() if not df['aqi'].isna().all() else None
-        stats["aqi_avg"] = df['aqi'].mean() if not df['aqi'].isna().all() else None
-    
-    # Add US EPA AQI index if available
-    if 'us_epa_index' in df.columns and not df['us_epa_index'].isna().all():
-        stats["us_epa_index"] = df['us_epa_index'].iloc[0] if not pd.isna(df['us_epa_index'].iloc[0]) else None
-    
-    # Add individual pollutant data if available
-    for pollutant in ['pm2_5', 'pm10', 'o3', 'no2', 'so2', 'co']:
-        if pollutant in df.columns and not df[pollutant].isna().all():
-            stats[f"{pollutant}_current"] = df[pollutant].iloc[0] if not pd.isna(df[pollutant].iloc[0]) else None
-    
-    return stats
-
-# Function to create a time series chart
-def create_time_series(df, y_column, title, y_label, color):
-    if df.empty or y_column not in df.columns or df[y_column].isna().all():
-        return go.Figure()
-        
-    # Filter out NaN values
-    filtered_df = df.dropna(subset=[y_column])
-    
-    # If still empty after filtering, return empty figure
-    if filtered_df.empty:
-        return go.Figure()
-        
-    # Ensure data is sorted by timestamp
-    filtered_df = filtered_df.sort_values('timestamp')
-    
-    # Create the figure
-    fig = px.line(
-        filtered_df, 
-        x='timestamp', 
-        y=y_column,
-        title=title
-    )
-    
-    # Update layout and styling
-    fig.update_layout(
-        xaxis_title="Time",
-        yaxis_title=y_label,
-        hovermode="x unified",
-        height=300,
-    )
-    
-    # Update line style
-    fig.update_traces(line=dict(color=color, width=2))
-    
-    return fig
-
-# Function to create comparison chart between sensor and weather API data
-def create_comparison_chart(sensor_df, weather_df, y_column, title, y_label):
-    if (sensor_df.empty or weather_df.empty or 
-        y_column not in sensor_df.columns or 
-        y_column not in weather_df.columns or
-        sensor_df[y_column].isna().all() or 
-        weather_df[y_column].isna().all()):
-        return go.Figure()
-        
-    # Filter out NaN values
-    sensor_filtered = sensor_df.dropna(subset=[y_column])
-    weather_filtered = weather_df.dropna(subset=[y_column])
-    
-    # If either is empty after filtering, return empty figure
-    if sensor_filtered.empty or weather_filtered.empty:
-        return go.Figure()
-        
-    # Ensure data is sorted by timestamp
-    sensor_filtered = sensor_filtered.sort_values('timestamp')
-    weather_filtered = weather_filtered.sort_values('timestamp')
-    
-    # Create figure with secondary y-axis
-    fig = go.Figure()
-    
-    # Add sensor data
-    fig.add_trace(
-        go.Scatter(
-            x=sensor_filtered['timestamp'], 
-            y=sensor_filtered[y_column],
-            name='Sense HAT',
-            line=dict(color='#FF4B4B', width=2)
-        )
-    )
-    
-    # Add weather API data
-    fig.add_trace(
-        go.Scatter(
-            x=weather_filtered['timestamp'], 
-            y=weather_filtered[y_column],
-            name='Weather API',
-            line=dict(color='#1E88E5', width=2, dash='dash')
-        )
-    )
-    
-    # Update layout
-    fig.update_layout(
-        title=title,
-        xaxis_title="Time",
-        yaxis_title=y_label,
-        hovermode="x unified",
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        height=300,
-    )
-    
-    return fig
-
-# Function to get AQI color and category based on US EPA Index
-def get_aqi_info(us_epa_index):
-    if us_epa_index is None:
-        return "#CCCCCC", "Unknown"
-    
-    categories = {
-        1: ("Good", "#00E400"),
-        2: ("Moderate", "#FFFF00"),
-        3: ("Unhealthy for Sensitive Groups", "#FF7E00"),
-        4: ("Unhealthy", "#FF0000"),
-        5: ("Very Unhealthy", "#99004C"),
-        6: ("Hazardous", "#7E0023")
-    }
-    
-    category, color = categories.get(us_epa_index, ("Unknown", "#CCCCCC"))
-    return color, category
-
 # Initialize session state for tracking refresh time
 if 'last_refresh_time' not in st.session_state:
     st.session_state.last_refresh_time = datetime.now()
@@ -317,10 +54,23 @@ st.sidebar.title("Dashboard Controls")
 # Time range selection
 time_range = st.sidebar.selectbox(
     "Select Time Range",
-    ["Last hour", "Last 24 hours", "Last 7 days", "All data"],
+    ["Last hour", "Last 24 hours", "Last 7 days", "All data", "Custom range"],
     index=1  # Default to last 24 hours
 )
 
+# Custom ranges cover whole days, from the start of the first to the end of the last
+if time_range == "Custom range":
+    today = datetime.now().date()
+    custom_days = st.sidebar.date_input(
+        "Dates", value=(today - timedelta(days=7), today), max_value=today
+    )
+    first_day = custom_days[0] if custom_days else today
+    last_day = custom_days[1] if len(custom_days) > 1 else first_day
+    time_range = (
+        datetime.combine(first_day, datetime.min.time()),
+        datetime.combine(last_day + timedelta(days=1), datetime.min.time()),
+    )
+
 # Data source selection
 data_source = st.sidebar.radio(
     "Data Source",
@@ -328,6 +78,48 @@ data_source = st.sidebar.radio(
     index=2  # Default to comparison
 )
 
+# Correct the Sense HAT's CPU-heat bias with the coefficients fitted by tools/calibrate.py
+calibrate = st.sidebar.checkbox(
+    "Calibrate Sense HAT temperature",
+    value=False,
+    help="Apply the correction fitted against the weather API (run tools/calibrate.py first)"
+)
+
+# Leave out Sense HAT spikes flagged by the collectors' outlier filter
+hide_outliers = st.sidebar.checkbox(
+    "Hide Sense HAT outliers",
+    value=True,
+    help="Drop readings the Hampel filter flags as spikes (I2C glitches, LED heat bursts) from charts and stats"
+)
+
+# Zoomable chart that re-fetches the selected stretch at a finer resolution
+explore = st.sidebar.checkbox(
+    "History explorer",
+    value=False,
+    help="Box-select part of the chart to zoom in; each view is fetched within a fixed point budget"
+)
+
+# Smoothing overlays on the comparison and air quality charts
+smoothing_method = st.sidebar.selectbox(
+    "Smoothing", METHODS, help="Moving average or exponentially weighted average line over each series"
+)
+smoothing_window = st.sidebar.selectbox(
+    "Smoothing window", list(WINDOWS), index=1,
+    help="Window of the moving average and min-max band, half-life of the EWMA"
+)
+smoothing_band = st.sidebar.checkbox("Rolling min/max band", value=False)
+smoothing = (smoothing_method, WINDOWS[smoothing_window], smoothing_band)
+smoothing_enabled = smoothing_method != "None" or smoothing_band
+
+# Overlay frame for one chart series; only rows new since the last refresh
+# are computed (see smoothing.py)
+def series_overlay(source, df, column):
+    return overlay((source, str(time_range), calibrate, hide_outliers), df, column, *smoothing)
+
+# Record the selection alongside the timings
+if render_profile is not None:
+    render_profile.context.update(time_range=time_range, data_source=data_source)
+
 # Auto-refresh option
 auto_refresh = st.sidebar.checkbox("Auto-refresh (30s)", value=True)
 if auto_refresh:
@@ -346,12 +138,28 @@ if auto_refresh:
     st_autorefresh(interval=refresh_interval * 1000, key="data_refresh")
     st.session_state.last_refresh_time = datetime.now()
 
+# Newest reading and heartbeat per source, independent of the time range
+latest_readings = load_latest_readings()
+sensor_latest = latest_readings.get("sensor_readings")
+weather_latest = latest_readings.get("weather_api_data")
+
 # Load the data based on selected source
 sensor_data = pd.DataFrame()
 weather_data = pd.DataFrame()
 
 if data_source in ["Sense HAT Only", "Both (Comparison)"]:
     sensor_data = load_sensor_data(time_range)
+    if hide_outliers:
+        sensor_data = exclude_outliers(sensor_data)
+        sensor_latest = exclude_latest_outliers(sensor_latest, sensor_data)
+    if calibrate:
+        calibration = load_calibration()
+        if calibration:
+            sensor_data = apply_calibration(sensor_data, calibration)
+            if sensor_latest is not None:
+                sensor_latest = apply_calibration(sensor_latest, calibration)
+        else:
+            st.sidebar.warning("No calibration fitted yet")
     
 if data_source in ["Weather API Only", "Both (Comparison)"]:
     weather_data = load_weather_data(time_range)
@@ -372,10 +180,10 @@ sensor_stats = {}
 weather_stats = {}
 
 if not sensor_data.empty:
-    sensor_stats = calculate_stats(sensor_data)
+    sensor_stats = calculate_stats(sensor_data, sensor_latest)
     
 if not weather_data.empty:
-    weather_stats = calculate_weather_stats(weather_data)
+    weather_stats = calculate_weather_stats(weather_data, weather_latest)
 
 # Current readings section based on selected source
 if data_source == "Sense HAT Only":
@@ -549,25 +357,27 @@ elif data_source == "Weather API Only":
                 if 'aqi_current' in weather_stats and weather_stats['aqi_current'] is not None:
                     aqi_value = float(weather_stats['aqi_current'])
                 
-                fig = go.Figure(go.Indicator(
-                    mode="gauge+number",
-                    value=aqi_value,
-                    domain={'x': [0, 1], 'y': [0, 1]},
-                    title={'text': "Air Quality Index"},
-                    gauge={
-                        'axis': {'range': [None, max_range]},
-                        'bar': {'color': aqi_color},
-                        'steps': [
-                            {'range': [0, 50], 'color': "#00E400"},
-                            {'range': [51, 100], 'color': "#FFFF00"},
-                            {'range': [101, 150], 'color': "#FF7E00"},
-                            {'range': [151, 200], 'color': "#FF0000"},
-                            {'range': [201, 300], 'color': "#99004C"},
-                            {'range': [301, 500], 'color': "#7E0023"}
-                        ],
-                    }
-                ))
-                fig.update_layout(height=200, margin=dict(l=20, r=20, t=30, b=20))
+                with profiling.stage("figure.aqi_gauge") as stage:
+                    fig = go.Figure(go.Indicator(
+                        mode="gauge+number",
+                        value=aqi_value,
+                        domain={'x': [0, 1], 'y': [0, 1]},
+                        title={'text': "Air Quality Index"},
+                        gauge={
+                            'axis': {'range': [None, max_range]},
+                            'bar': {'color': aqi_color},
+                            'steps': [
+                                {'range': [0, 50], 'color': "#00E400"},
+                                {'range': [51, 100], 'color': "#FFFF00"},
+                                {'range': [101, 150], 'color': "#FF7E00"},
+                                {'range': [151, 200], 'color': "#FF0000"},
+                                {'range': [201, 300], 'color': "#99004C"},
+                                {'range': [301, 500], 'color': "#7E0023"}
+                            ],
+                        }
+                    ))
+                    fig.update_layout(height=200, margin=dict(l=20, r=20, t=30, b=20))
+                    stage.measure(fig)
                 st.plotly_chart(fig, use_container_width=True)
 
 else:  # Comparison mode
@@ -603,12 +413,21 @@ else:  # Comparison mode
             st.info(f"Temperature Difference: {abs(temp_diff):.1f} °C ({'+' if temp_diff > 0 else ''}{temp_diff:.1f} °C from Sense HAT to Weather API)")
             
             # Display comparison chart
-            temp_comparison = create_comparison_chart(
-                sensor_data, 
-                weather_data, 
-                'temperature', 
-                'Temperature Comparison', 
-                'Temperature (°C)'
+            temp_comparison = cached_figure(
+                ("comparison", 'temperature', str(time_range), calibrate, hide_outliers, smoothing),
+                (sensor_data, weather_data),
+                lambda: create_comparison_chart(
+                    sensor_data, 
+                    weather_data, 
+                    'temperature', 
+                    'Temperature Comparison', 
+                    'Temperature (°C)',
+                    overlays=(
+                        series_overlay("sensor_readings", sensor_data, 'temperature'),
+                        series_overlay("weather_api_data", weather_data, 'temperature'),
+                    ),
+                ),
+                traces=None if smoothing_enabled else [(0, 'temperature'), (1, 'temperature')],
             )
             st.plotly_chart(temp_comparison, use_container_width=True)
             
@@ -639,12 +458,21 @@ else:  # Comparison mode
             st.info(f"Humidity Difference: {abs(humidity_diff):.1f} % ({'+' if humidity_diff > 0 else ''}{humidity_diff:.1f} % from Sense HAT to Weather API)")
             
             # Display comparison chart
-            humidity_comparison = create_comparison_chart(
-                sensor_data, 
-                weather_data, 
-                'humidity', 
-                'Humidity Comparison', 
-                'Humidity (%)'
+            humidity_comparison = cached_figure(
+                ("comparison", 'humidity', str(time_range), calibrate, hide_outliers, smoothing),
+                (sensor_data, weather_data),
+                lambda: create_comparison_chart(
+                    sensor_data, 
+                    weather_data, 
+                    'humidity', 
+                    'Humidity Comparison', 
+                    'Humidity (%)',
+                    overlays=(
+                        series_overlay("sensor_readings", sensor_data, 'humidity'),
+                        series_overlay("weather_api_data", weather_data, 'humidity'),
+                    ),
+                ),
+                traces=None if smoothing_enabled else [(0, 'humidity'), (1, 'humidity')],
             )
             st.plotly_chart(humidity_comparison, use_container_width=True)
             
@@ -675,15 +503,98 @@ else:  # Comparison mode
             st.info(f"Pressure Difference: {abs(pressure_diff):.1f} hPa ({'+' if pressure_diff > 0 else ''}{pressure_diff:.1f} hPa from Sense HAT to Weather API)")
             
             # Display comparison chart
-            pressure_comparison = create_comparison_chart(
-                sensor_data, 
-                weather_data, 
-                'pressure', 
-                'Pressure Comparison', 
-                'Pressure (hPa)'
+            pressure_comparison = cached_figure(
+                ("comparison", 'pressure', str(time_range), calibrate, hide_outliers, smoothing),
+                (sensor_data, weather_data),
+                lambda: create_comparison_chart(
+                    sensor_data, 
+                    weather_data, 
+                    'pressure', 
+                    'Pressure Comparison', 
+                    'Pressure (hPa)',
+                    overlays=(
+                        series_overlay("sensor_readings", sensor_data, 'pressure'),
+                        series_overlay("weather_api_data", weather_data, 'pressure'),
+                    ),
+                ),
+                traces=None if smoothing_enabled else [(0, 'pressure'), (1, 'pressure')],
             )
             st.plotly_chart(pressure_comparison, use_container_width=True)
 
+# History explorer: box-selecting a stretch of the chart narrows the window,
+# and each window is fetched as raw readings or time-bucket aggregates to
+# stay within the point budget
+if explore:
+    st.markdown('<div class="sub-header">History Explorer</div>', unsafe_allow_html=True)
+    
+    explore_sources = []
+    if data_source in ["Sense HAT Only", "Both (Comparison)"]:
+        explore_sources.append(("Sense HAT", "sensor_readings", '#FF4B4B'))
+    if data_source in ["Weather API Only", "Both (Comparison)"]:
+        explore_sources.append(("Weather API", "weather_api_data", '#1E88E5'))
+    explore_column, explore_label = st.selectbox(
+        "Measurement",
+        [("temperature", "Temperature (°C)"), ("humidity", "Humidity (%)"), ("pressure", "Pressure (hPa)")],
+        format_func=lambda option: option[1],
+    )
+    
+    # The full window is the selected time range, with open ends filled in
+    # from the data
+    range_start, range_end = time_range_bounds(time_range)
+    if range_start is None:
+        bounds = [load_time_bounds(table) for _, table, _ in explore_sources]
+        starts = [b[0] for b in bounds if b is not None]
+        range_start = min(starts) if starts else datetime.now() - timedelta(days=1)
+    range_end = range_end or datetime.now()
+    
+    # Start over whenever the time range changes
+    if st.session_state.get("explore_range") != str(time_range):
+        st.session_state.explore_range = str(time_range)
+        st.session_state.explore_window = None
+    window_start, window_end = st.session_state.explore_window or (range_start, range_end)
+    
+    col1, col2, _ = st.columns([1, 1, 4])
+    if col1.button("Zoom out", disabled=st.session_state.explore_window is None):
+        center, width = window_start + (window_end - window_start) / 2, (window_end - window_start) * 2
+        window_start, window_end = max(range_start, center - width / 2), min(range_end, center + width / 2)
+        full_view = window_start == range_start and window_end == range_end
+        st.session_state.explore_window = None if full_view else (window_start, window_end)
+    if col2.button("Reset zoom", disabled=st.session_state.explore_window is None):
+        st.session_state.explore_window = None
+        window_start, window_end = range_start, range_end
+    
+    series = []
+    resolutions = []
+    for name, table, color in explore_sources:
+        detail, bucket_seconds = load_detail(
+            table, explore_column, window_start, window_end, hide_outliers=hide_outliers
+        )
+        series.append((name, detail, explore_column, bucket_seconds, color))
+        resolution = "raw readings" if bucket_seconds is None else f"{timedelta(seconds=bucket_seconds)} buckets"
+        resolutions.append(f"{name}: {len(detail)} points ({resolution})")
+    
+    detail_chart = create_detail_chart(
+        series, f"{explore_label} {window_start:%Y-%m-%d %H:%M} to {window_end:%Y-%m-%d %H:%M}", explore_label
+    )
+    event = st.plotly_chart(
+        detail_chart, use_container_width=True, key="explore_chart", on_select="rerun", selection_mode="box"
+    )
+    st.caption(" | ".join(resolutions) + ". Drag across the chart to zoom in.")
+    
+    # Apply a new box selection as the next window (each box only once, since
+    # the chart keeps reporting its last selection)
+    boxes = event.selection.get("box", []) if event else []
+    if boxes and boxes[0].get("x"):
+        box = tuple(str(x) for x in boxes[0]["x"])
+        if box != st.session_state.get("explore_box"):
+            st.session_state.explore_box = box
+            x0, x1 = sorted(pd.to_datetime(list(box)))
+            if x1 - x0 >= timedelta(seconds=1):
+                st.session_state.explore_window = (
+                    max(range_start, x0.to_pydatetime()), min(range_end, x1.to_pydatetime())
+                )
+                st.rerun()
+
 # Show additional weather information if Weather API data is available
 if data_source in ["Weather API Only", "Both (Comparison)"] and not weather_data.empty:
     st.markdown('<div class="sub-header">Additional Weather Information</div>', unsafe_allow_html=True)
@@ -693,12 +604,17 @@ if data_source in ["Weather API Only", "Both (Comparison)"] and not weather_data
     
     with col1:
         # Create wind speed chart
-        wind_chart = create_time_series(
-            weather_data, 
-            'wind_speed', 
-            'Wind Speed Over Time', 
-            'Wind Speed (km/h)', 
-            '#43A047'
+        wind_chart = cached_figure(
+            ("time_series", "weather_api_data", 'wind_speed', str(time_range)),
+            (weather_data,),
+            lambda: create_time_series(
+                weather_data, 
+                'wind_speed', 
+                'Wind Speed Over Time', 
+                'Wind Speed (km/h)', 
+                '#43A047'
+            ),
+            traces=[(0, 'wind_speed')],
         )
         st.plotly_chart(wind_chart, use_container_width=True)
         
@@ -721,12 +637,18 @@ if data_source in ["Weather API Only", "Both (Comparison)"] and not weather_data
         
         with col1:
             # Create AQI chart
-            aqi_chart = create_time_series(
-                weather_data, 
-                'aqi', 
-                'Air Quality Index Over Time', 
-                'AQI', 
-                '#FF5722'
+            aqi_chart = cached_figure(
+                ("time_series", "weather_api_data", 'aqi', str(time_range), smoothing),
+                (weather_data,),
+                lambda: create_time_series(
+                    weather_data, 
+                    'aqi', 
+                    'Air Quality Index Over Time', 
+                    'AQI', 
+                    '#FF5722',
+                    overlay=series_overlay("weather_api_data", weather_data, 'aqi'),
+                ),
+                traces=None if smoothing_enabled else [(0, 'aqi')],
             )
             st.plotly_chart(aqi_chart, use_container_width=True)
             
@@ -753,12 +675,18 @@ if data_source in ["Weather API Only", "Both (Comparison)"] and not weather_data
                     pollutant_color = color
                     
                     # Create chart for the first available pollutant
-                    pollutant_chart = create_time_series(
-                        pollutant_data, 
-                        pollutant_id, 
-                        title, 
-                        label, 
-                        pollutant_color
+                    pollutant_chart = cached_figure(
+                        ("time_series", "weather_api_data", pollutant_id, str(time_range), smoothing),
+                        (pollutant_data,),
+                        lambda: create_time_series(
+                            pollutant_data, 
+                            pollutant_id, 
+                            title, 
+                            label, 
+                            pollutant_color,
+                            overlay=series_overlay("weather_api_data", pollutant_data, pollutant_id),
+                        ),
+                        traces=None if smoothing_enabled else [(0, pollutant_id)],
                     )
                     st.plotly_chart(pollutant_chart, use_container_width=True)
                     break
@@ -767,6 +695,51 @@ if data_source in ["Weather API Only", "Both (Comparison)"] and not weather_data
             if pollutant_data is None:
                 st.info("No detailed pollutant data available in the selected time range.")
 
+# Data coverage: uptime and gaps per collector from the hourly counts in
+# reading_coverage, so months of history need no scan of the readings
+if st.checkbox("Show Data Coverage"):
+    from coverage import EXPECTED_INTERVALS, find_gaps, hourly_coverage, uptime
+    
+    st.markdown('<div class="sub-header">Data Coverage</div>', unsafe_allow_html=True)
+    
+    coverage_days = st.selectbox("Period", [7, 30, 90, 365], format_func=lambda days: f"Last {days} days")
+    coverage_end = datetime.now()
+    coverage_start = (coverage_end - timedelta(days=coverage_days)).replace(minute=0, second=0, microsecond=0)
+    counts = load_coverage(coverage_start)
+    
+    if counts.empty:
+        st.info("No coverage data yet (the reading_coverage table is created by database/init.sql).")
+    else:
+        collectors = {
+            (source, device): hourly_coverage(rows, coverage_start, coverage_end, EXPECTED_INTERVALS[source])
+            for (source, device), rows in counts.groupby(['source', 'device'])
+            if source in EXPECTED_INTERVALS
+        }
+        source_names = {"sensor_readings": "Sense HAT", "weather_api_data": "Weather API"}
+        labels = {key: f"{source_names[key[0]]} ({key[1]})" for key in collectors}
+        
+        uptime_cols = st.columns(len(collectors))
+        for col, (key, coverage) in zip(uptime_cols, collectors.items()):
+            col.metric(f"{labels[key]} uptime", f"{uptime(coverage):.1%}", help=(
+                f"Share of the readings expected every {EXPECTED_INTERVALS[key[0]]} s that were stored"
+            ))
+        
+        selected = st.selectbox("Collector", list(collectors), format_func=labels.get)
+        coverage = collectors[selected]
+        st.plotly_chart(
+            create_coverage_heatmap(coverage, f"{labels[selected]} readings per hour"), use_container_width=True
+        )
+        
+        gaps = find_gaps(coverage)
+        if gaps.empty:
+            st.success("No gaps in this period.")
+        else:
+            st.markdown(f"**Gaps: {len(gaps)}** (hours with at most half of their readings), newest first")
+            gaps = gaps.iloc[::-1].reset_index(drop=True)
+            gaps['start'] = gaps['start'].dt.strftime('%Y-%m-%d %H:%M')
+            gaps['end'] = gaps['end'].dt.strftime('%Y-%m-%d %H:%M')
+            st.dataframe(gaps, use_container_width=True, hide_index=True)
+
 # Add Raw Data Section
 if st.checkbox("Show Raw Data"):
     st.markdown('<div class="sub-header">Raw Data Tables</div>', unsafe_allow_html=True)
@@ -800,14 +773,19 @@ with col1:
     st.markdown('<div class="metric-container">', unsafe_allow_html=True)
     st.markdown("**Data Collection Status**", unsafe_allow_html=True)
     
-    # Check recent data collection
+    # Check recent data collection: heartbeats from latest_readings when
+    # available, else the newest row of the loaded range
     recent_threshold = datetime.now() - timedelta(minutes=15)
     
-    sensor_status = "✅ Active" if (not sensor_data.empty and 
-                                    sensor_data['timestamp'].max() > recent_threshold) else "❌ Inactive"
+    def collector_status(latest, data):
+        if latest is not None:
+            active = latest['heartbeat_age'].iloc[0] < 15 * 60
+        else:
+            active = not data.empty and data['timestamp'].max() > recent_threshold
+        return "✅ Active" if active else "❌ Inactive"
     
-    weather_status = "✅ Active" if (not weather_data.empty and 
-                                     weather_data['timestamp'].max() > recent_threshold) else "❌ Inactive"
+    sensor_status = collector_status(sensor_latest, sensor_data)
+    weather_status = collector_status(weather_latest, weather_data)
     
     st.markdown(f"""
     <small>
@@ -836,4 +814,14 @@ st.markdown("""
 <div style="margin-top: 2rem; text-align: center; color: #888;">
 <small>Environmental Monitoring Dashboard | Raspberry Pi Data Pipeline</small>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Render profile panel (only shown when DASHBOARD_PROFILE is enabled)
+render_profile = profiling.finish_run()
+if render_profile is not None:
+    with st.sidebar.expander("Render Profile", expanded=True):
+        st.caption(
+            f"Total script time: {render_profile.total_seconds * 1000:.0f} ms "
+            "(nested stages are included in their parent)"
+        )
+        st.dataframe(pd.DataFrame(render_profile.stages), use_container_width=True, hide_index=True)
@@ -0,0 +1,164 @@
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Shared query cache for the dashboard. Every session (and, with Redis,
+# every dashboard worker) reads the same cached DataFrames, and a miss is
+# computed once while concurrent callers wait for it (single-flight), so the
+# database sees about one query per key per TTL however many viewers there are.
+CACHE_TTL = float(os.environ.get("DASHBOARD_CACHE_TTL", "30"))  # 0 disables caching
+REDIS_URL = os.environ.get("REDIS_URL", "")
+# Entries kept by the in-process backend
+MAX_ENTRIES = 128
+# How long a Redis loader may hold a key's lock before others stop waiting
+LOCK_TIMEOUT = 30.0
+REDIS_KEY_PREFIX = "dashboard:"
+
+_MISSING = object()
+
+
+# Per-process backend: a dict of (expires_at, value) plus one lock per key
+# being loaded, dropped once no caller is waiting on it
+class LocalBackend:
+    name = "local"
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return _MISSING
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                for stale in [k for k, (expires, _) in self._entries.items() if expires < now]:
+                    del self._entries[stale]
+                if len(self._entries) >= self.max_entries:
+                    oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                    del self._entries[oldest]
+            self._entries[key] = (now + ttl, value)
+
+    def get_or_load(self, key, ttl, loader):
+        value = self.get(key)
+        if value is not _MISSING:
+            return value, True
+        # key -> [lock, callers holding or waiting for it]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+        try:
+            with key_lock[0]:
+                # Another session may have loaded it while we waited
+                value = self.get(key)
+                if value is not _MISSING:
+                    return value, True
+                value = loader()
+                self.set(key, value, ttl)
+                return value, False
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if not key_lock[1]:
+                    del self._key_locks[key]
+
+
+# Shared backend for several workers. Values are pickled DataFrames; a
+# SET NX lock per key makes one worker load while the others poll.
+# Only point this at a Redis instance the dashboard alone writes to.
+class RedisBackend:
+    name = "redis"
+
+    # Delete the lock only if we still own it
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def get(self, key):
+        raw = self.client.get(REDIS_KEY_PREFIX + key)
+        if raw is None:
+            return _MISSING
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(
+            REDIS_KEY_PREFIX + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), px=int(ttl * 1000)
+        )
+
+    def get_or_load(self, key, ttl, loader):
+        value = self.get(key)
+        if value is not _MISSING:
+            return value, True
+        lock_key = f"{REDIS_KEY_PREFIX}lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not self.client.set(lock_key, token, nx=True, px=int(LOCK_TIMEOUT * 1000)):
+            time.sleep(0.05)
+            value = self.get(key)
+            if value is not _MISSING:
+                return value, True
+            if time.monotonic() > deadline:
+                # The loader is stuck or gone; load without the lock
+                return loader(), False
+        try:
+            value = self.get(key)
+            if value is not _MISSING:
+                return value, True
+            value = loader()
+            self.set(key, value, ttl)
+            return value, False
+        finally:
+            self._release(keys=[lock_key], args=[token])
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if REDIS_URL:
+                try:
+                    _backend = RedisBackend(REDIS_URL)
+                    _backend.client.ping()
+                except Exception as e:
+                    logger.warning("Redis cache unavailable (%s), using in-process cache", e)
+                    _backend = LocalBackend()
+            else:
+                _backend = LocalBackend()
+        return _backend
+
+
+# Return the cached value for key, calling loader() on a miss. Returns
+# (value, hit). Cache failures fall back to calling the loader directly.
+def cached(key, loader, ttl=None):
+    ttl = CACHE_TTL if ttl is None else ttl
+    if ttl <= 0:
+        return loader(), False
+    try:
+        return get_backend().get_or_load(key, ttl, loader)
+    except Exception as e:
+        logger.warning("Cache error for %s: %s", key, e)
+        return loader(), False
@@ -0,0 +1,213 @@
+import plotly.graph_objects as go
+
+import profiling
+
+# Add a smoothing overlay (frame from smoothing.overlay) for one series: the
+# rolling min-max band as a shaded area and the smoothed line on top, with
+# the raw trace already in the figure faded so the trend stands out
+def add_overlay(fig, overlay, name, color):
+    if overlay is None:
+        return
+    if 'smooth' in overlay.columns:
+        fig.update_traces(opacity=0.35, selector=dict(name=name))
+    if 'min' in overlay.columns:
+        fig.add_trace(go.Scatter(
+            x=overlay['timestamp'], y=overlay['max'], mode='lines', line=dict(width=0),
+            showlegend=False, hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scatter(
+            x=overlay['timestamp'], y=overlay['min'], mode='lines', line=dict(width=0),
+            fill='tonexty', fillcolor=color, opacity=0.2, name=f"{name} min-max", hoverinfo='skip'
+        ))
+    if 'smooth' in overlay.columns:
+        fig.add_trace(go.Scatter(
+            x=overlay['timestamp'], y=overlay['smooth'], mode='lines', name=f"{name} smoothed",
+            line=dict(color=color, width=3)
+        ))
+
+# Function to create a time series chart
+@profiling.profiled("figure.time_series", label_arg=1)
+def create_time_series(df, y_column, title, y_label, color, overlay=None):
+    if df.empty or y_column not in df.columns or df[y_column].isna().all():
+        return go.Figure()
+        
+    with profiling.stage(f"pandas.prepare.{y_column}") as stage:
+        # Filter out NaN values
+        filtered_df = df.dropna(subset=[y_column])
+        
+        # Ensure data is sorted by timestamp
+        filtered_df = filtered_df.sort_values('timestamp')
+        stage.set_rows(len(filtered_df))
+    
+    # If still empty after filtering, return empty figure
+    if filtered_df.empty:
+        return go.Figure()
+    
+    # plotly.express is only needed here, so a process whose figures all come
+    # from the figure cache never imports it
+    import plotly.express as px
+
+    # Create the figure
+    fig = px.line(
+        filtered_df, 
+        x='timestamp', 
+        y=y_column,
+        title=title
+    )
+    
+    # Update layout and styling
+    fig.update_layout(
+        xaxis_title="Time",
+        yaxis_title=y_label,
+        hovermode="x unified",
+        height=300,
+    )
+    
+    # Update line style
+    fig.update_traces(line=dict(color=color, width=2), name=y_label)
+    add_overlay(fig, overlay, y_label, color)
+    
+    return fig
+
+# Function to create comparison chart between sensor and weather API data
+@profiling.profiled("figure.comparison", label_arg=2)
+def create_comparison_chart(sensor_df, weather_df, y_column, title, y_label, overlays=(None, None)):
+    if (sensor_df.empty or weather_df.empty or 
+        y_column not in sensor_df.columns or 
+        y_column not in weather_df.columns or
+        sensor_df[y_column].isna().all() or 
+        weather_df[y_column].isna().all()):
+        return go.Figure()
+        
+    with profiling.stage(f"pandas.prepare.{y_column}") as stage:
+        # Filter out NaN values
+        sensor_filtered = sensor_df.dropna(subset=[y_column])
+        weather_filtered = weather_df.dropna(subset=[y_column])
+        
+        # Ensure data is sorted by timestamp
+        sensor_filtered = sensor_filtered.sort_values('timestamp')
+        weather_filtered = weather_filtered.sort_values('timestamp')
+        stage.set_rows(len(sensor_filtered) + len(weather_filtered))
+    
+    # If either is empty after filtering, return empty figure
+    if sensor_filtered.empty or weather_filtered.empty:
+        return go.Figure()
+    
+    # Create figure with secondary y-axis
+    fig = go.Figure()
+    
+    # Add sensor data
+    fig.add_trace(
+        go.Scatter(
+            x=sensor_filtered['timestamp'], 
+            y=sensor_filtered[y_column],
+            name='Sense HAT',
+            line=dict(color='#FF4B4B', width=2)
+        )
+    )
+    
+    # Add weather API data
+    fig.add_trace(
+        go.Scatter(
+            x=weather_filtered['timestamp'], 
+            y=weather_filtered[y_column],
+            name='Weather API',
+            line=dict(color='#1E88E5', width=2, dash='dash')
+        )
+    )
+    
+    # Smoothing overlays, if selected
+    add_overlay(fig, overlays[0], 'Sense HAT', '#FF4B4B')
+    add_overlay(fig, overlays[1], 'Weather API', '#1E88E5')
+    
+    # Update layout
+    fig.update_layout(
+        title=title,
+        xaxis_title="Time",
+        yaxis_title=y_label,
+        hovermode="x unified",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=300,
+    )
+    
+    return fig
+
+# Zoomable history chart: one line per series, plus a shaded min-max band
+# where the series was fetched as time buckets. Box selection (horizontal
+# only) is the default drag mode so a selected stretch can be re-fetched.
+# `series` is a list of (name, frame, column, bucket_seconds, color).
+@profiling.profiled("figure.detail", label_arg=1)
+def create_detail_chart(series, title, y_label):
+    fig = go.Figure()
+    for name, df, column, bucket_seconds, color in series:
+        if df.empty or df[column].isna().all():
+            continue
+        if bucket_seconds is not None:
+            fig.add_trace(go.Scatter(
+                x=df['timestamp'], y=df[f"{column}_max"], mode='lines', line=dict(width=0),
+                showlegend=False, hoverinfo='skip'
+            ))
+            fig.add_trace(go.Scatter(
+                x=df['timestamp'], y=df[f"{column}_min"], mode='lines', line=dict(width=0),
+                fill='tonexty', fillcolor=color, opacity=0.2, name=f"{name} min-max", hoverinfo='skip'
+            ))
+        fig.add_trace(go.Scatter(
+            x=df['timestamp'], y=df[column], mode='lines', name=name, line=dict(color=color, width=2)
+        ))
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title="Time",
+        yaxis_title=y_label,
+        hovermode="x unified",
+        dragmode="select",
+        selectdirection="h",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        height=350,
+    )
+    return fig
+
+# Day-by-hour heatmap of the share of expected readings stored, from the
+# frame returned by coverage.hourly_coverage
+@profiling.profiled("figure.coverage", label_arg=1)
+def create_coverage_heatmap(coverage, title):
+    grid = (coverage['coverage'] * 100).to_frame('percent')
+    grid['day'] = grid.index.date
+    grid['hour'] = grid.index.hour
+    grid = grid.pivot(index='day', columns='hour', values='percent').reindex(columns=range(24))
+    
+    fig = go.Figure(go.Heatmap(
+        z=grid.to_numpy(), x=list(grid.columns), y=[str(day) for day in grid.index],
+        colorscale='RdYlGn', zmin=0, zmax=100, colorbar=dict(title="%"),
+        hovertemplate="%{y} %{x}:00<br>%{z:.0f}% of readings<extra></extra>"
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Hour of day",
+        yaxis=dict(autorange="reversed"),
+        height=max(250, 18 * len(grid) + 120),
+    )
+    return fig
+
+# Function to get AQI color and category based on US EPA Index
+def get_aqi_info(us_epa_index):
+    if us_epa_index is None:
+        return "#CCCCCC", "Unknown"
+    
+    categories = {
+        1: ("Good", "#00E400"),
+        2: ("Moderate", "#FFFF00"),
+        3: ("Unhealthy for Sensitive Groups", "#FF7E00"),
+        4: ("Unhealthy", "#FF0000"),
+        5: ("Very Unhealthy", "#99004C"),
+        6: ("Hazardous", "#7E0023")
+    }
+    
+    category, color = categories.get(us_epa_index, ("Unknown", "#CCCCCC"))
+    return color, category
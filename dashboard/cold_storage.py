@@ -0,0 +1,58 @@
+import os
+from datetime import date
+
+import pandas as pd
+
+import profiling
+
+# Readings moved out of Postgres by tools/archive_readings.py, laid out as
+# <ARCHIVE_DIR>/<table>/date=YYYY-MM-DD/*.parquet
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "/archive")
+
+
+# Archived days of a table from the partition directory names (no Parquet
+# files are opened), oldest first
+def archived_days(table):
+    try:
+        names = os.listdir(os.path.join(ARCHIVE_DIR, table))
+    except OSError:
+        return []
+    return sorted(date.fromisoformat(name[len("date="):]) for name in names if name.startswith("date="))
+
+
+# Read archived readings with start <= timestamp < end (either bound may be
+# None). The date partition filter skips whole directories and the timestamp
+# and column selection are pushed down to the Parquet row groups. Returns an
+# empty frame when the range does not reach into the archive.
+def read_cold(table, start=None, columns=None, end=None):
+    days = archived_days(table)
+    if not days or (start is not None and start.date() > days[-1]) or (end is not None and end.date() < days[0]):
+        return pd.DataFrame()
+
+    # Only needed when something is archived, so the dashboard runs without pyarrow otherwise
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    with profiling.stage(f"cold.{table}") as stage:
+        dataset = ds.dataset(
+            os.path.join(ARCHIVE_DIR, table),
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive"),
+        )
+        names = set(dataset.schema.names) - {"date"}
+        selected = [name for name in columns if name in names] if columns is not None else sorted(names)
+        condition = None
+        if start is not None:
+            condition = (ds.field("date") >= pa.scalar(start.date(), pa.date32())) & (
+                ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us"))
+            )
+        if end is not None:
+            before_end = (ds.field("date") <= pa.scalar(end.date(), pa.date32())) & (
+                ds.field("timestamp") < pa.scalar(end, pa.timestamp("us"))
+            )
+            condition = before_end if condition is None else condition & before_end
+        df = dataset.to_table(columns=selected, filter=condition).to_pandas()
+        if columns is not None:
+            df = df.reindex(columns=columns)
+        stage.measure(df)
+    return df
@@ -0,0 +1,659 @@
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from sqlalchemy import create_engine, text
+
+import cache
+import cold_storage
+import outliers
+import profiling
+import ring_buffer
+
+logger = logging.getLogger(__name__)
+
+# Database connection parameters
+DB_HOST = os.environ.get("DB_HOST", "postgres")  # Docker service name
+DB_PORT = os.environ.get("DB_PORT", "5432")
+DB_NAME = os.environ.get("DB_NAME", "sensordata")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+
+# Arrow-native loading for large ranges: "auto" uses ADBC or connectorx when
+# installed, "adbc" / "connectorx" pick one, "off" keeps the row-based path
+ARROW_LOADER = os.environ.get("DASHBOARD_ARROW_LOADER", "auto").lower()
+ARROW_DRIVERS = ("adbc", "connectorx")
+DB_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# How far back each time range reaches (None = all data)
+TIME_RANGE_SPANS = {
+    "Last hour": timedelta(hours=1),
+    "Last 24 hours": timedelta(hours=24),
+    "Last 7 days": timedelta(days=7),
+}
+
+# Ring buffer of recent Sense HAT readings kept by a collector on the same
+# host (empty disables it). Ranges it fully covers are served from it, as
+# long as its newest reading is at most RING_MAX_AGE old.
+RING_BUFFER_PATH = os.environ.get("RING_BUFFER_PATH", "")
+RING_MAX_AGE = timedelta(minutes=2)
+# The collector writes the table's default device
+RING_DEVICE = "sensehat"
+
+# Create SQLAlchemy engine
+engine = create_engine(
+    f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# Name of the first usable Arrow driver, detected once; None falls back to
+# building the frame from psycopg2 rows
+_arrow_driver = False
+
+def get_arrow_driver():
+    global _arrow_driver
+    if _arrow_driver is not False:
+        return _arrow_driver
+    
+    _arrow_driver = None
+    candidates = ARROW_DRIVERS if ARROW_LOADER == "auto" else (ARROW_LOADER,)
+    for name in candidates:
+        try:
+            if name == "adbc":
+                import adbc_driver_postgresql.dbapi  # noqa: F401
+            elif name == "connectorx":
+                import connectorx  # noqa: F401
+            else:
+                continue
+        except ImportError:
+            continue
+        _arrow_driver = name
+        break
+    return _arrow_driver
+
+# Idle ADBC connections kept for reuse, like the SQLAlchemy engine's pool,
+# so a query does not pay for a connect and authentication round trip
+ADBC_POOL_SIZE = 4
+_adbc_idle = []
+_adbc_lock = threading.Lock()
+
+# Run a query on a pooled ADBC connection. A connection that fails is closed
+# rather than returned, so the next query opens a fresh one.
+def fetch_adbc_table(query):
+    import adbc_driver_postgresql.dbapi as adbc
+    
+    with _adbc_lock:
+        conn = _adbc_idle.pop() if _adbc_idle else None
+    if conn is None:
+        conn = adbc.connect(DB_URI)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query)
+            table = cursor.fetch_arrow_table()
+        # ADBC runs queries in a transaction; end it before the connection idles
+        conn.rollback()
+    except Exception:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        raise
+    with _adbc_lock:
+        if len(_adbc_idle) < ADBC_POOL_SIZE:
+            _adbc_idle.append(conn)
+            conn = None
+    if conn is not None:
+        conn.close()
+    return table
+
+# Run a query straight into an Arrow table: Postgres' binary COPY protocol
+# (ADBC) or connectorx's columnar reader, with no per-row Python objects
+def fetch_arrow_table(driver, query):
+    if driver == "adbc":
+        return fetch_adbc_table(query)
+    
+    import connectorx
+    
+    return connectorx.read_sql(DB_URI, query, return_type="arrow")
+
+# Run a reading query and build its DataFrame, preferring the Arrow path.
+# The fetch and the DataFrame conversion are timed as separate stages.
+def fetch_frame(conn, query, table):
+    driver = get_arrow_driver()
+    if driver is not None:
+        try:
+            with profiling.stage(f"query.{table}.{driver}") as stage:
+                arrow_table = fetch_arrow_table(driver, query)
+                stage.set_rows(arrow_table.num_rows)
+            
+            with profiling.stage(f"deserialize.{table}.{driver}") as stage:
+                df = arrow_table.to_pandas()
+                stage.measure(df)
+            return df
+        except Exception as e:
+            logger.warning("Arrow loader %s failed, using the row-based path: %s", driver, e)
+    
+    with profiling.stage(f"query.{table}") as stage:
+        result = conn.execute(text(query))
+        columns = list(result.keys())
+        rows = result.fetchall()
+        stage.set_rows(len(rows))
+    
+    with profiling.stage(f"deserialize.{table}") as stage:
+        df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        
+        # Convert timestamp to datetime if not already
+        if 'timestamp' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        stage.measure(df)
+    return df
+
+# Function to get database connection
+def get_db_connection():
+    try:
+        return engine.connect()
+    except Exception as e:
+        st.error(f"Database connection error: {e}")
+        return None
+
+# Start and end (None = open) of a named time range or a (start, end) tuple
+# of datetimes for a custom range
+def time_range_bounds(time_range):
+    if isinstance(time_range, tuple):
+        return time_range
+    span = TIME_RANGE_SPANS.get(time_range)
+    return (datetime.now() - span if span is not None else None), None
+
+# SQL condition selecting a time range. Custom bounds are formatted from
+# datetimes, never from user text.
+def time_filter(time_range):
+    if isinstance(time_range, tuple):
+        start, end = time_range
+        return f"timestamp >= '{start:%Y-%m-%d %H:%M:%S}' AND timestamp < '{end:%Y-%m-%d %H:%M:%S}'"
+    if time_range == "Last hour":
+        return "timestamp > NOW() - INTERVAL '1 hour'"
+    elif time_range == "Last 24 hours":
+        return "timestamp > NOW() - INTERVAL '24 hours'"
+    elif time_range == "Last 7 days":
+        return "timestamp > NOW() - INTERVAL '7 days'"
+    return "TRUE"  # All data
+
+# Add archived (cold) readings in the time range to a frame loaded from
+# Postgres, keeping newest-first order
+def merge_cold(df, table, time_range):
+    start, end = time_range_bounds(time_range)
+    try:
+        cold = cold_storage.read_cold(table, start, list(df.columns) if not df.empty else None, end=end)
+    except Exception as e:
+        st.error(f"Error reading archived {table}: {e}")
+        return df
+    if cold.empty:
+        return df
+    if df.empty:
+        return cold.sort_values('timestamp', ascending=False, ignore_index=True)
+    merged = pd.concat([df, cold], ignore_index=True)
+    return merged.sort_values('timestamp', ascending=False, kind='stable', ignore_index=True)
+
+# Serve a loader's result from the shared cache, recording hit/miss in the profile
+def _cached_frame(table, time_range, loader):
+    with profiling.stage(f"cache.{table}") as stage:
+        df, hit = cache.cached(f"{table}:{time_range}", lambda: loader(time_range))
+        stage.measure(df)
+    profile = profiling.current()
+    if profile is not None:
+        profile.context[f"cache.{table}"] = "hit" if hit else "miss"
+    return df
+
+# All readings in the collector's ring buffer as an oldest-first frame with
+# the sensor_readings columns (less id), or None when the ring is disabled,
+# missing or stale
+def read_ring():
+    if not RING_BUFFER_PATH:
+        return None
+    try:
+        ring = ring_buffer.RingBuffer.open(RING_BUFFER_PATH)
+    except (OSError, ValueError):
+        return None
+    try:
+        with profiling.stage("ring.sensor_readings") as stage:
+            snapshot = ring.snapshot()
+            if snapshot is None:
+                return None
+            timestamps, values = snapshot
+            if not len(timestamps) or timestamps[-1] < np.datetime64(datetime.now() - RING_MAX_AGE):
+                return None
+            # float32 holds the collector's 2-decimal readings to about 7 digits
+            df = pd.DataFrame({"timestamp": timestamps})
+            for column, column_values in values.items():
+                df[column] = column_values.astype(float).round(2)
+            df["device"] = RING_DEVICE
+            stage.measure(df)
+        return df
+    finally:
+        ring.close()
+
+# Sensor readings for a time range from the ring buffer, newest first, or
+# None unless the ring reaches back to the start of the range
+def ring_sensor_data(time_range):
+    span = TIME_RANGE_SPANS.get(time_range)
+    if span is None:
+        return None
+    df = read_ring()
+    start = np.datetime64(datetime.now() - span)
+    if df is None or df['timestamp'].iloc[0] > start:
+        return None
+    df = df[df['timestamp'] > start]
+    return df.iloc[::-1].reset_index(drop=True)
+
+# Function to load sensor data: from the collector's ring buffer when it
+# covers the range, else shared by all sessions for DASHBOARD_CACHE_TTL seconds
+def load_sensor_data(time_range):
+    df = ring_sensor_data(time_range)
+    profile = profiling.current()
+    if profile is not None:
+        profile.context["source.sensor_readings"] = "ring" if df is not None else "database"
+    if df is not None:
+        return df
+    return _cached_frame("sensor_readings", time_range, query_sensor_data)
+
+# Function to load weather API data (shared by all sessions for DASHBOARD_CACHE_TTL seconds)
+def load_weather_data(time_range):
+    return _cached_frame("weather_api_data", time_range, query_weather_data)
+
+# Function to query sensor data from the database, bypassing the cache
+def query_sensor_data(time_range):
+    conn = get_db_connection()
+    if not conn:
+        return pd.DataFrame()
+        
+    try:
+        query = f"""
+        SELECT * FROM sensor_readings 
+        WHERE {time_filter(time_range)}
+        ORDER BY timestamp DESC
+        """
+        
+        df = fetch_frame(conn, query, "sensor_readings")
+        return merge_cold(df, "sensor_readings", time_range)
+    except Exception as e:
+        st.error(f"Error loading sensor data: {e}")
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+# Function to query weather API data from the database, bypassing the cache
+def query_weather_data(time_range):
+    conn = get_db_connection()
+    if not conn:
+        return pd.DataFrame()
+        
+    try:
+        query = f"""
+        SELECT * FROM weather_api_data 
+        WHERE {time_filter(time_range)}
+        ORDER BY timestamp DESC
+        """
+        
+        df = fetch_frame(conn, query, "weather_api_data")
+        return merge_cold(df, "weather_api_data", time_range)
+    except Exception as e:
+        st.error(f"Error loading weather data: {e}")
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+# Most points fetched per series for the zoomable history chart
+POINT_BUDGET = int(os.environ.get("DASHBOARD_POINT_BUDGET", "2000"))
+
+# Earliest and latest reading of a table, counting archived days, or None when empty
+def load_time_bounds(table):
+    return cache.cached(f"bounds:{table}", lambda: query_time_bounds(table))[0]
+
+def query_time_bounds(table):
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    try:
+        first, last = conn.execute(text(f"SELECT MIN(timestamp), MAX(timestamp) FROM {table}")).one()
+    except Exception as e:
+        st.error(f"Error loading {table} time range: {e}")
+        return None
+    finally:
+        conn.close()
+    
+    # Archived days are always older than the rows still in Postgres
+    days = cold_storage.archived_days(table)
+    if days:
+        first = datetime.combine(days[0], datetime.min.time())
+        last = last or datetime.combine(days[-1] + timedelta(days=1), datetime.min.time())
+    return (first, last) if first is not None else None
+
+# Smallest step the history explorer's windows are aligned to
+DETAIL_ALIGN_SECONDS = 60
+
+# One column between start and end at a resolution that fits the point
+# budget: the raw readings when there are few enough, else fixed-width
+# time buckets with the mean, min and max of each. Returns the frame
+# (oldest first) and the bucket width in seconds (None for raw rows).
+# `hide_outliers` leaves out Sense HAT readings whose column is flagged.
+# The window is widened to whole buckets (at least whole minutes), so a
+# window that follows the clock keeps its cache key between refreshes.
+def load_detail(table, column, start, end, budget=POINT_BUDGET, hide_outliers=False):
+    step = f"{max(DETAIL_ALIGN_SECONDS, math.ceil((end - start).total_seconds() / budget))}s"
+    start = pd.Timestamp(start).floor(step).to_pydatetime()
+    end = pd.Timestamp(end).ceil(step).to_pydatetime()
+    key = f"detail:{table}:{column}:{start:%Y%m%d%H%M%S}:{end:%Y%m%d%H%M%S}:{budget}:{hide_outliers}"
+    return cache.cached(key, lambda: query_detail(table, column, start, end, budget, hide_outliers))[0]
+
+def query_detail(table, column, start, end, budget, hide_outliers=False):
+    conn = get_db_connection()
+    if not conn:
+        return pd.DataFrame(), None
+    
+    params = {"start": start, "end": end}
+    window = "timestamp >= :start AND timestamp < :end"
+    bit = outliers.QUALITY_BITS.get(column) if hide_outliers and table == "sensor_readings" else None
+    if bit:
+        # Rows never checked (quality NULL) count as good
+        window += f" AND (quality IS NULL OR quality & {bit} = 0)"
+    try:
+        with profiling.stage(f"query.detail.{table}") as stage:
+            hot_rows = conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE {window}"), params).scalar()
+            cold = cold_storage.read_cold(table, start, ["timestamp", column] + (["quality"] if bit else []), end=end)
+            if bit and not cold.empty:
+                flagged = (cold["quality"].fillna(0).astype(int) & bit) != 0
+                cold = cold.loc[~flagged, ["timestamp", column]]
+            
+            if hot_rows + len(cold) <= budget:
+                bucket_seconds = None
+                result = conn.execute(
+                    text(f"SELECT timestamp, {column} FROM {table} WHERE {window} ORDER BY timestamp"), params
+                )
+                df = pd.DataFrame(result.fetchall(), columns=["timestamp", column])
+                if not cold.empty:
+                    df = pd.concat([cold, df], ignore_index=True)
+            else:
+                # Buckets are aligned to the epoch so archived and live rows
+                # that share a bucket are combined exactly
+                bucket_seconds = max(1, math.ceil((end - start).total_seconds() / budget))
+                params["bucket"] = bucket_seconds
+                result = conn.execute(text(f"""
+                    SELECT to_timestamp(floor(extract(epoch FROM timestamp) / :bucket) * :bucket)
+                               AT TIME ZONE 'UTC' AS timestamp,
+                           SUM({column}) AS total, COUNT({column}) AS count,
+                           MIN({column}) AS low, MAX({column}) AS high
+                    FROM {table}
+                    WHERE {window}
+                    GROUP BY 1
+                """), params)
+                df = pd.DataFrame(result.fetchall(), columns=["timestamp", "total", "count", "low", "high"])
+                if not cold.empty:
+                    cold_buckets = cold.groupby(cold["timestamp"].dt.floor(f"{bucket_seconds}s"))[column].agg(
+                        total="sum", count="count", low="min", high="max"
+                    ).reset_index()
+                    df = pd.concat([df, cold_buckets], ignore_index=True)
+                df = df.astype({"total": float, "count": float, "low": float, "high": float})
+                df = df.groupby("timestamp", as_index=False).agg(
+                    total=("total", "sum"), count=("count", "sum"), low=("low", "min"), high=("high", "max")
+                )
+                df[column] = df["total"] / df["count"].where(df["count"] > 0)
+                df = df.rename(columns={"low": f"{column}_min", "high": f"{column}_max"})
+                df = df.drop(columns=["total", "count"])
+            
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df = df.sort_values('timestamp', ignore_index=True)
+            stage.measure(df)
+        return df, bucket_seconds
+    except Exception as e:
+        st.error(f"Error loading {table} history: {e}")
+        return pd.DataFrame(), None
+    finally:
+        conn.close()
+
+# Latest readings are a handful of rows, so they can be refreshed more often
+LATEST_CACHE_TTL = 5
+
+# Load the newest reading per source as {source: 1-row DataFrame}, from the
+# trigger-maintained latest_readings table. heartbeat_age is the seconds since
+# the database last received a newer row from that source.
+def load_latest_readings():
+    latest = cache.cached("latest_readings", query_latest_readings, ttl=LATEST_CACHE_TTL)[0]
+    
+    # A fresh ring buffer has the newest Sense HAT reading without a query
+    ring = read_ring()
+    if ring is not None:
+        newest = ring.iloc[[-1]].reset_index(drop=True)
+        newest['heartbeat_age'] = (datetime.now() - newest['timestamp'].iloc[0]).total_seconds()
+        latest = {**latest, "sensor_readings": newest}
+    return latest
+
+def query_latest_readings():
+    conn = get_db_connection()
+    if not conn:
+        return {}
+    
+    try:
+        with profiling.stage("query.latest_readings"):
+            result = conn.execute(text("""
+                SELECT DISTINCT ON (source) source, reading,
+                       EXTRACT(EPOCH FROM NOW() - heartbeat_at) AS heartbeat_age
+                FROM latest_readings
+                ORDER BY source, timestamp DESC
+            """))
+            latest = {}
+            for source, reading, heartbeat_age in result:
+                df = pd.DataFrame([reading])
+                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                df['heartbeat_age'] = float(heartbeat_age)
+                latest[source] = df
+        return latest
+    except Exception:
+        # Databases without the latest_readings table fall back to the loaded frames
+        return {}
+    finally:
+        conn.close()
+
+# Coverage counts grow by one row per reading, so a minute-old copy is close enough
+COVERAGE_CACHE_TTL = 60
+
+# Hourly reading counts per source and device since `start`, from the
+# trigger-maintained reading_coverage table (a few thousand rows even over
+# months). Databases without the table return an empty frame.
+def load_coverage(start):
+    key = f"coverage:{start:%Y%m%d%H}"
+    return cache.cached(key, lambda: query_coverage(start), ttl=COVERAGE_CACHE_TTL)[0]
+
+def query_coverage(start):
+    conn = get_db_connection()
+    if not conn:
+        return pd.DataFrame()
+    
+    try:
+        with profiling.stage("query.reading_coverage") as stage:
+            result = conn.execute(
+                text("SELECT source, device, hour, readings FROM reading_coverage WHERE hour >= :start"),
+                {"start": start}
+            )
+            df = pd.DataFrame(result.fetchall(), columns=["source", "device", "hour", "readings"])
+            df['hour'] = pd.to_datetime(df['hour'])
+            stage.measure(df)
+        return df
+    except Exception:
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+# Coefficients change at most once per calibrate.py run
+CALIBRATION_CACHE_TTL = 300
+
+# Load fitted temperature corrections as {device: (features, coefficients)}.
+# Databases that predate the calibration table simply have none.
+def load_calibration():
+    return cache.cached("temperature_calibration", query_calibration, ttl=CALIBRATION_CACHE_TTL)[0]
+
+def query_calibration():
+    conn = get_db_connection()
+    if not conn:
+        return {}
+    
+    try:
+        result = conn.execute(text(
+            "SELECT device, features, coefficients FROM temperature_calibration WHERE coefficients IS NOT NULL"
+        ))
+        return {device: (list(features), np.asarray(coefficients, dtype=float))
+                for device, features, coefficients in result}
+    except Exception:
+        return {}
+    finally:
+        conn.close()
+
+# Replace Sense HAT temperatures with their calibrated values, one matrix
+# product per device. Raw readings are kept in temperature_raw; rows missing
+# a regressor (e.g. no CPU temperature recorded) stay uncorrected.
+@profiling.profiled("calibrate.sensor")
+def apply_calibration(df, calibration):
+    if df.empty or not calibration or 'device' not in df.columns:
+        return df
+    
+    df = df.copy()
+    df['temperature_raw'] = df['temperature']
+    corrected = df['temperature'].to_numpy(dtype=float, copy=True)
+    devices = df['device'].to_numpy()
+    for device, (features, coefficients) in calibration.items():
+        if not set(features).issubset(df.columns):
+            continue
+        mask = devices == device
+        if not mask.any():
+            continue
+        X = df.loc[mask, features].to_numpy(dtype=float)
+        values = coefficients[0] + X @ coefficients[1:]
+        usable = ~np.isnan(values)
+        corrected[np.flatnonzero(mask)[usable]] = values[usable]
+    df['temperature'] = corrected.round(2)
+    return df
+
+# Blank out Sense HAT values flagged as outliers. Rows the collector checked
+# keep its stored quality flag; the rest (older, imported or archived rows)
+# are flagged by the vectorized Hampel filter over the frame.
+@profiling.profiled("outliers.sensor")
+def exclude_outliers(df):
+    if df.empty:
+        return df
+    
+    stored = df['quality'].to_numpy(dtype=float) if 'quality' in df.columns else np.full(len(df), np.nan)
+    checked = ~np.isnan(stored)
+    flags = np.zeros(len(df), dtype=np.int16) if checked.all() else outliers.quality_flags(df)
+    flags[checked] = stored[checked].astype(np.int16)
+    if not flags.any():
+        return df
+    
+    df = df.copy()
+    for column, bit in outliers.QUALITY_BITS.items():
+        if column in df.columns:
+            df[column] = df[column].mask((flags & bit) != 0)
+    return df
+
+# Newest reading (a 1-row frame from load_latest_readings) with the columns
+# its quality flag marks replaced by the newest good value of `df`, a frame
+# already passed through exclude_outliers, so the current-value cards never
+# show a spike the charts hide
+def exclude_latest_outliers(latest, df):
+    if latest is None or latest.empty or 'quality' not in latest.columns or pd.isna(latest['quality'].iloc[0]):
+        return latest
+    flagged = outliers.flagged_columns(int(latest['quality'].iloc[0]))
+    if not flagged:
+        return latest
+    
+    latest = latest.copy()
+    for column in flagged:
+        good = df.dropna(subset=[column]) if column in df.columns else df.iloc[:0]
+        latest[column] = good[column].iloc[good['timestamp'].to_numpy().argmax()] if not good.empty else np.nan
+    return latest
+
+# Calculate statistics for sensor data. Current values come from `latest`
+# (a 1-row frame from load_latest_readings) when given, else the newest row.
+@profiling.profiled("stats.sensor")
+def calculate_stats(df, latest=None):
+    if df.empty:
+        return {}
+    
+    current = latest.iloc[0] if latest is not None and not latest.empty else df.iloc[0]
+    
+    stats = {
+        "temp_current": current['temperature'],
+        "temp_min": df['temperature'].min(),
+        "temp_max": df['temperature'].max(),
+        "temp_avg": df['temperature'].mean(),
+        
+        "humidity_current": current['humidity'],
+        "humidity_min": df['humidity'].min(),
+        "humidity_max": df['humidity'].max(),
+        "humidity_avg": df['humidity'].mean(),
+        
+        "pressure_current": current['pressure'],
+        "pressure_min": df['pressure'].min(),
+        "pressure_max": df['pressure'].max(),
+        "pressure_avg": df['pressure'].mean(),
+        
+        "reading_count": len(df),
+        "first_reading": df['timestamp'].min(),
+        "last_reading": df['timestamp'].max(),
+    }
+    return stats
+
+# Calculate statistics for weather API data (current values as in calculate_stats)
+@profiling.profiled("stats.weather")
+def calculate_weather_stats(df, latest=None):
+    if df.empty:
+        return {}
+    
+    current = latest.iloc[0] if latest is not None and not latest.empty else df.iloc[0]
+    
+    stats = {
+        "temp_current": current['temperature'],
+        "temp_min": df['temperature'].min(),
+        "temp_max": df['temperature'].max(),
+        "temp_avg": df['temperature'].mean(),
+        
+        "humidity_current": current['humidity'],
+        "humidity_min": df['humidity'].min(),
+        "humidity_max": df['humidity'].max(),
+        "humidity_avg": df['humidity'].mean(),
+        
+        "pressure_current": current['pressure'],
+        "pressure_min": df['pressure'].min(),
+        "pressure_max": df['pressure'].max(),
+        "pressure_avg": df['pressure'].mean(),
+        
+        "wind_speed_current": current['wind_speed'],
+        "wind_direction_current": current['wind_direction'],
+        "condition_current": current['condition'],
+        "location": current['location'],
+        
+        "reading_count": len(df),
+        "first_reading": df['timestamp'].min(),
+        "last_reading": df['timestamp'].max(),
+    }
+    
+    # Add AQI statistics if available
+    if 'aqi' in df.columns and not df['aqi'].isna().all():
+        stats["aqi_current"] = current.get('aqi') if not pd.isna(current.get('aqi')) else None
+        stats["aqi_min"] = df['aqi'].min() if not df['aqi'].isna().all() else None
+        stats["aqi_max"] = df['aqi'].max() if not df['aqi'].isna().all() else None
+        stats["aqi_avg"] = df['aqi'].mean() if not df['aqi'].isna().all() else None
+    
+    # Add US EPA AQI index if available
+    if 'us_epa_index' in df.columns and not df['us_epa_index'].isna().all():
+        stats["us_epa_index"] = current.get('us_epa_index') if not pd.isna(current.get('us_epa_index')) else None
+    
+    # Add individual pollutant data if available
+    for pollutant in ['pm2_5', 'pm10', 'o3', 'no2', 'so2', 'co']:
+        if pollutant in df.columns and not df[pollutant].isna().all():
+            stats[f"{pollutant}_current"] = current.get(pollutant) if not pd.isna(current.get(pollutant)) else None
+    
+    return stats
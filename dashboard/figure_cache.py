@@ -0,0 +1,107 @@
+import base64
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import profiling
+
+# Built figures shared by every session of this dashboard process, so an
+# auto-refresh that brings no new readings skips the pandas preparation and
+# Plotly construction entirely. Each entry is the figure's plotly JSON
+# (dict) plus the version of the frames it was drawn from: their row count,
+# newest timestamp and a checksum of their values, so rows rewritten in place
+# (a calibration refit, rescored AQI) count as a change. When only new rows
+# have arrived, they are appended to the cached traces (and rows that slid
+# out of a relative time range are dropped) instead of rebuilding the figure.
+MAX_FIGURES = 64
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+
+
+# Row count, newest timestamp and numeric-value checksum of a reading frame
+def frame_version(df):
+    if df.empty or 'timestamp' not in df.columns:
+        return (len(df), None, None)
+    checksum = int(pd.util.hash_pandas_object(df.select_dtypes("number"), index=False).sum())
+    return (len(df), df['timestamp'].max(), checksum)
+
+
+# Array values of a trace attribute; plotly JSON stores numeric arrays as
+# base64 typed arrays
+def _trace_values(value):
+    if isinstance(value, dict) and "bdata" in value:
+        return np.frombuffer(base64.b64decode(value["bdata"]), dtype=value["dtype"])
+    return np.asarray(value)
+
+
+# Extend a cached figure with the rows newer than it. `traces` gives, for
+# each trace, the (frame index, column) it plots against 'timestamp'.
+# Returns the new figure JSON, or None when the change is more than an
+# append (e.g. a backfilled, recalibrated or rescored row) and the figure
+# must be rebuilt.
+def _append(figure_json, old_version, frames, traces):
+    data = list(figure_json["data"])
+    if len(data) != len(traces):
+        return None
+    for i, (frame_index, column) in enumerate(traces):
+        df = frames[frame_index]
+        newest = old_version[frame_index][1]
+        if newest is None or df.empty or column not in df.columns:
+            return None
+        x = _trace_values(data[i]["x"]).astype("datetime64[us]")
+        y = _trace_values(data[i]["y"])
+        keep = x >= np.datetime64(df['timestamp'].min(), "us")
+        rows = df[['timestamp', column]].dropna().sort_values('timestamp')
+        old = rows[rows['timestamp'] <= newest]
+        added = rows[rows['timestamp'] > newest]
+        # The points already drawn must still be the frame's values
+        if not (np.array_equal(x[keep], old['timestamp'].to_numpy(dtype="datetime64[us]"))
+                and np.array_equal(y[keep].astype(float), old[column].to_numpy(dtype=float))):
+            return None
+        data[i] = dict(
+            data[i],
+            x=np.concatenate([x[keep], added['timestamp'].to_numpy(dtype="datetime64[us]")]),
+            y=np.concatenate([y[keep], added[column].to_numpy(dtype=float)]),
+        )
+    return dict(figure_json, data=data)
+
+
+# Return the figure for `key`, calling build() only when the frames changed
+# in a way an append cannot follow. `key` must identify everything else the
+# figure depends on (source, column, time range, calibration, ...).
+def cached_figure(key, frames, build, traces=()):
+    version = tuple(frame_version(df) for df in frames)
+    with _lock:
+        entry = _figures.get(key)
+        if entry is not None:
+            _figures.move_to_end(key)
+
+    with profiling.stage(f"figure_cache.{key[0]}") as stage:
+        figure_json = None
+        if entry is not None and entry[0] == version:
+            outcome = "hit"
+            figure_json = entry[1]
+        elif entry is not None and traces:
+            figure_json = _append(entry[1], entry[0], frames, traces)
+            outcome = "append"
+        if figure_json is None:
+            outcome = "miss"
+            figure_json = build().to_dict()
+        stage.set_rows(sum(len(df) for df in frames))
+
+    if outcome != "hit":
+        with _lock:
+            _figures[key] = (version, figure_json)
+            _figures.move_to_end(key)
+            while len(_figures) > MAX_FIGURES:
+                _figures.popitem(last=False)
+
+    profile = profiling.current()
+    if profile is not None:
+        profile.context.setdefault("figure_cache", {})[str(key)] = outcome
+    # The cached JSON is already valid, so skip plotly's validation pass
+    return go.Figure(figure_json, _validate=False)
@@ -0,0 +1,162 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Opt-in render profiling: DASHBOARD_PROFILE=1 times every stage of a rerun.
+# Each rerun is also written as one JSON line to DASHBOARD_PROFILE_LOG (or
+# stdout when unset) for offline analysis.
+ENABLED = os.environ.get("DASHBOARD_PROFILE", "").lower() in ("1", "true", "yes", "on")
+LOG_PATH = os.environ.get("DASHBOARD_PROFILE_LOG")
+
+# Streamlit runs each session's script in its own thread
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+# Approximate in-memory / on-the-wire size of a stage's output
+def payload_size(obj):
+    if obj is None:
+        return None
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, "to_plotly_json"):
+        # Plotly figures are shipped to the browser as JSON
+        return len(obj.to_json())
+    if isinstance(obj, (bytes, str)):
+        return len(obj)
+    return None
+
+
+# Handle yielded to a timed block so it can attach row counts and sizes
+class _Stage:
+    def __init__(self):
+        self.rows = None
+        self.payload = None
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+    def measure(self, obj):
+        # Sized after the stage's clock stops so serialization isn't counted
+        self.payload = obj
+        if self.rows is None and hasattr(obj, "__len__") and hasattr(obj, "columns"):
+            self.rows = len(obj)
+
+
+# Stand-in used when profiling is off so call sites need no branches
+class _NullStage:
+    def set_rows(self, rows):
+        pass
+
+    def measure(self, obj):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+# Timings collected during a single script run
+class RenderProfile:
+    def __init__(self):
+        self.timestamp = datetime.now()
+        self.context = {}
+        self.stages = []
+        self._started = time.perf_counter()
+        self.total_seconds = None
+
+    def add(self, name, seconds, rows=None, payload_bytes=None):
+        self.stages.append({
+            "stage": name,
+            "ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "payload_bytes": payload_bytes,
+        })
+
+    @contextmanager
+    def stage(self, name):
+        handle = _Stage()
+        started = time.perf_counter()
+        try:
+            yield handle
+        finally:
+            elapsed = time.perf_counter() - started
+            self.add(name, elapsed, handle.rows, payload_size(handle.payload))
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self._started
+
+    def to_dict(self):
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "context": self.context,
+            "total_ms": round((self.total_seconds or 0) * 1000, 3),
+            "stages": self.stages,
+        }
+
+
+# Begin profiling the current rerun; returns None when profiling is disabled
+def start_run():
+    profile = RenderProfile() if ENABLED else None
+    _local.profile = profile
+    return profile
+
+
+def current():
+    return getattr(_local, "profile", None)
+
+
+# Time a block of code if this rerun is being profiled
+@contextmanager
+def stage(name):
+    profile = current()
+    if profile is None:
+        yield _NULL_STAGE
+        return
+    with profile.stage(name) as handle:
+        yield handle
+
+
+# Decorator timing a function per call. Row counts come from DataFrame
+# arguments and the payload size from the return value. If label_arg is
+# given, that positional argument is appended to the stage name so e.g.
+# each chart built by the same function is reported separately.
+def profiled(name, label_arg=None):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = current()
+            if profile is None:
+                return func(*args, **kwargs)
+            stage_name = name
+            if label_arg is not None and len(args) > label_arg:
+                stage_name = f"{name}.{args[label_arg]}"
+            with profile.stage(stage_name) as handle:
+                frames = [arg for arg in args if hasattr(arg, "columns") and hasattr(arg, "__len__")]
+                if frames:
+                    handle.set_rows(sum(len(frame) for frame in frames))
+                result = func(*args, **kwargs)
+                handle.measure(result)
+            return result
+        return wrapper
+    return decorator
+
+
+# Close the current run and log it as a JSON line
+def finish_run():
+    profile = current()
+    if profile is None:
+        return None
+    profile.finish()
+    line = json.dumps(profile.to_dict(), default=str)
+    with _log_lock:
+        if LOG_PATH:
+            with open(LOG_PATH, "a") as f:
+                f.write(line + "\n")
+        else:
+            print(line, flush=True)
+    _local.profile = None
+    return profile
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+# Smoothing overlays (moving average or EWMA line, rolling min-max band) for
+# the chart series. Windows are in time rather than rows, since the Sense HAT
+# stores a reading every 30 s and the weather API every 5 minutes.
+#
+# Results are kept per dashboard process with the series they were computed
+# from. When a refresh only adds rows (and rows slide out of a relative time
+# range), just the new rows are computed, from a lookback of older rows that
+# covers their window, and the rows near the start whose window lost rows
+# are recomputed; everything else is reused.
+
+METHODS = ("None", "Moving average", "EWMA")
+# Window of the moving average and min-max band; half-life of the EWMA
+WINDOWS = {"5 min": 300, "15 min": 900, "1 hour": 3600, "6 hours": 6 * 3600}
+# Older rows an EWMA value still depends on, in half-lives; beyond 20 their
+# weight is below one millionth
+EWMA_LOOKBACK_HALFLIVES = 20
+MAX_SERIES = 128
+
+_results = OrderedDict()
+_lock = threading.Lock()
+
+
+# Compute one statistic over a whole (sorted) series
+def _compute(times, values, statistic, window):
+    series = pd.Series(values, index=pd.DatetimeIndex(times))
+    if statistic == "ewma":
+        return series.ewm(halflife=pd.Timedelta(seconds=window), times=series.index).mean().to_numpy()
+    rolling = series.rolling(pd.Timedelta(seconds=window))
+    return getattr(rolling, statistic)().to_numpy()
+
+
+def _lookback(statistic, window):
+    seconds = window * EWMA_LOOKBACK_HALFLIVES if statistic == "ewma" else window
+    return np.timedelta64(int(seconds), "s")
+
+
+# Bring a cached result up to date with (times, values), or return None when
+# the series changed in a way other than rows added at the end and dropped
+# from the start
+def _update(entry, times, values, statistic, window):
+    cached_times, cached_values, cached_result = entry
+    offset = int(np.searchsorted(cached_times, times[0]))
+    kept = len(cached_times) - offset
+    if kept == 0 or kept > len(times):
+        return None
+    if not (np.array_equal(cached_times[offset:], times[:kept])
+            and np.array_equal(cached_values[offset:], values[:kept])):
+        return None
+
+    lookback = _lookback(statistic, window)
+    result = np.empty(len(times))
+    result[:kept] = cached_result[offset:]
+    if kept < len(times):
+        start = int(np.searchsorted(times, times[kept] - lookback))
+        result[kept:] = _compute(times[start:], values[start:], statistic, window)[kept - start:]
+    if offset > 0:
+        head = min(int(np.searchsorted(times, times[0] + lookback)), kept)
+        result[:head] = _compute(times[:head], values[:head], statistic, window)
+    return result
+
+
+# One statistic ("mean", "ewma", "min" or "max") of df[column] over the time
+# window, for the non-missing rows in timestamp order, as (timestamps,
+# values) arrays. `key` identifies the series (source, time range,
+# calibration, ...).
+def rolling_statistic(key, df, column, statistic, window):
+    rows = df[['timestamp', column]].dropna().sort_values('timestamp')
+    times = rows['timestamp'].to_numpy(dtype="datetime64[ns]")
+    values = rows[column].to_numpy(dtype=float)
+    cache_key = (key, column, statistic, window)
+
+    with profiling.stage(f"smoothing.{statistic}.{column}") as stage:
+        stage.set_rows(len(values))
+        with _lock:
+            entry = _results.get(cache_key)
+        result = None
+        outcome = "miss"
+        if entry is not None and len(times):
+            result = _update(entry, times, values, statistic, window)
+            outcome = "update"
+        if result is None:
+            outcome = "miss"
+            result = _compute(times, values, statistic, window) if len(times) else np.empty(0)
+
+    with _lock:
+        _results[cache_key] = (times, values, result)
+        _results.move_to_end(cache_key)
+        while len(_results) > MAX_SERIES:
+            _results.popitem(last=False)
+
+    profile = profiling.current()
+    if profile is not None:
+        profile.context.setdefault("smoothing", {})[str(cache_key)] = outcome
+    return times, result
+
+
+# Overlay frame for a chart series: 'timestamp' plus 'smooth' (the moving
+# average or EWMA) and/or 'min' and 'max' (the band). Returns None when no
+# overlay is selected or the series is empty.
+def overlay(key, df, column, method, window, band):
+    if (method == "None" and not band) or df.empty or column not in df.columns or df[column].isna().all():
+        return None
+    columns = {}
+    if method != "None":
+        statistic = "ewma" if method == "EWMA" else "mean"
+        columns['timestamp'], columns['smooth'] = rolling_statistic(key, df, column, statistic, window)
+    if band:
+        columns['timestamp'], columns['min'] = rolling_statistic(key, df, column, "min", window)
+        columns['max'] = rolling_statistic(key, df, column, "max", window)[1]
+    return pd.DataFrame(columns)
@@ -0,0 +1,238 @@
+import argparse
+import html
+import logging
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+from plotly.offline import get_plotlyjs
+
+from charts import create_comparison_chart, create_time_series
+from data import (
+    calculate_stats, calculate_weather_stats, exclude_latest_outliers, exclude_outliers, load_latest_readings,
+    load_sensor_data, load_weather_data,
+)
+from figure_cache import frame_version
+
+logger = logging.getLogger("snapshot")
+
+# Kiosk mode: renders the standard dashboard views to static HTML pages on a
+# schedule, so wall-mounted screens are served a file by nginx instead of
+# each running app.py and its queries every 30 seconds. The pages reload
+# themselves; plotly.js is written once next to them and cached by the
+# browsers.
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "/snapshots")
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", "30"))
+
+# Page name -> time range of each view that can be rendered
+VIEWS = {
+    "last-hour": "Last hour",
+    "last-24-hours": "Last 24 hours",
+    "last-7-days": "Last 7 days",
+}
+DEFAULT_VIEWS = ["last-24-hours"]
+
+# Sense HAT / weather API series colours, as on the dashboard
+SENSOR_COLOR = "#FF4B4B"
+WEATHER_COLOR = "#1E88E5"
+
+# Charts are images on a screen nobody touches: no hover, zoom or toolbar
+CHART_CONFIG = {"staticPlot": True, "responsive": True}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta http-equiv="refresh" content="{refresh}">
+<title>Environmental Monitor - {time_range}</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{font-family: sans-serif; margin: 1rem 2rem; color: #262730}}
+h1 {{font-size: 2rem; margin-bottom: 0.2rem}}
+h2 {{font-size: 1.3rem; margin: 1.2rem 0 0.4rem}}
+.updated {{color: #808495}}
+.metrics {{display: grid; grid-template-columns: repeat(auto-fit, minmax(14rem, 1fr)); gap: 0.8rem}}
+.metric {{background-color: #f0f2f6; border-radius: 5px; padding: 0.8rem 1rem}}
+.metric .value {{font-size: 2rem}}
+.metric small {{color: #555}}
+.charts {{display: grid; grid-template-columns: repeat(auto-fit, minmax(36rem, 1fr)); gap: 0.8rem}}
+</style>
+</head>
+<body>
+<h1>Environmental Monitoring - {time_range}</h1>
+<div class="updated">Readings up to {newest} &middot; rendered {rendered}</div>
+{sections}
+</body>
+</html>
+"""
+
+
+# Write a file under a temporary name and rename it into place, so a
+# screen reloading mid-write never gets half a page
+def write_atomic(path, text):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def format_value(value, unit, digits=1):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "&ndash;"
+    return f"{value:.{digits}f} {unit}".strip()
+
+
+# One metric card: current value plus the range's min/max/avg
+def metric_card(label, stats, prefix, unit):
+    current = stats.get(f"{prefix}_current")
+    summary = " | ".join(
+        f"{name}: {format_value(stats.get(f'{prefix}_{key}'), unit)}"
+        for name, key in (("Min", "min"), ("Max", "max"), ("Avg", "avg"))
+    )
+    return (
+        f'<div class="metric"><div>{html.escape(label)}</div>'
+        f'<div class="value">{format_value(current, unit)}</div><small>{summary}</small></div>'
+    )
+
+
+def chart_html(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False, config=CHART_CONFIG)
+
+
+# Metric cards and charts of one view, like the dashboard's comparison mode
+def render_sections(sensor_data, weather_data, sensor_stats, weather_stats):
+    sections = []
+    cards = []
+    if sensor_stats:
+        cards += [
+            metric_card("Sense HAT Temperature", sensor_stats, "temp", "°C"),
+            metric_card("Sense HAT Humidity", sensor_stats, "humidity", "%"),
+            metric_card("Sense HAT Pressure", sensor_stats, "pressure", "hPa"),
+        ]
+    if weather_stats:
+        location = weather_stats.get("location")
+        cards += [
+            metric_card(f"Weather API Temperature ({location})", weather_stats, "temp", "°C"),
+            metric_card("Weather API Humidity", weather_stats, "humidity", "%"),
+            metric_card("Weather API Pressure", weather_stats, "pressure", "hPa"),
+        ]
+        if weather_stats.get("aqi_current") is not None:
+            cards.append(metric_card("Air Quality Index", weather_stats, "aqi", ""))
+    if cards:
+        sections.append(f'<h2>Current Readings</h2><div class="metrics">{"".join(cards)}</div>')
+
+    charts = []
+    for column, title, y_label in (
+        ("temperature", "Temperature", "Temperature (°C)"),
+        ("humidity", "Humidity", "Humidity (%)"),
+        ("pressure", "Pressure", "Pressure (hPa)"),
+    ):
+        if not sensor_data.empty and not weather_data.empty:
+            fig = create_comparison_chart(sensor_data, weather_data, column, f"{title} Comparison", y_label)
+        elif not sensor_data.empty:
+            fig = create_time_series(sensor_data, column, f"Sense HAT {title}", y_label, SENSOR_COLOR)
+        else:
+            fig = create_time_series(weather_data, column, f"Weather API {title}", y_label, WEATHER_COLOR)
+        charts.append(chart_html(fig))
+    if not weather_data.empty and 'aqi' in weather_data.columns and not weather_data['aqi'].isna().all():
+        charts.append(chart_html(
+            create_time_series(weather_data, 'aqi', 'Air Quality Index Over Time', 'AQI', '#FF5722')
+        ))
+    sections.append(f'<div class="charts">{"".join(charts)}</div>')
+    return "\n".join(sections)
+
+
+# Load one view's data and return (data version, page), or (version, None)
+# when nothing was loaded. The version is that of the frames, so an
+# unchanged view is not rendered again.
+def render_view(time_range, refresh):
+    sensor_data = exclude_outliers(load_sensor_data(time_range))
+    weather_data = load_weather_data(time_range)
+    version = (frame_version(sensor_data), frame_version(weather_data))
+    if sensor_data.empty and weather_data.empty:
+        return version, None
+
+    latest = load_latest_readings()
+    sensor_latest = exclude_latest_outliers(latest.get("sensor_readings"), sensor_data)
+    sensor_stats = calculate_stats(sensor_data, sensor_latest) if not sensor_data.empty else {}
+    weather_stats = (
+        calculate_weather_stats(weather_data, latest.get("weather_api_data")) if not weather_data.empty else {}
+    )
+    newest = max(df['timestamp'].max() for df in (sensor_data, weather_data) if not df.empty)
+    page = PAGE_TEMPLATE.format(
+        refresh=max(int(refresh), 5),
+        time_range=html.escape(time_range),
+        newest=f"{newest:%Y-%m-%d %H:%M:%S}",
+        rendered=f"{datetime.now():%Y-%m-%d %H:%M:%S}",
+        sections=render_sections(sensor_data, weather_data, sensor_stats, weather_stats),
+    )
+    return version, page
+
+
+# Links to the rendered views, for picking one when setting up a screen
+def index_page(names):
+    links = "".join(f'<li><a href="{name}.html">{html.escape(VIEWS[name])}</a></li>' for name in names)
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Environmental Monitor</title></head>'
+        f'<body style="font-family: sans-serif"><h1>Dashboard snapshots</h1><ul>{links}</ul></body></html>\n'
+    )
+
+
+# Render every view whose data changed since `versions` (updated in place)
+def render_all(output, names, refresh, versions):
+    for name in names:
+        started = time.perf_counter()
+        try:
+            version, page = render_view(VIEWS[name], refresh)
+        except Exception as e:
+            logger.error("Rendering %s failed: %s", name, e)
+            continue
+        if page is None:
+            logger.warning("No data for %s yet", name)
+            continue
+        if versions.get(name) == version:
+            continue
+        write_atomic(os.path.join(output, f"{name}.html"), page)
+        versions[name] = version
+        logger.info("Rendered %s.html in %.2fs (%d bytes)", name, time.perf_counter() - started, len(page))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render the standard dashboard views to static HTML pages for kiosk screens."
+    )
+    parser.add_argument("--view", choices=sorted(VIEWS), action="append",
+                        help=f"View to render, repeatable (default: {', '.join(DEFAULT_VIEWS)})")
+    parser.add_argument("--output", default=SNAPSHOT_DIR, help=f"Directory for the pages (default {SNAPSHOT_DIR})")
+    parser.add_argument("--interval", type=float, default=SNAPSHOT_INTERVAL,
+                        help=f"Seconds between renders and the pages' reload interval (default {SNAPSHOT_INTERVAL:g})")
+    parser.add_argument("--once", action="store_true", help="Render once and exit (e.g. from cron)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    names = args.view or DEFAULT_VIEWS
+
+    os.makedirs(args.output, exist_ok=True)
+    write_atomic(os.path.join(args.output, "plotly.min.js"), get_plotlyjs())
+    write_atomic(os.path.join(args.output, "index.html"), index_page(names))
+
+    versions = {}
+    try:
+        while True:
+            started = time.monotonic()
+            render_all(args.output, names, args.interval, versions)
+            if args.once:
+                return 0
+            time.sleep(max(args.interval - (time.monotonic() - started), 0))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,45 @@ CREATE TABLE IF NOT EXISTS sensor_readings (
     timestamp TIMESTAMP NOT NULL,
     temperature FLOAT NOT NULL,
     humidity FLOAT NOT NULL,
-    pressure FLOAT NOT NULL
+    pressure FLOAT NOT NULL,
+    device TEXT NOT NULL DEFAULT 'sensehat',
+    light_level FLOAT,
+    colour_red FLOAT,
+    colour_green FLOAT,
+    colour_blue FLOAT,
+    colour_clear FLOAT,
+    cpu_temperature FLOAT,
+    temperature_calibrated FLOAT,
+    quality SMALLINT
 );
 
+-- Add columns introduced after the initial schema (safe to re-run on existing databases)
+ALTER TABLE sensor_readings ADD COLUMN IF NOT EXISTS device TEXT NOT NULL DEFAULT 'sensehat';
+ALTER TABLE sensor_readings
+    ADD COLUMN IF NOT EXISTS light_level FLOAT,
+    ADD COLUMN IF NOT EXISTS colour_red FLOAT,
+    ADD COLUMN IF NOT EXISTS colour_green FLOAT,
+    ADD COLUMN IF NOT EXISTS colour_blue FLOAT,
+    ADD COLUMN IF NOT EXISTS colour_clear FLOAT;
+ALTER TABLE sensor_readings
+    ADD COLUMN IF NOT EXISTS cpu_temperature FLOAT,
+    ADD COLUMN IF NOT EXISTS temperature_calibrated FLOAT;
+-- Outlier flags from the collectors' Hampel filter (common/outliers.py): one
+-- bit per column (1 temperature, 2 humidity, 4 pressure), 0 when the reading
+-- passed, NULL when it was never checked
+ALTER TABLE sensor_readings ADD COLUMN IF NOT EXISTS quality SMALLINT;
+
 -- Create index on timestamp for faster queries
 CREATE INDEX IF NOT EXISTS idx_timestamp ON sensor_readings(timestamp);
 
+-- Imports and backfills skip rows whose (timestamp, device) already exists;
+-- this keeps that anti-join an index probe on large tables
+CREATE INDEX IF NOT EXISTS idx_sensor_readings_timestamp_device ON sensor_readings(timestamp, device);
+
+-- Flagged readings are rare, so a partial index finds them without scanning
+-- the table (e.g. to review or exclude them)
+CREATE INDEX IF NOT EXISTS idx_sensor_readings_flagged ON sensor_readings(timestamp) WHERE quality <> 0;
+
 -- Create table for weather API data
 CREATE TABLE IF NOT EXISTS weather_api_data (
     id SERIAL PRIMARY KEY,
@@ -34,3 +67,134 @@ CREATE TABLE IF NOT EXISTS weather_api_data (
 
 -- Create index on timestamp for weather API data
 CREATE INDEX IF NOT EXISTS idx_timestamp_weather ON weather_api_data(timestamp);
+
+-- Same dedupe probe for weather imports and backfills, on (timestamp, location)
+CREATE INDEX IF NOT EXISTS idx_weather_api_data_timestamp_location ON weather_api_data(timestamp, location);
+
+-- Running least-squares state for the Sense HAT temperature correction, one
+-- model per device. tools/calibrate.py folds newly paired readings (those
+-- after the watermark) into the sufficient statistics and re-solves.
+CREATE TABLE IF NOT EXISTS temperature_calibration (
+    device TEXT PRIMARY KEY,
+    features TEXT[] NOT NULL,
+    xtx DOUBLE PRECISION[] NOT NULL,  -- X'X, row-major, intercept first
+    xty DOUBLE PRECISION[] NOT NULL,  -- X'y
+    yty DOUBLE PRECISION NOT NULL,    -- y'y
+    n BIGINT NOT NULL,
+    coefficients DOUBLE PRECISION[],  -- intercept first, then one per feature
+    rmse DOUBLE PRECISION,
+    watermark TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Newest row per source and device, kept current by statement-level
+-- triggers so status views never scan the reading tables. heartbeat_at is
+-- the server time of the last insert that advanced the row; backfilled
+-- history (older than what is stored) leaves it alone.
+CREATE TABLE IF NOT EXISTS latest_readings (
+    source TEXT NOT NULL,  -- table name
+    device TEXT NOT NULL,  -- sensor device or weather location
+    timestamp TIMESTAMP NOT NULL,
+    reading JSONB NOT NULL,
+    heartbeat_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (source, device)
+);
+
+-- TG_ARGV[0] is the column identifying the device
+CREATE OR REPLACE FUNCTION update_latest_readings() RETURNS trigger AS $$
+BEGIN
+    EXECUTE format($sql$
+        INSERT INTO latest_readings AS l (source, device, timestamp, reading, heartbeat_at)
+        SELECT DISTINCT ON (n.%1$I) %2$L, n.%1$I, n.timestamp, to_jsonb(n), NOW()
+        FROM new_rows n
+        ORDER BY n.%1$I, n.timestamp DESC
+        ON CONFLICT (source, device) DO UPDATE
+        SET timestamp = EXCLUDED.timestamp, reading = EXCLUDED.reading, heartbeat_at = EXCLUDED.heartbeat_at
+        WHERE EXCLUDED.timestamp >= l.timestamp
+    $sql$, TG_ARGV[0], TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sensor_readings_latest ON sensor_readings;
+CREATE TRIGGER sensor_readings_latest
+    AFTER INSERT ON sensor_readings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_latest_readings('device');
+
+DROP TRIGGER IF EXISTS weather_api_data_latest ON weather_api_data;
+CREATE TRIGGER weather_api_data_latest
+    AFTER INSERT ON weather_api_data
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_latest_readings('location');
+
+-- Seed from existing data the first time (heartbeats start at the reading time)
+INSERT INTO latest_readings (source, device, timestamp, reading, heartbeat_at)
+SELECT DISTINCT ON (device) 'sensor_readings', device, timestamp, to_jsonb(s), timestamp
+FROM sensor_readings s
+WHERE NOT EXISTS (SELECT 1 FROM latest_readings WHERE source = 'sensor_readings')
+ORDER BY device, timestamp DESC
+ON CONFLICT DO NOTHING;
+
+INSERT INTO latest_readings (source, device, timestamp, reading, heartbeat_at)
+SELECT DISTINCT ON (location) 'weather_api_data', location, timestamp, to_jsonb(w), timestamp
+FROM weather_api_data w
+WHERE NOT EXISTS (SELECT 1 FROM latest_readings WHERE source = 'weather_api_data')
+ORDER BY location, timestamp DESC
+ON CONFLICT DO NOTHING;
+
+-- Readings per source, device and hour, counted by statement-level triggers
+-- as rows arrive, so uptime and gaps over months are read from a few
+-- thousand rows instead of scanning the reading tables. Deletes are not
+-- subtracted: days moved to the Parquet archive still count as collected.
+CREATE TABLE IF NOT EXISTS reading_coverage (
+    source TEXT NOT NULL,  -- table name
+    device TEXT NOT NULL,  -- sensor device or weather location
+    hour TIMESTAMP NOT NULL,
+    readings INTEGER NOT NULL,
+    PRIMARY KEY (source, device, hour)
+);
+
+-- TG_ARGV[0] is the column identifying the device
+CREATE OR REPLACE FUNCTION update_reading_coverage() RETURNS trigger AS $$
+BEGIN
+    EXECUTE format($sql$
+        INSERT INTO reading_coverage AS c (source, device, hour, readings)
+        SELECT %2$L, n.%1$I, date_trunc('hour', n.timestamp), COUNT(*)
+        FROM new_rows n
+        GROUP BY 2, 3
+        ORDER BY 2, 3
+        ON CONFLICT (source, device, hour) DO UPDATE
+        SET readings = c.readings + EXCLUDED.readings
+    $sql$, TG_ARGV[0], TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sensor_readings_coverage ON sensor_readings;
+CREATE TRIGGER sensor_readings_coverage
+    AFTER INSERT ON sensor_readings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_reading_coverage('device');
+
+DROP TRIGGER IF EXISTS weather_api_data_coverage ON weather_api_data;
+CREATE TRIGGER weather_api_data_coverage
+    AFTER INSERT ON weather_api_data
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION update_reading_coverage('location');
+
+-- Seed from existing data the first time (archived days are counted by
+-- tools/find_gaps.py --rebuild)
+INSERT INTO reading_coverage (source, device, hour, readings)
+SELECT 'sensor_readings', device, date_trunc('hour', timestamp), COUNT(*)
+FROM sensor_readings
+WHERE NOT EXISTS (SELECT 1 FROM reading_coverage WHERE source = 'sensor_readings')
+GROUP BY 2, 3
+ON CONFLICT DO NOTHING;
+
+INSERT INTO reading_coverage (source, device, hour, readings)
+SELECT 'weather_api_data', location, date_trunc('hour', timestamp), COUNT(*)
+FROM weather_api_data
+WHERE NOT EXISTS (SELECT 1 FROM reading_coverage WHERE source = 'weather_api_data')
+GROUP BY 2, 3
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger("sensor_collector.light")
+
+# Time for the LED matrix to switch fully off / on before reading
+LED_SETTLE_SECONDS = 0.2
+
+
+# Estimate ambient light using the LED matrix as a light source: the heat the
+# LEDs add to the humidity/temperature sensors is larger in a dark room.
+# Blocks for 2 x settle seconds and leaves the matrix cleared.
+def measure_light_level(sense, settle=LED_SETTLE_SECONDS):
+    # Turn off all LEDs first to ensure accurate reading
+    sense.clear()
+    time.sleep(settle)  # Brief pause to let LEDs turn off
+
+    # Get raw humidity and temperature readings
+    humidity_dark = sense.get_humidity()
+    temp_dark = sense.get_temperature()
+
+    # Turn on all LEDs at full brightness (white)
+    all_white = [(255, 255, 255)] * 64
+    sense.set_pixels(all_white)
+    time.sleep(settle)  # Wait for LEDs to reach full brightness
+
+    # Get readings with LEDs on
+    humidity_bright = sense.get_humidity()
+    temp_bright = sense.get_temperature()
+
+    # Calculate differences
+    humidity_diff = abs(humidity_bright - humidity_dark)
+    temp_diff = abs(temp_bright - temp_dark)
+
+    # Combine both sensors for more robust reading
+    combined_diff = (humidity_diff * 4 + temp_diff * 2)
+
+    # Map to inverse scale: higher diff = lower light level
+    if combined_diff < 0.05:
+        light_level = 100  # Very bright environment
+    elif combined_diff > 2.0:
+        light_level = 0   # Very dark environment
+    else:
+        # Map to a 0-100% scale with inverse relationship
+        light_level = max(0, min(100, 100 - (combined_diff * 50)))
+
+    # Return to neutral display
+    sense.clear()
+
+    return light_level, humidity_diff, temp_diff
+
+
+# Configure the Sense HAT v2 colour sensor, returning None when absent (v1 boards)
+def init_colour_sensor(sense, gain=60, integration_cycles=64):
+    try:
+        colour_sensor = sense.colour
+        colour_sensor.gain = gain
+        colour_sensor.integration_cycles = integration_cycles
+        return colour_sensor
+    except Exception as e:
+        logger.info("No colour sensor available: %s", e)
+        return None
+
+
+# The colour sensor integrates continuously, so reading it returns the last
+# completed integration without waiting
+def read_colour(colour_sensor):
+    if colour_sensor is None:
+        return None
+    red, green, blue, clear = colour_sensor.colour
+    return {"red": red, "green": green, "blue": blue, "clear": clear}
+
+
+# Samples light level and colour from a background thread, at most every
+# `interval` seconds, and caches the last result. The collection loop calls
+# trigger() right after its own reads, so the LED-lit window always falls
+# inside the loop's sleep and latest() never waits on LED settle time. Samples
+# are therefore taken at the slower of the interval and the loop's period.
+class LightSampler:
+    def __init__(self, sense, interval, sense_lock):
+        self.sense = sense
+        self.interval = interval
+        self.sense_lock = sense_lock
+        self._latest = None
+        self._latest_lock = threading.Lock()
+        self._trigger = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._colour_sensor = None
+        self._last_sample = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        with self.sense_lock:
+            self._colour_sensor = init_colour_sensor(self.sense)
+        self._thread = threading.Thread(target=self._run, name="light-sampler", daemon=True)
+        self._thread.start()
+        logger.info("Sampling light level every %ss", self.interval)
+
+    def stop(self):
+        self._stop.set()
+        self._trigger.set()
+
+    # Ask for a sample now if one is due
+    def trigger(self):
+        self._trigger.set()
+
+    # Oldest age at which a sample still belongs to the current reading, for a
+    # collection loop triggering every `loop_interval` seconds
+    def max_age(self, loop_interval):
+        return max(self.interval, loop_interval) * 2
+
+    # Last sample, or None if there is none or it is older than max_age seconds
+    def latest(self, max_age=None):
+        with self._latest_lock:
+            sample = self._latest
+        if sample is None:
+            return None
+        if max_age is not None and (datetime.now() - sample["timestamp"]).total_seconds() > max_age:
+            return None
+        return sample
+
+    def _due(self):
+        return self._last_sample is None or time.monotonic() - self._last_sample >= self.interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._trigger.wait()
+            self._trigger.clear()
+            if self._stop.is_set() or not self._due():
+                continue
+            try:
+                with self.sense_lock:
+                    # Colour first: its last integration (~154 ms at 64 cycles)
+                    # would otherwise fall in the white-LED window below
+                    colour = read_colour(self._colour_sensor)
+                    light_level, _, _ = measure_light_level(self.sense)
+            except Exception as e:
+                logger.error("Light sampling error: %s", e)
+                continue
+            self._last_sample = time.monotonic()
+            sample = {"timestamp": datetime.now(), "light_level": round(light_level, 1), "colour": colour}
+            with self._latest_lock:
+                self._latest = sample
@@ -2,6 +2,8 @@ from sense_hat import SenseHat
 import time
 from datetime import datetime
 
+from light_sensor import measure_light_level
+
 # Initialize the Sense HAT
 sense = SenseHat()
 sense.clear()  # Clear the LED matrix
@@ -10,44 +12,9 @@ print("Raspberry Pi Sense HAT RGB Color Test")
 print("======================================")
 
 # Function to read light levels using LED matrix as a light sensor
+# (shared with the collector's background light sampler)
 def get_light_level():
-    # Turn off all LEDs first to ensure accurate reading
-    sense.clear()
-    time.sleep(0.2)  # Brief pause to let LEDs turn off
-    
-    # Get raw humidity and temperature readings
-    humidity_dark = sense.get_humidity()
-    temp_dark = sense.get_temperature()
-    
-    # Turn on all LEDs at full brightness (white)
-    all_white = [(255, 255, 255)] * 64
-    sense.set_pixels(all_white)
-    time.sleep(0.2)  # Wait for LEDs to reach full brightness
-    
-    # Get readings with LEDs on
-    humidity_bright = sense.get_humidity()
-    temp_bright = sense.get_temperature()
-    
-    # Calculate differences 
-    humidity_diff = abs(humidity_bright - humidity_dark)
-    temp_diff = abs(temp_bright - temp_dark)
-    
-    # Combine both sensors for more robust reading
-    combined_diff = (humidity_diff * 4 + temp_diff * 2)
-    
-    # Map to inverse scale: higher diff = lower light level
-    if combined_diff < 0.05:
-        light_level = 100  # Very bright environment
-    elif combined_diff > 2.0:
-        light_level = 0   # Very dark environment
-    else:
-        # Map to a 0-100% scale with inverse relationship
-        light_level = max(0, min(100, 100 - (combined_diff * 50)))
-    
-    # Return to neutral display
-    sense.clear()
-    
-    return light_level, humidity_diff, temp_diff
+    return measure_light_level(sense)
 
 # Function to test RGB color detection using LED matrix
 def test_rgb_detection():
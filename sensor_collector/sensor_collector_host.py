@@ -1,10 +1,25 @@
+import logging
+import os
+import threading
 import time
-import psycopg2
 from datetime import datetime
-from sense_hat import SenseHat
 
-# Initialize Sense HAT
-sense = SenseHat()
+import alerts
+import collector_logging
+import metrics
+from db_writer import DbWriter
+import outliers
+from light_sensor import LightSampler
+from ring_buffer import RingBuffer
+
+logger = logging.getLogger("sensor_collector")
+
+# Sense HAT handle, initialized in main() so the database helpers can be
+# imported (e.g. by the benchmarks) on machines without the hardware
+sense = None
+
+# Serializes Sense HAT access between the main loop and the light sampler
+sense_lock = threading.Lock()
 
 # Database connection parameters - connect to the Docker container
 DB_HOST = "postgres"  
@@ -13,20 +28,53 @@ DB_NAME = "sensordata"
 DB_USER = "postgres"
 DB_PASSWORD = "postgres"
 
-# Connect to PostgreSQL
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
+# Port for the Prometheus-style /metrics endpoint (0 disables it)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9101"))
+
+# Seconds between readings
+SENSOR_INTERVAL = 30
+
+# Seconds between light-level/colour samples (0 disables them). Sampling
+# flashes the LED matrix, so it is opt-in.
+LIGHT_SAMPLE_INTERVAL = float(os.environ.get("LIGHT_SAMPLE_INTERVAL", "0"))
+
+# SoC temperature in millidegrees; its heat is what biases the Sense HAT readings
+CPU_TEMPERATURE_PATH = os.environ.get("CPU_TEMPERATURE_PATH", "/sys/class/thermal/thermal_zone0/temp")
+
+# Memory-mapped ring of recent readings the dashboard reads instead of
+# querying Postgres for short ranges (empty disables it). The default
+# capacity holds a little over 24 hours at one reading per 30 seconds.
+RING_BUFFER_PATH = os.environ.get("RING_BUFFER_PATH", "")
+RING_BUFFER_CAPACITY = int(os.environ.get("RING_BUFFER_CAPACITY", "3000"))
+
+# Outlier check on each reading (common/outliers.py): "flag" stores the
+# flagged columns in the quality column, "drop" also leaves readings with a
+# flagged column out, "off" skips the check
+OUTLIER_FILTER = os.environ.get("OUTLIER_FILTER", "flag").lower()
+
+# Collector metrics
+LOOP_SECONDS = metrics.histogram(
+    "sensor_collector_loop_seconds", "Time spent per collection iteration, excluding the sleep")
+SENSOR_READ_SECONDS = metrics.histogram(
+    "sensehat_read_seconds", "Latency of Sense HAT sensor reads", ["sensor"])
+DB_INSERT_SECONDS = metrics.histogram(
+    "db_insert_seconds", "Latency of database inserts including commit", ["table"])
+DB_INSERT_FAILURES = metrics.counter(
+    "db_insert_failures_total", "Failed database inserts", ["table"])
+DB_RECONNECTS = metrics.counter(
+    "db_reconnects_total", "Database reconnection attempts after a lost connection")
+READINGS_TOTAL = metrics.counter(
+    "sensor_readings_total", "Sensor readings taken")
+OUTLIERS_TOTAL = metrics.counter(
+    "sensor_outliers_total", "Readings flagged as outliers by the Hampel filter", ["column"])
+STARTUP_SECONDS = metrics.gauge(
+    "process_startup_seconds", "Seconds from process start to the end of each startup phase", ["phase"])
+
+# Keepalive-managed writer connection (common/db_writer.py); the table is
+# checked on every (re)connect
+def open_db_writer():
+    return DbWriter(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, "sensor_collector",
+                    on_connect=ensure_table_exists, reconnects=DB_RECONNECTS)
 
 # Check if database table exists, create if it doesn't
 def ensure_table_exists(conn):
@@ -38,84 +86,204 @@ def ensure_table_exists(conn):
                 timestamp TIMESTAMP NOT NULL,
                 temperature FLOAT NOT NULL,
                 humidity FLOAT NOT NULL,
-                pressure FLOAT NOT NULL
+                pressure FLOAT NOT NULL,
+                device TEXT NOT NULL DEFAULT 'sensehat'
             )
         """)
+        # Optional light/colour metrics added after the initial schema
+        cursor.execute("""
+            ALTER TABLE sensor_readings
+                ADD COLUMN IF NOT EXISTS light_level FLOAT,
+                ADD COLUMN IF NOT EXISTS colour_red FLOAT,
+                ADD COLUMN IF NOT EXISTS colour_green FLOAT,
+                ADD COLUMN IF NOT EXISTS colour_blue FLOAT,
+                ADD COLUMN IF NOT EXISTS colour_clear FLOAT,
+                ADD COLUMN IF NOT EXISTS cpu_temperature FLOAT,
+                ADD COLUMN IF NOT EXISTS temperature_calibrated FLOAT,
+                ADD COLUMN IF NOT EXISTS quality SMALLINT
+        """)
         conn.commit()
         cursor.close()
     except Exception as e:
-        print(f"Table creation error: {e}")
+        logger.error("Table creation error: %s", e)
 
-# Store sensor data in the database
-def store_sensor_data(conn, temperature, humidity, pressure, timestamp):
+# Read the Pi's CPU temperature in °C, or None where it is not exposed
+def read_cpu_temperature():
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO sensor_readings (timestamp, temperature, humidity, pressure) VALUES (%s, %s, %s, %s)",
-            (timestamp, temperature, humidity, pressure)
-        )
-        conn.commit()
-        cursor.close()
-        return True
+        with open(CPU_TEMPERATURE_PATH) as f:
+            return round(int(f.read().strip()) / 1000.0, 2)
+    except (OSError, ValueError):
+        return None
+
+# Read temperature, humidity and pressure, rounded to 2 decimal places for
+# better readability. Holds the Sense HAT lock so it never overlaps a light sample.
+def read_sensors():
+    with sense_lock:
+        with SENSOR_READ_SECONDS.labels(sensor="temperature").time():
+            temperature = sense.get_temperature()
+        with SENSOR_READ_SECONDS.labels(sensor="humidity").time():
+            humidity = sense.get_humidity()
+        with SENSOR_READ_SECONDS.labels(sensor="pressure").time():
+            pressure = sense.get_pressure()
+    READINGS_TOTAL.inc()
+    return round(temperature, 2), round(humidity, 2), round(pressure, 2)
+
+# Columns written per reading, in the order of sensor_row()
+SENSOR_COLUMNS = (
+    "timestamp", "temperature", "humidity", "pressure", "cpu_temperature",
+    "light_level", "colour_red", "colour_green", "colour_blue", "colour_clear", "quality",
+)
+
+# Build the sensor_readings row for one reading. `light` is the light
+# sampler's cached sample (light_level plus optional colour channels) or None.
+def sensor_row(temperature, humidity, pressure, timestamp, light=None, cpu_temperature=None, quality=None):
+    light_level = light["light_level"] if light else None
+    colour = (light or {}).get("colour") or {}
+    return (timestamp, temperature, humidity, pressure, cpu_temperature,
+            light_level, colour.get("red"), colour.get("green"), colour.get("blue"), colour.get("clear"),
+            quality)
+
+# Hampel filter over the readings as they are taken, or None when disabled
+def open_quality_filter():
+    if OUTLIER_FILTER == "off":
+        return None
+    return outliers.QualityFilter()
+
+# Quality flag of a reading (None when the filter is off), counting and
+# logging each flagged column
+def check_quality(quality_filter, temperature, humidity, pressure, timestamp):
+    if quality_filter is None:
+        return None
+    reading = {"temperature": temperature, "humidity": humidity, "pressure": pressure}
+    quality = quality_filter.check(reading)
+    flagged = outliers.flagged_columns(quality)
+    for column in flagged:
+        OUTLIERS_TOTAL.labels(column=column).inc()
+    if flagged:
+        logger.warning("outlier", extra={"timestamp": timestamp, "columns": flagged, **reading})
+    return quality
+
+# Whether a reading should be stored, given its quality flag
+def keep_reading(quality):
+    return not (quality and OUTLIER_FILTER == "drop")
+
+# Open the shared ring buffer, or None when it is disabled or unusable
+def open_ring_buffer():
+    if not RING_BUFFER_PATH:
+        return None
+    try:
+        return RingBuffer.create(RING_BUFFER_PATH, SENSOR_COLUMNS[1:], RING_BUFFER_CAPACITY)
     except Exception as e:
-        print(f"Data insertion error: {e}")
-        return False
+        logger.error("Ring buffer unavailable: %s", e)
+        return None
+
+# Store sensor data in the database through `writer` (a DbWriter)
+def store_sensor_data(writer, temperature, humidity, pressure, timestamp, light=None, cpu_temperature=None,
+                      quality=None):
+    with DB_INSERT_SECONDS.labels(table="sensor_readings").time():
+        success = writer.insert(
+            "sensor_readings", SENSOR_COLUMNS,
+            sensor_row(temperature, humidity, pressure, timestamp, light, cpu_temperature, quality)
+        )
+    if not success:
+        DB_INSERT_FAILURES.labels(table="sensor_readings").inc()
+    return success
 
 # Main function to collect and store data
 def main():
-    print("Starting sensor data collection...")
+    global sense
+    imports_seconds = collector_logging.process_uptime()
+    _, summary = collector_logging.setup_logging("sensor_collector")
+    logger.info("Starting sensor data collection...")
+    
+    # Initialize Sense HAT
+    from sense_hat import SenseHat
+    sense = SenseHat()
+    metrics.start_metrics_server(METRICS_PORT)
+    light_sampler = LightSampler(sense, LIGHT_SAMPLE_INTERVAL, sense_lock)
+    alert_engine = alerts.engine_from_env()
+    ring = open_ring_buffer()
+    quality_filter = open_quality_filter()
     
     # Wait for database to be ready
-    conn = None
-    while conn is None:
-        print("Attempting to connect to database...")
-        conn = get_db_connection()
-        if conn is None:
-            print("Database not available yet, waiting 5 seconds...")
-            time.sleep(5)
+    writer = open_db_writer()
+    logger.info("Attempting to connect to database...")
+    while not writer.connect():
+        logger.warning("Database not available yet, waiting 5 seconds...")
+        time.sleep(5)
     
-    print("Connected to database successfully")
-    ensure_table_exists(conn)
+    logger.info("Connected to database successfully")
+    light_sampler.start()
+    startup_pending = True
     
     # Main collection loop
     try:
         while True:
+            loop_started = time.perf_counter()
+
             # Get current time
             now = datetime.now()
             
             # Read sensor data
-            temperature = sense.get_temperature()
-            humidity = sense.get_humidity()
-            pressure = sense.get_pressure()
+            temperature, humidity, pressure = read_sensors()
+            cpu_temperature = read_cpu_temperature()
+            
+            # Let the light sampler flash the LEDs now, while this loop sleeps,
+            # and attach its cached sample if it is recent enough
+            light_sampler.trigger()
+            light = light_sampler.latest(max_age=light_sampler.max_age(SENSOR_INTERVAL))
+            summary.count("readings")
             
-            # Round values to 2 decimal places for better readability
-            temperature = round(temperature, 2)
-            humidity = round(humidity, 2)
-            pressure = round(pressure, 2)
+            # Flag spikes (I2C glitches, LED heat bursts) against the recent readings
+            quality = check_quality(quality_filter, temperature, humidity, pressure, now)
+            if quality:
+                summary.count("outliers")
             
-            # Print to console
-            print(f"Time: {now}")
-            print(f"Temperature: {temperature}°C")
-            print(f"Humidity: {humidity}%")
-            print(f"Pressure: {pressure} millibars")
-            print("-" * 40)
+            # Log a sample of the readings (rate-limited by READING_LOG_INTERVAL)
+            logger.info(
+                "reading",
+                extra={"rate_limit": "reading", "timestamp": now,
+                       "temperature": temperature, "humidity": humidity, "pressure": pressure,
+                       "cpu_temperature": cpu_temperature}
+            )
             
             # Store in database
-            success = store_sensor_data(conn, temperature, humidity, pressure, now)
+            success = True
+            if keep_reading(quality):
+                success = store_sensor_data(
+                    writer, temperature, humidity, pressure, now, light, cpu_temperature, quality
+                )
+            if success and startup_pending:
+                startup_pending = False
+                collector_logging.report_startup(logger, imports_seconds, STARTUP_SECONDS)
             if not success:
-                # Reconnect to database if connection was lost
-                conn = get_db_connection()
-                if conn is not None:
-                    ensure_table_exists(conn)
+                # The writer reconnects by itself; the reading is lost
+                summary.count("insert_failures")
             
+            # Publish the reading to the dashboard's ring buffer
+            if ring is not None and keep_reading(quality):
+                ring.append(
+                    now, sensor_row(temperature, humidity, pressure, now, light, cpu_temperature, quality)[1:]
+                )
+            
+            # Evaluate alert rules on the reading just taken, less its outliers
+            if alert_engine is not None:
+                alert_engine.observe("sensor_readings", now, outliers.clear_flagged({
+                    "temperature": temperature, "humidity": humidity, "pressure": pressure,
+                    "cpu_temperature": cpu_temperature,
+                    "light_level": light["light_level"] if light else None,
+                }, quality))
+            
+            LOOP_SECONDS.observe(time.perf_counter() - loop_started)
+
             # Wait before next reading (30 seconds)
-            time.sleep(30)
+            time.sleep(SENSOR_INTERVAL)
             
     except KeyboardInterrupt:
-        print("Data collection stopped by user")
+        logger.info("Data collection stopped by user")
     finally:
-        if conn:
-            conn.close()
+        light_sampler.stop()
+        writer.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,174 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import psycopg2
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Database configuration
+DB_HOST = os.environ.get("DB_HOST", "postgres")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+DB_NAME = os.environ.get("DB_NAME", "sensordata")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+
+# Cold storage layout: <ARCHIVE_DIR>/<table>/date=YYYY-MM-DD/part-<first id>-<last id>.parquet
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "/archive")
+# Readings older than this many days (whole days) are moved out of Postgres
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "90"))
+COMPRESSION = "zstd"
+
+TABLES = ("sensor_readings", "weather_api_data")
+
+# Arrow types for the Postgres column types (by type OID), so every file of a
+# table has the same schema even when a column is entirely NULL for a day
+ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    25: pa.string(),
+    700: pa.float32(),
+    701: pa.float64(),
+    1114: pa.timestamp("us"),
+}
+
+
+# Connect to PostgreSQL
+def get_db_connection():
+    try:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        return conn
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return None
+
+
+# Days before the cutoff that still have rows in the hot table
+def days_to_archive(cursor, table, cutoff):
+    cursor.execute(
+        f"SELECT DISTINCT date_trunc('day', timestamp)::date FROM {table} WHERE timestamp < %s ORDER BY 1",
+        (cutoff,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+# Write rows to a temporary file and rename it into place, so readers never
+# see a partial file. The name comes from the id range, so re-archiving the
+# same rows after an interrupted run replaces the file instead of
+# duplicating it.
+def write_partition(df, schema, table, day):
+    directory = os.path.join(ARCHIVE_DIR, table, f"date={day.isoformat()}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{df['id'].min()}-{df['id'].max()}.parquet")
+    tmp_path = path + ".tmp"
+    pq.write_table(
+        pa.Table.from_pandas(df, schema=schema, preserve_index=False), tmp_path, compression=COMPRESSION
+    )
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+# Move one day of a table to Parquet: the rows are deleted in the same
+# transaction that read them, after the file is safely on disk. If the
+# delete does not commit, the file is removed again so the rows are not in
+# both places.
+def archive_day(conn, table, day, dry_run):
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    cursor = conn.cursor()
+    path = None
+    try:
+        cursor.execute(
+            f"SELECT * FROM {table} WHERE timestamp >= %s AND timestamp < %s ORDER BY timestamp FOR UPDATE",
+            (start, end)
+        )
+        columns = [column.name for column in cursor.description]
+        schema = pa.schema([
+            (column.name, ARROW_TYPES.get(column.type_code, pa.string())) for column in cursor.description
+        ])
+        df = pd.DataFrame(cursor.fetchall(), columns=columns)
+        if df.empty or dry_run:
+            conn.rollback()
+            return len(df), None
+        path = write_partition(df, schema, table, day)
+        cursor.execute(
+            f"DELETE FROM {table} WHERE timestamp >= %s AND timestamp < %s AND id <= %s",
+            (start, end, int(df["id"].max()))
+        )
+        conn.commit()
+        return len(df), path
+    except Exception:
+        # A connection lost during COMMIT leaves its outcome unknown; keep
+        # the file then, since the rows may already be gone from Postgres
+        # (a rerun rewrites the same part file if they are not)
+        if path is not None and not conn.closed:
+            os.remove(path)
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Move old readings from Postgres into date-partitioned, zstd-compressed Parquet files."
+    )
+    parser.add_argument("--table", choices=TABLES, action="append", help="Table to archive (default: both)")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"Archive whole days older than this (default {ARCHIVE_AFTER_DAYS})")
+    parser.add_argument("--dry-run", action="store_true", help="List what would be archived")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cutoff = datetime.combine(
+        (datetime.now() - timedelta(days=args.older_than_days)).date(), datetime.min.time()
+    )
+
+    conn = get_db_connection()
+    if conn is None:
+        return 1
+
+    exit_code = 0
+    try:
+        for table in args.table or TABLES:
+            started = time.perf_counter()
+            cursor = conn.cursor()
+            days = days_to_archive(cursor, table, cutoff)
+            cursor.close()
+            conn.rollback()
+            print(f"{table}: {len(days)} days before {cutoff.date()} to archive")
+            moved = 0
+            for day in days:
+                try:
+                    rows, path = archive_day(conn, table, day, args.dry_run)
+                except Exception as e:
+                    print(f"  {day}: failed: {e}")
+                    exit_code = 1
+                    break
+                moved += rows
+                print(f"  {day}: {rows} rows" + (f" -> {path}" if path else ""))
+            elapsed = time.perf_counter() - started
+            print(f"  {moved} rows in {elapsed:.2f}s")
+    finally:
+        conn.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+import aqi
+
+# Database configuration
+DB_HOST = os.environ.get("DB_HOST", "postgres")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+DB_NAME = os.environ.get("DB_NAME", "sensordata")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+
+# Rows read, scored and written back per transaction
+DEFAULT_CHUNK_SIZE = 50000
+
+
+# Connect to PostgreSQL
+def get_db_connection():
+    try:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        return conn
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return None
+
+
+# Score one chunk of (id, pm2_5, ..., co) rows; returns ids and AQI values
+def score_chunk(rows):
+    table = np.array(rows, dtype=float)
+    ids = table[:, 0].astype(np.int64)
+    concentrations = {name: table[:, i + 1] for i, name in enumerate(aqi.POLLUTANTS)}
+    return ids, aqi.overall_aqi(concentrations)
+
+
+# Write the recomputed values back with one UPDATE ... FROM (VALUES ...) per
+# chunk; rows whose stored value is already right are left untouched
+def write_chunk(cursor, ids, values):
+    execute_values(
+        cursor,
+        """
+        UPDATE weather_api_data w SET aqi = v.aqi
+        FROM (VALUES %s) AS v(id, aqi)
+        WHERE w.id = v.id AND w.aqi IS DISTINCT FROM v.aqi
+        """,
+        [(int(i), None if np.isnan(v) else float(v)) for i, v in zip(ids, values)],
+        template="(%s, %s::float)",
+        page_size=len(ids),
+    )
+    return cursor.rowcount
+
+
+# Walk the table in id order, one committed chunk at a time, so an
+# interrupted backfill can resume with --start-id
+def backfill(conn, chunk_size, start_id, dry_run):
+    column_list = ", ".join(aqi.POLLUTANTS)
+    totals = {"read": 0, "updated": 0}
+    last_id = start_id
+    cursor = conn.cursor()
+    while True:
+        cursor.execute(
+            f"SELECT id, {column_list} FROM weather_api_data WHERE id > %s ORDER BY id LIMIT %s",
+            (last_id, chunk_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        ids, values = score_chunk(rows)
+        totals["read"] += len(ids)
+        if not dry_run:
+            totals["updated"] += write_chunk(cursor, ids, values)
+            conn.commit()
+        last_id = int(ids[-1])
+        print(f"  up to id {last_id}: read {totals['read']} | updated {totals['updated']}")
+    cursor.close()
+    return totals
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Recompute weather_api_data.aqi from the stored pollutant concentrations using EPA breakpoints."
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per transaction")
+    parser.add_argument("--start-id", type=int, default=0, help="Resume after this id")
+    parser.add_argument("--dry-run", action="store_true", help="Compute without writing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    conn = get_db_connection()
+    if conn is None:
+        return 1
+
+    started = time.perf_counter()
+    try:
+        totals = backfill(conn, args.chunk_size, args.start_id, args.dry_run)
+    except Exception as e:
+        conn.rollback()
+        print(f"AQI backfill failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+    rate = totals["read"] / elapsed if elapsed > 0 else 0.0
+    print(f"Read {totals['read']} rows, updated {totals['updated']} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+import psycopg2
+
+import aqi
+from import_readings import TABLES, copy_chunk, create_staging_table, merge_staging, validate_chunk
+
+# Database configuration
+DB_HOST = os.environ.get("DB_HOST", "postgres")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+DB_NAME = os.environ.get("DB_NAME", "sensordata")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+
+# WeatherAPI.com configuration; the base URL can point at a local stub
+API_KEY = os.environ.get("WEATHER_API_KEY", "your_api_key_here")
+CITY = os.environ.get("WEATHER_CITY", "Manhattan,New York,USA")
+BASE_URL = os.environ.get("WEATHER_API_BASE_URL", "http://api.weatherapi.com/v1")
+
+# Where finished (location, day) pairs are recorded so a rerun skips them
+DEFAULT_CHECKPOINT = "/import/backfill_weather.json"
+
+TABLE = "weather_api_data"
+SPEC = TABLES[TABLE]
+
+# Seconds before a history request is abandoned, retries of a failed one and
+# the first backoff between them (doubled per retry)
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 2
+
+# Loaded days are committed and checkpointed together in batches
+BATCH_DAYS = 30
+
+# WeatherAPI error codes after which no request can succeed: key missing or
+# invalid, monthly quota exceeded, key disabled or without history access
+FATAL_API_ERRORS = {1002, 2006, 2007, 2008, 2009}
+
+
+# Raised when the API or our request budget allows no further requests
+class QuotaExhausted(Exception):
+    pass
+
+
+# Shared rate limiter: `rate` requests per second on average with bursts of
+# up to `burst`, an optional total budget, and a pause every worker honours
+# after the API answers 429
+class TokenBucket:
+    def __init__(self, rate, burst, budget=None):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.remaining = budget
+        self.lock = threading.Lock()
+
+    # Wait for a token; raises QuotaExhausted once the budget is spent
+    def acquire(self):
+        while True:
+            with self.lock:
+                if self.remaining is not None and self.remaining <= 0:
+                    raise QuotaExhausted("request budget (--max-requests) spent")
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.resume_at - now
+                if wait <= 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    return
+                if wait <= 0:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    # Hold every worker back for `seconds`
+    def pause(self, seconds):
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+# Connect to PostgreSQL
+def get_db_connection():
+    try:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        return conn
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return None
+
+
+# Checkpoint as {location: {day: rows inserted}}; empty when the file is missing
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# Write the checkpoint to a temporary file and rename it into place, so an
+# interrupted run never leaves a truncated file behind
+def save_checkpoint(path, checkpoint):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(checkpoint, f, indent=1, sort_keys=True)
+    os.replace(temporary, path)
+
+
+# WeatherAPI's error code and message from a failed response body
+def api_error(error):
+    try:
+        body = json.loads(error.read().decode())["error"]
+        return body.get("code"), body.get("message")
+    except Exception:
+        return None, None
+
+
+# Fetch one history day for a location. Transient failures (timeouts, 5xx)
+# are retried with exponential backoff; a 429 pauses every worker for its
+# Retry-After. Raises QuotaExhausted when no request can succeed any more.
+def fetch_day(base_url, api_key, location, day, bucket, stop):
+    query = urllib.parse.urlencode({"key": api_key, "q": location, "dt": day.isoformat(), "aqi": "yes"})
+    url = f"{base_url.rstrip('/')}/history.json?{query}"
+    delay = BACKOFF_SECONDS
+    error = None
+    for _ in range(MAX_RETRIES + 1):
+        if stop.is_set():
+            return None
+        bucket.acquire()
+        try:
+            with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            code, message = api_error(e)
+            error = f"HTTP {e.code}" + (f" ({code}: {message})" if code else "")
+            if code in FATAL_API_ERRORS:
+                raise QuotaExhausted(error)
+            if e.code == 429:
+                retry_after = e.headers.get("Retry-After", "")
+                bucket.pause(float(retry_after) if retry_after.isdigit() else delay)
+            elif e.code < 500:
+                raise RuntimeError(error)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            error = str(e)
+        time.sleep(delay)
+        delay *= 2
+    raise RuntimeError(f"gave up after {MAX_RETRIES + 1} attempts: {error}")
+
+
+# weather_api_data rows in COPY column order for the hours of a history
+# payload, scored like the collector's weather_row(). Hours still in the
+# future (a backfill of today) are left out.
+def history_rows(data):
+    location = data["location"]["name"]
+    now = time.time()
+    rows = []
+    for forecast_day in data["forecast"]["forecastday"]:
+        for hour in forecast_day["hour"]:
+            if hour["time_epoch"] > now:
+                continue
+            air_quality = hour.get("air_quality") or {}
+            pollutants = {pollutant: air_quality.get(pollutant) for pollutant in aqi.POLLUTANTS}
+            rows.append((
+                # The tables store naive local time, like the collectors' datetime.now()
+                datetime.fromtimestamp(hour["time_epoch"]).isoformat(" "),
+                location,
+                hour["temp_c"],
+                hour["humidity"],
+                hour["pressure_mb"],
+                hour["condition"]["text"],
+                hour["wind_kph"],
+                hour["wind_dir"],
+                aqi.reading_aqi(pollutants) if air_quality else None,
+                *pollutants.values(),
+                air_quality.get("us-epa-index"),
+                air_quality.get("gb-defra-index"),
+            ))
+    return rows
+
+
+# Whether every hour of a history payload has passed, i.e. the day can be
+# recorded as finished. Judged by the hours' own timestamps, so a location
+# behind the host's time zone is not finished at the host's midnight.
+def day_complete(data):
+    now = time.time()
+    return all(
+        hour["time_epoch"] <= now for forecast_day in data["forecast"]["forecastday"] for hour in forecast_day["hour"]
+    )
+
+
+# Insert the staged rows whose hour has no stored reading for the location in
+# reading_coverage (which also counts archived days), so hourly history only
+# fills the holes and never lands between the collector's own readings
+def merge_gaps(cursor, staging):
+    column_list = ", ".join(name for name, _, _ in SPEC["columns"])
+    select_list = ", ".join(f"s.{name}" for name, _, _ in SPEC["columns"])
+    cursor.execute(
+        f"""
+        INSERT INTO {TABLE} ({column_list})
+        SELECT DISTINCT ON (s.timestamp, s.location) {select_list}
+        FROM {staging} s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM reading_coverage c
+            WHERE c.source = %s AND c.device = s.location AND c.hour = date_trunc('hour', s.timestamp)
+        )
+        ORDER BY s.timestamp, s.location
+        """,
+        (TABLE,)
+    )
+    inserted = cursor.rowcount
+    cursor.execute(f"TRUNCATE {staging}")
+    return inserted
+
+
+# COPY a batch of fetched days into the staging table and merge them in one
+# transaction. `days` is a list of (location, day, rows); returns the rows
+# inserted and rejected.
+def load_batch(conn, days, fill_covered):
+    rows = [row for _, _, day_rows in days for row in day_rows]
+    if not rows:
+        return 0, 0
+    columns = SPEC["columns"]
+    valid, rejected, _ = validate_chunk([list(column) for column in zip(*rows)], SPEC, None)
+    cursor = conn.cursor()
+    try:
+        staging = create_staging_table(cursor, TABLE, columns)
+        if valid:
+            copy_chunk(cursor, staging, columns, valid)
+        if fill_covered:
+            inserted = merge_staging(cursor, staging, TABLE, columns, SPEC["device_column"])
+        else:
+            inserted = merge_gaps(cursor, staging)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return inserted, len(rejected)
+
+
+def parse_date(value):
+    return date.fromisoformat(value)
+
+
+def parse_args(argv=None):
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(
+        description="Backfill weather_api_data with hourly records from the WeatherAPI history endpoint."
+    )
+    parser.add_argument("--start", type=parse_date, required=True, help="First day to fetch (YYYY-MM-DD)")
+    parser.add_argument("--end", type=parse_date, default=yesterday,
+                        help="Last day to fetch, inclusive (default: yesterday)")
+    parser.add_argument("--location", action="append",
+                        help="WeatherAPI location query, repeatable (default: WEATHER_CITY)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests (default 4)")
+    parser.add_argument("--rate", type=float, default=1.0, help="Average requests per second (default 1)")
+    parser.add_argument("--burst", type=int, default=4, help="Requests allowed back to back (default 4)")
+    parser.add_argument("--max-requests", type=int,
+                        help="Stop after this many API calls, retries included (e.g. the quota left this month)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT,
+                        help=f"File recording finished days for resuming (default {DEFAULT_CHECKPOINT})")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="API base URL, e.g. a local stub (default: WEATHER_API_BASE_URL or WeatherAPI.com)")
+    parser.add_argument("--fill-covered", action="store_true",
+                        help="Also insert hours that already have readings (only exact timestamps are skipped)")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the days that would be fetched")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.end < args.start:
+        print("--end is before --start")
+        return 1
+
+    locations = args.location or [CITY]
+    checkpoint = load_checkpoint(args.checkpoint)
+    days = [args.start + timedelta(days=i) for i in range((args.end - args.start).days + 1)]
+    pending = [
+        (location, day) for location in locations for day in days
+        if day.isoformat() not in checkpoint.get(location, {})
+    ]
+    print(f"{len(pending)} of {len(locations) * len(days)} location-days to fetch "
+          f"(~{len(pending) / args.rate / 60:.1f} min at {args.rate:g} requests/s)")
+    if args.dry_run or not pending:
+        return 0
+
+    conn = get_db_connection()
+    if conn is None:
+        return 1
+
+    bucket = TokenBucket(args.rate, args.burst, args.max_requests)
+    stop = threading.Event()
+    batch = []
+    totals = {"days": 0, "inserted": 0, "rejected": 0, "failed": 0}
+    exit_code = 0
+    started = time.perf_counter()
+
+    # Load the batch, then record its days as finished. A day with hours
+    # still to come (e.g. --end today) is loaded but not recorded, so a rerun
+    # fetches it again for the rest of its hours.
+    def flush():
+        inserted, rejected = load_batch(conn, [(location, day, rows) for location, day, rows, _ in batch],
+                                        args.fill_covered)
+        for location, day, rows, complete in batch:
+            if complete:
+                checkpoint.setdefault(location, {})[day.isoformat()] = len(rows)
+        save_checkpoint(args.checkpoint, checkpoint)
+        totals["days"] += len(batch)
+        totals["inserted"] += inserted
+        totals["rejected"] += rejected
+        batch.clear()
+        print(f"  {totals['days']}/{len(pending)} days loaded, {totals['inserted']} rows inserted")
+
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    futures = {
+        executor.submit(fetch_day, args.base_url, API_KEY, location, day, bucket, stop): (location, day)
+        for location, day in pending
+    }
+    try:
+        for future in as_completed(futures):
+            location, day = futures[future]
+            try:
+                data = future.result()
+            except QuotaExhausted as e:
+                if not stop.is_set():
+                    print(f"Stopping: {e}")
+                stop.set()
+                exit_code = 1
+                continue
+            except Exception as e:
+                print(f"{location} {day}: {e}")
+                totals["failed"] += 1
+                exit_code = 1
+                continue
+            if data is None:
+                continue
+            batch.append((location, day, history_rows(data), day_complete(data)))
+            if len(batch) >= BATCH_DAYS:
+                flush()
+    except KeyboardInterrupt:
+        print("Interrupted, saving progress...")
+        stop.set()
+        exit_code = 1
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        try:
+            if batch:
+                flush()
+        finally:
+            conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Loaded {totals['days']} days in {elapsed:.1f}s | inserted {totals['inserted']} | "
+        f"rejected {totals['rejected']} | failed days {totals['failed']}"
+    )
+    if exit_code:
+        print(f"Rerun the same command to resume; finished days are recorded in {args.checkpoint}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
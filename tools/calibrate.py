@@ -0,0 +1,289 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+# Database configuration
+DB_HOST = os.environ.get("DB_HOST", "postgres")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+DB_NAME = os.environ.get("DB_NAME", "sensordata")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+
+# sensor_readings columns the correction may use as regressors
+ALLOWED_FEATURES = ("temperature", "cpu_temperature", "humidity")
+DEFAULT_FEATURES = ["temperature", "cpu_temperature"]
+
+# Sensor rows fetched and paired per round trip
+DEFAULT_CHUNK_SIZE = 50000
+
+# Weather polls run every 5 minutes, so a sensor reading is never more than
+# 2.5 minutes from its nearest API reading unless a poll was missed
+DEFAULT_TOLERANCE_MINUTES = 5
+
+# Fewer pairs than this leave the coefficients unset
+DEFAULT_MIN_PAIRS = 100
+
+# Lower bound of the first incremental run
+EPOCH = datetime(1970, 1, 1)
+
+
+# Connect to PostgreSQL
+def get_db_connection():
+    try:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        return conn
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return None
+
+
+# Running sums of X'X, X'y and y'y for ordinary least squares. Chunks can be
+# folded in one at a time, so refitting never revisits old readings.
+class SufficientStats:
+    def __init__(self, features, xtx=None, xty=None, yty=0.0, n=0):
+        k = len(features) + 1
+        self.features = list(features)
+        self.xtx = np.zeros((k, k)) if xtx is None else np.asarray(xtx, dtype=float).reshape(k, k)
+        self.xty = np.zeros(k) if xty is None else np.asarray(xty, dtype=float)
+        self.yty = float(yty)
+        self.n = int(n)
+
+    def update(self, X, y):
+        X = np.column_stack([np.ones(len(X)), X])
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.yty += float(y @ y)
+        self.n += len(y)
+
+    # Solve the normal equations; returns (coefficients, rmse) or (None, None)
+    def solve(self, min_pairs):
+        if self.n < max(min_pairs, len(self.xty)):
+            return None, None
+        coefficients, _, rank, _ = np.linalg.lstsq(self.xtx, self.xty, rcond=None)
+        if rank < len(self.xty):
+            return None, None
+        sse = self.yty - 2 * coefficients @ self.xty + coefficients @ self.xtx @ coefficients
+        return coefficients, float(np.sqrt(max(sse, 0.0) / self.n))
+
+
+# Load the stored model state for a device, or None if it was never fitted
+def load_state(cursor, device):
+    cursor.execute(
+        "SELECT features, xtx, xty, yty, n, watermark FROM temperature_calibration WHERE device = %s",
+        (device,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None, EPOCH
+    features, xtx, xty, yty, n, watermark = row
+    return SufficientStats(features, xtx, xty, yty, n), watermark
+
+
+def save_state(cursor, device, stats, coefficients, rmse, watermark):
+    cursor.execute(
+        """
+        INSERT INTO temperature_calibration
+        (device, features, xtx, xty, yty, n, coefficients, rmse, watermark, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+        ON CONFLICT (device) DO UPDATE SET
+            features = EXCLUDED.features, xtx = EXCLUDED.xtx, xty = EXCLUDED.xty,
+            yty = EXCLUDED.yty, n = EXCLUDED.n, coefficients = EXCLUDED.coefficients,
+            rmse = EXCLUDED.rmse, watermark = EXCLUDED.watermark, updated_at = NOW()
+        """,
+        (
+            device, stats.features, stats.xtx.ravel().tolist(), stats.xty.tolist(), stats.yty, stats.n,
+            None if coefficients is None else coefficients.tolist(), rmse, watermark,
+        )
+    )
+
+
+def load_weather(conn, start, end, location):
+    query = "SELECT timestamp, temperature AS reference FROM weather_api_data WHERE timestamp BETWEEN %s AND %s"
+    params = [start, end]
+    if location:
+        query += " AND location = %s"
+        params.append(location)
+    cursor = conn.cursor()
+    cursor.execute(query + " ORDER BY timestamp", params)
+    weather = pd.DataFrame(cursor.fetchall(), columns=["timestamp", "reference"])
+    cursor.close()
+    weather["timestamp"] = pd.to_datetime(weather["timestamp"])
+    weather["reference"] = weather["reference"].astype(float)
+    return weather
+
+
+# Pair each sensor reading with the nearest weather API reading in time
+def pair_readings(sensor, weather, tolerance):
+    if sensor.empty or weather.empty:
+        return sensor.iloc[0:0].assign(reference=np.nan)
+    paired = pd.merge_asof(
+        sensor, weather, on="timestamp", direction="nearest", tolerance=tolerance
+    )
+    return paired.dropna(subset=["reference"])
+
+
+# Fold every sensor reading after the watermark that can already be paired
+# into the device's running sums. Readings newer than the last weather poll
+# wait for the next run, since a closer API reading may still arrive.
+def fit_device(conn, device, features, location, tolerance, chunk_size, min_pairs, reset):
+    cursor = conn.cursor()
+    stats, watermark = load_state(cursor, device)
+    if reset or stats is None:
+        stats, watermark = SufficientStats(features), EPOCH
+    elif stats.features != list(features):
+        raise ValueError(
+            f"{device} was fitted with features {stats.features}; pass --reset to refit with {list(features)}"
+        )
+
+    query = "SELECT MAX(timestamp) FROM weather_api_data"
+    params = []
+    if location:
+        query += " WHERE location = %s"
+        params.append(location)
+    cursor.execute(query, params)
+    upper = cursor.fetchone()[0]
+    cursor.close()
+    if upper is None or upper <= watermark:
+        return stats, stats.solve(min_pairs)[0], 0
+
+    # Server-side cursor so the first fit over years of history stays in bounded memory
+    column_list = ", ".join(features)
+    not_null = " AND ".join(f"{name} IS NOT NULL" for name in features)
+    rows = conn.cursor(name="calibration_rows")
+    rows.itersize = chunk_size
+    rows.execute(
+        f"""
+        SELECT timestamp, {column_list} FROM sensor_readings
+        WHERE device = %s AND timestamp > %s AND timestamp <= %s AND {not_null}
+          AND COALESCE(quality, 0) = 0  -- readings flagged as outliers would skew the fit
+        ORDER BY timestamp
+        """,
+        (device, watermark, upper)
+    )
+    added = 0
+    while True:
+        chunk = rows.fetchmany(chunk_size)
+        if not chunk:
+            break
+        sensor = pd.DataFrame(chunk, columns=["timestamp"] + list(features))
+        sensor["timestamp"] = pd.to_datetime(sensor["timestamp"])
+        weather = load_weather(
+            conn, sensor["timestamp"].iloc[0] - tolerance, sensor["timestamp"].iloc[-1] + tolerance, location
+        )
+        paired = pair_readings(sensor, weather, tolerance)
+        if not paired.empty:
+            stats.update(paired[list(features)].to_numpy(dtype=float), paired["reference"].to_numpy(dtype=float))
+            added += len(paired)
+    rows.close()
+
+    coefficients, rmse = stats.solve(min_pairs)
+    cursor = conn.cursor()
+    save_state(cursor, device, stats, coefficients, rmse, upper)
+    conn.commit()
+    cursor.close()
+    return stats, coefficients, added
+
+
+# Write the corrected temperature into sensor_readings.temperature_calibrated
+# with one set-based UPDATE, for consumers that read the table directly
+def apply_to_history(conn, device, features, coefficients, since):
+    terms = [repr(float(coefficients[0]))]
+    for name, coefficient in zip(features, coefficients[1:]):
+        terms.append(f"{float(coefficient)!r} * {name}")
+    not_null = " AND ".join(f"{name} IS NOT NULL" for name in features)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        UPDATE sensor_readings SET temperature_calibrated = {' + '.join(terms)}
+        WHERE device = %s AND timestamp > %s AND {not_null}
+        """,
+        (device, since or EPOCH)
+    )
+    updated = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    return updated
+
+
+def describe(features, coefficients):
+    terms = [f"{coefficients[0]:+.4f}"]
+    for name, coefficient in zip(features, coefficients[1:]):
+        terms.append(f"{coefficient:+.4f}*{name}")
+    return "temperature_calibrated = " + " ".join(terms)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Incrementally fit the Sense HAT temperature correction against the weather API."
+    )
+    parser.add_argument("--device", action="append", help="Device to calibrate (repeatable, default: sensehat)")
+    parser.add_argument("--features", nargs="+", choices=ALLOWED_FEATURES, default=DEFAULT_FEATURES,
+                        help="Regressors besides the intercept (default: temperature cpu_temperature)")
+    parser.add_argument("--location", help="Only pair with weather readings from this location")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE_MINUTES,
+                        help="Maximum minutes between paired sensor and API readings")
+    parser.add_argument("--min-pairs", type=int, default=DEFAULT_MIN_PAIRS,
+                        help="Pairs required before coefficients are published")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Sensor rows per fetch")
+    parser.add_argument("--reset", action="store_true",
+                        help="Discard the stored sums and refit from all history (e.g. after an import)")
+    parser.add_argument("--apply", action="store_true",
+                        help="Also write temperature_calibrated for historical rows")
+    parser.add_argument("--apply-since", type=datetime.fromisoformat,
+                        help="With --apply, only update rows newer than this timestamp")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    features = list(dict.fromkeys(args.features))
+    tolerance = pd.Timedelta(timedelta(minutes=args.tolerance))
+
+    conn = get_db_connection()
+    if conn is None:
+        return 1
+
+    exit_code = 0
+    try:
+        for device in args.device or ["sensehat"]:
+            started = time.perf_counter()
+            try:
+                stats, coefficients, added = fit_device(
+                    conn, device, features, args.location, tolerance, args.chunk_size, args.min_pairs, args.reset
+                )
+            except Exception as e:
+                conn.rollback()
+                print(f"Calibration of {device} failed: {e}")
+                exit_code = 1
+                continue
+            elapsed = time.perf_counter() - started
+            print(f"{device}: +{added} pairs ({stats.n} total) in {elapsed:.2f}s")
+            if coefficients is None:
+                if stats.n < args.min_pairs:
+                    print(f"  not enough pairs yet (need {args.min_pairs})")
+                else:
+                    print("  model is singular; try fewer --features")
+                continue
+            print(f"  {describe(stats.features, coefficients)}")
+            if args.apply:
+                updated = apply_to_history(conn, device, stats.features, coefficients, args.apply_since)
+                print(f"  updated {updated} historical rows")
+    finally:
+        conn.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+import psycopg2
+
+from coverage import EXPECTED_INTERVALS, GAP_THRESHOLD, find_gaps, hourly_coverage, uptime
+
+# Database configuration
+DB_HOST = os.environ.get("DB_HOST", "postgres")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+DB_NAME = os.environ.get("DB_NAME", "sensordata")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+
+# Parquet archive written by archive_readings.py
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "/archive")
+
+# Column identifying the device in each reading table
+DEVICE_COLUMNS = {
+    "sensor_readings": "device",
+    "weather_api_data": "location",
+}
+
+
+# Connect to PostgreSQL
+def get_db_connection():
+    try:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        return conn
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return None
+
+
+# Hourly counts of a table since `start` from the coverage index, as
+# {device: frame of (hour, readings)}
+def load_coverage(cursor, table, start):
+    cursor.execute(
+        "SELECT device, hour, readings FROM reading_coverage WHERE source = %s AND hour >= %s ORDER BY device, hour",
+        (table, start)
+    )
+    df = pd.DataFrame(cursor.fetchall(), columns=["device", "hour", "readings"])
+    return {device: rows.drop(columns="device") for device, rows in df.groupby("device")}
+
+
+# Hourly counts of archived readings since `start`, as a frame of (device,
+# hour, readings); empty when nothing is archived
+def archived_counts(table, start):
+    directory = os.path.join(ARCHIVE_DIR, table)
+    if not os.path.isdir(directory):
+        return pd.DataFrame(columns=["device", "hour", "readings"])
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(
+        directory,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive"),
+    )
+    df = dataset.to_table(
+        columns=["timestamp", DEVICE_COLUMNS[table]],
+        filter=(ds.field("date") >= pa.scalar(start.date(), pa.date32()))
+        & (ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us"))),
+    ).to_pandas()
+    df["hour"] = df["timestamp"].dt.floor("h")
+    return df.groupby([DEVICE_COLUMNS[table], "hour"]).size().reset_index(name="readings").rename(
+        columns={DEVICE_COLUMNS[table]: "device"}
+    )
+
+
+# Recount a table's coverage since `start` from its rows and its archive,
+# e.g. for history archived before the coverage index existed. Inserts into
+# the table wait while it runs so no reading is counted twice or missed.
+def rebuild_coverage(conn, table, start):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"LOCK TABLE {table} IN SHARE MODE")
+        cursor.execute("DELETE FROM reading_coverage WHERE source = %s AND hour >= %s", (table, start))
+        cursor.execute(
+            f"""
+            INSERT INTO reading_coverage (source, device, hour, readings)
+            SELECT %s, {DEVICE_COLUMNS[table]}, date_trunc('hour', timestamp), COUNT(*)
+            FROM {table}
+            WHERE timestamp >= %s
+            GROUP BY 2, 3
+            """,
+            (table, start)
+        )
+        hot_hours = cursor.rowcount
+        archived = archived_counts(table, start)
+        for device, hour, readings in archived.itertuples(index=False):
+            cursor.execute(
+                """
+                INSERT INTO reading_coverage AS c (source, device, hour, readings)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (source, device, hour) DO UPDATE SET readings = c.readings + EXCLUDED.readings
+                """,
+                (table, device, hour.to_pydatetime(), int(readings))
+            )
+        conn.commit()
+        return hot_hours, len(archived)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="List the hours each collector missed, from the reading_coverage index."
+    )
+    parser.add_argument("--table", choices=sorted(EXPECTED_INTERVALS), action="append",
+                        help="Table to check (default: both)")
+    parser.add_argument("--days", type=int, default=30, help="How far back to look (default 30)")
+    parser.add_argument("--threshold", type=float, default=GAP_THRESHOLD,
+                        help=f"Hours with at most this share of their readings are gaps (default {GAP_THRESHOLD})")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recount the range from the tables and the archive first")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    end = datetime.now()
+    start = (end - timedelta(days=args.days)).replace(minute=0, second=0, microsecond=0)
+
+    conn = get_db_connection()
+    if conn is None:
+        return 1
+
+    try:
+        for table in args.table or sorted(EXPECTED_INTERVALS):
+            if args.rebuild:
+                hot_hours, archived_hours = rebuild_coverage(conn, table, start)
+                print(f"{table}: recounted {hot_hours} hours from Postgres and {archived_hours} from the archive")
+            cursor = conn.cursor()
+            devices = load_coverage(cursor, table, start)
+            cursor.close()
+            conn.rollback()
+            if not devices:
+                print(f"{table}: no readings since {start}")
+            for device, counts in devices.items():
+                coverage = hourly_coverage(counts, start, end, EXPECTED_INTERVALS[table])
+                gaps = find_gaps(coverage, args.threshold)
+                print(f"{table} [{device}]: {uptime(coverage):.1%} uptime since {start}, {len(gaps)} gaps")
+                for gap in gaps.itertuples(index=False):
+                    print(f"  {gap.start} - {gap.end}  {gap.hours:4d} h  {gap.missing} readings missing")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+import argparse
+import csv
+import io
+import itertools
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+import psycopg2
+
+# Database configuration
+DB_HOST = os.environ.get("DB_HOST", "postgres")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+DB_NAME = os.environ.get("DB_NAME", "sensordata")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
+
+# Rows parsed, validated and sent to Postgres per COPY
+DEFAULT_CHUNK_SIZE = 50000
+
+# Importable tables: (column, type, required) in COPY order, plus the column
+# that identifies the source device so rows dedupe on (timestamp, device)
+# and the schema's default for it, used when neither the row nor --device
+# gives one
+TABLES = {
+    "sensor_readings": {
+        "device_column": "device",
+        "default_device": "sensehat",
+        "columns": [
+            ("timestamp", "timestamp", True),
+            ("device", "text", True),
+            ("temperature", "float", True),
+            ("humidity", "float", True),
+            ("pressure", "float", True),
+            ("cpu_temperature", "float", False),
+        ],
+    },
+    "weather_api_data": {
+        "device_column": "location",
+        "columns": [
+            ("timestamp", "timestamp", True),
+            ("location", "text", True),
+            ("temperature", "float", True),
+            ("humidity", "float", True),
+            ("pressure", "float", True),
+            ("condition", "text", True),
+            ("wind_speed", "float", True),
+            ("wind_direction", "text", True),
+            ("aqi", "float", False),
+            ("pm2_5", "float", False),
+            ("pm10", "float", False),
+            ("o3", "float", False),
+            ("no2", "float", False),
+            ("so2", "float", False),
+            ("co", "float", False),
+            ("us_epa_index", "int", False),
+            ("gb_defra_index", "int", False),
+        ],
+    },
+}
+
+
+# Connect to PostgreSQL
+def get_db_connection():
+    try:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        return conn
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return None
+
+
+# Value parsers: accept either CSV strings or typed Parquet values and return
+# what should be written to COPY. Valid strings pass through untouched so the
+# hot loop never re-formats numbers or timestamps.
+def parse_timestamp(value):
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        value = value.strip()
+        text = value[:-1] + "+00:00" if value.endswith("Z") else value
+        parsed = datetime.fromisoformat(text)
+        if parsed.tzinfo is None:
+            return value
+    # The tables store naive local time, like the collectors' datetime.now()
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat(" ")
+
+
+def parse_float(value):
+    if not math.isfinite(float(value)):
+        raise ValueError(f"non-finite value {value!r}")
+    return value
+
+
+def parse_int(value):
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"non-integer value {value!r}")
+    return int(number)
+
+
+def parse_text(value):
+    text = str(value).strip()
+    if not text:
+        return None
+    return text
+
+
+PARSERS = {
+    "timestamp": parse_timestamp,
+    "float": parse_float,
+    "int": parse_int,
+    "text": parse_text,
+}
+
+
+# Read CSV files in chunks so large files never sit in memory. Each chunk is
+# columnar: one sequence per table column (None when the file lacks it).
+def iter_csv_chunks(path, chunk_size, names):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader, [])]
+        positions = [header.index(name) if name in header else None for name in names]
+        width = len(header)
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                break
+            # Pad or trim malformed lines so they are reported as rejects
+            if len(set(map(len, rows))) > 1 or len(rows[0]) != width:
+                rows = [row if len(row) == width else (row + [""] * width)[:width] for row in rows]
+            transposed = list(zip(*rows))
+            missing = (None,) * len(rows)
+            yield [transposed[i] if i is not None else missing for i in positions]
+
+
+# Read Parquet row groups in batches (requires pyarrow)
+def iter_parquet_chunks(path, chunk_size, names):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet import requires pyarrow (pip install pyarrow)")
+
+    parquet_file = pq.ParquetFile(path)
+    available = [name for name in names if name in parquet_file.schema_arrow.names]
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=available):
+        columns = {}
+        for name, array in zip(batch.schema.names, batch.columns):
+            # Naive timestamps cast to ISO strings in C instead of building datetimes
+            if pa.types.is_timestamp(array.type) and array.type.tz is None:
+                array = array.cast(pa.string())
+            columns[name] = array.to_pylist()
+        missing = (None,) * batch.num_rows
+        yield [columns.get(name, missing) for name in names]
+
+
+# Validate a single value, returning what should be written to COPY
+def validate_value(raw, parse, required, default):
+    if raw is None or raw == "":
+        raw = default
+        if raw is None:
+            if required:
+                raise ValueError("missing required value")
+            return None
+    value = parse(raw)
+    if value is None and required:
+        raise ValueError("missing required value")
+    return value
+
+
+# Validate a whole column. Numbers and naive timestamps are checked with
+# map() over the column in one pass and passed through untouched; anything
+# else goes value by value. Raises on the first bad value.
+def validate_column(column, kind, required, default):
+    try:
+        if kind == "float" and None not in column and "" not in column:
+            if all(map(math.isfinite, map(float, column))):
+                return column
+        elif kind == "timestamp" and isinstance(column[0], str):
+            if not any(parsed.tzinfo for parsed in map(datetime.fromisoformat, column)):
+                return column
+    except (TypeError, ValueError):
+        pass
+    parse = PARSERS[kind]
+    return [validate_value(raw, parse, required, default) for raw in column]
+
+
+# Validate one columnar chunk and dedupe it on (timestamp, device). Returns
+# the valid rows, the rejected rows with a reason, and the duplicate count.
+def validate_chunk(columns, spec, default_device):
+    names = [name for name, _, _ in spec["columns"]]
+    device_index = names.index(spec["device_column"])
+    default_device = default_device or spec.get("default_device")
+    defaults = [default_device if name == spec["device_column"] else None for name in names]
+
+    rejected = []
+    try:
+        valid = list(zip(*(
+            validate_column(column, kind, required, default)
+            for column, (_, kind, required), default in zip(columns, spec["columns"], defaults)
+        )))
+    except (TypeError, ValueError):
+        # Slow path: find the offending rows one by one
+        valid = []
+        parsers = [(PARSERS[kind], required) for _, kind, required in spec["columns"]]
+        for row in zip(*columns):
+            try:
+                valid.append([
+                    validate_value(raw, parse, required, default)
+                    for raw, (parse, required), default in zip(row, parsers, defaults)
+                ])
+            except (TypeError, ValueError) as e:
+                rejected.append((row, str(e)))
+
+    keys = [(row[0], row[device_index]) for row in valid]
+    unique = dict.fromkeys(keys)
+    duplicates = len(keys) - len(unique)
+    if duplicates:
+        seen = set()
+        deduped = []
+        for key, row in zip(keys, valid):
+            if key not in seen:
+                seen.add(key)
+                deduped.append(row)
+        valid = deduped
+
+    return valid, rejected, duplicates
+
+
+# Create a session-local staging table shaped like the COPY column list
+def create_staging_table(cursor, table, columns):
+    staging = f"import_{table}"
+    column_list = ", ".join(name for name, _, _ in columns)
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging} AS SELECT {column_list} FROM {table} WITH NO DATA"
+    )
+    return staging
+
+
+# Stream a validated chunk into the staging table with COPY FROM STDIN
+def copy_chunk(cursor, staging, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+    column_list = ", ".join(name for name, _, _ in columns)
+    cursor.copy_expert(
+        f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+# Move staged rows into the live table, skipping (timestamp, device) pairs
+# that repeat across chunks or already exist
+def merge_staging(cursor, staging, table, columns, device_column):
+    column_list = ", ".join(name for name, _, _ in columns)
+    select_list = ", ".join(f"s.{name}" for name, _, _ in columns)
+    cursor.execute(f"ANALYZE {staging}")
+    cursor.execute(
+        f"""
+        INSERT INTO {table} ({column_list})
+        SELECT DISTINCT ON (s.timestamp, s.{device_column}) {select_list}
+        FROM {staging} s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {table} t
+            WHERE t.timestamp = s.timestamp AND t.{device_column} = s.{device_column}
+        )
+        ORDER BY s.timestamp, s.{device_column}
+        """
+    )
+    inserted = cursor.rowcount
+    cursor.execute(f"TRUNCATE {staging}")
+    return inserted
+
+
+# Import a single file inside one transaction
+def import_file(conn, path, table, file_format, chunk_size, default_device, reject_writer):
+    spec = TABLES[table]
+    columns = spec["columns"]
+    device_column = spec["device_column"]
+    names = [name for name, _, _ in columns]
+    reader = iter_parquet_chunks if file_format == "parquet" else iter_csv_chunks
+    chunks = reader(path, chunk_size, names)
+
+    totals = {"read": 0, "rejected": 0, "inserted": 0}
+    cursor = conn.cursor()
+    try:
+        staging = create_staging_table(cursor, table, columns)
+        for chunk in chunks:
+            valid, rejected, _ = validate_chunk(chunk, spec, default_device)
+            totals["read"] += len(chunk[0])
+            totals["rejected"] += len(rejected)
+            if reject_writer is not None:
+                for row, reason in rejected:
+                    reject_writer.writerow([path, reason] + list(row))
+            if valid:
+                copy_chunk(cursor, staging, columns, valid)
+        totals["inserted"] = merge_staging(cursor, staging, table, columns, device_column)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return totals
+
+
+def detect_format(path, requested):
+    if requested:
+        return requested
+    return "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Bulk-load historical readings from CSV or Parquet files via COPY."
+    )
+    parser.add_argument("table", choices=sorted(TABLES), help="Target table")
+    parser.add_argument("files", nargs="+", help="CSV or Parquet files to import")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Override format detection by extension")
+    parser.add_argument("--device",
+                        help="Device/location to use when a row has none (e.g. the offline node's name; "
+                             "sensor rows default to 'sensehat')")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per COPY chunk")
+    parser.add_argument("--reject-file", help="Write rejected rows and the reason to this CSV file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    conn = get_db_connection()
+    if conn is None:
+        return 1
+
+    reject_file = open(args.reject_file, "w", newline="") if args.reject_file else None
+    reject_writer = csv.writer(reject_file) if reject_file else None
+    exit_code = 0
+    try:
+        for path in args.files:
+            file_format = detect_format(path, args.format)
+            print(f"Importing {path} ({file_format}) into {args.table}...")
+            started = time.perf_counter()
+            try:
+                totals = import_file(
+                    conn, path, args.table, file_format, args.chunk_size, args.device, reject_writer
+                )
+            except Exception as e:
+                print(f"Import of {path} failed: {e}")
+                exit_code = 1
+                continue
+            elapsed = time.perf_counter() - started
+            rate = totals["read"] / elapsed if elapsed > 0 else 0.0
+            skipped = totals["read"] - totals["rejected"] - totals["inserted"]
+            print(
+                f"  read {totals['read']} | inserted {totals['inserted']} | "
+                f"rejected {totals['rejected']} | skipped {skipped} duplicate or existing"
+            )
+            print(f"  {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    finally:
+        if reject_file:
+            reject_file.close()
+        conn.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,21 @@
+import logging
 import os
 import time
-import requests
-import psycopg2
 from datetime import datetime
 
+import alerts
+import aqi as epa_aqi
+import collector_logging
+import metrics
+from db_writer import DbWriter
+
+logger = logging.getLogger("weather_collector")
+
 # WeatherAPI.com configuration
 API_KEY = os.environ.get("WEATHER_API_KEY", "your_api_key_here")
 CITY = os.environ.get("WEATHER_CITY", "Manhattan,New York,USA")
-BASE_URL = "http://api.weatherapi.com/v1/current.json"
+# Base URL of the API, e.g. a local stub when testing
+BASE_URL = os.environ.get("WEATHER_API_BASE_URL", "http://api.weatherapi.com/v1").rstrip("/") + "/current.json"
 
 # Database configuration
 DB_HOST = os.environ.get("DB_HOST", "postgres")
@@ -16,20 +24,30 @@ DB_NAME = os.environ.get("DB_NAME", "sensordata")
 DB_USER = os.environ.get("DB_USER", "postgres")
 DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
 
-# Connect to PostgreSQL
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
+# Port for the Prometheus-style /metrics endpoint (0 disables it)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9102"))
+
+# Collector metrics
+LOOP_SECONDS = metrics.histogram(
+    "weather_collector_loop_seconds", "Time spent per collection iteration, excluding the sleep")
+API_REQUEST_SECONDS = metrics.histogram(
+    "weather_api_request_seconds", "Latency of WeatherAPI.com requests")
+API_FAILURES = metrics.counter(
+    "weather_api_failures_total", "Failed WeatherAPI.com requests")
+DB_INSERT_SECONDS = metrics.histogram(
+    "db_insert_seconds", "Latency of database inserts including commit", ["table"])
+DB_INSERT_FAILURES = metrics.counter(
+    "db_insert_failures_total", "Failed database inserts", ["table"])
+DB_RECONNECTS = metrics.counter(
+    "db_reconnects_total", "Database reconnection attempts after a lost connection")
+STARTUP_SECONDS = metrics.gauge(
+    "process_startup_seconds", "Seconds from process start to the end of each startup phase", ["phase"])
+
+# Keepalive-managed writer connection (common/db_writer.py); the table is
+# checked on every (re)connect
+def open_db_writer():
+    return DbWriter(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, "weather_collector",
+                    on_connect=ensure_table_exists, reconnects=DB_RECONNECTS)
 
 # Ensure database table exists
 def ensure_table_exists(conn):
@@ -60,142 +78,181 @@ def ensure_table_exists(conn):
         conn.commit()
         cursor.close()
     except Exception as e:
-        print(f"Table creation error: {e}")
+        logger.error("Table creation error: %s", e)
 
 # Fetch weather data from API
 def fetch_weather_data():
+    # Imported on first use, outside the timed request: requests is the
+    # heaviest import of the collector
+    import requests
+
     try:
         params = {
             "key": API_KEY,
             "q": CITY,
             "aqi": "yes"  # Enable AQI data
         }
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()  # Raise exception for HTTP errors
-        return response.json()
+        with API_REQUEST_SECONDS.time():
+            response = requests.get(BASE_URL, params=params)
+            response.raise_for_status()  # Raise exception for HTTP errors
+            return response.json()
     except requests.exceptions.RequestException as e:
-        print(f"API request error: {e}")
+        API_FAILURES.inc()
+        logger.error("API request error: %s", e)
         return None
 
-# Store weather data in database
-def store_weather_data(conn, data):
-    try:
-        # Extract relevant data from API response
-        current = data["current"]
-        location = data["location"]["name"]
-        
-        timestamp = datetime.now()
-        temperature = current["temp_c"]
-        humidity = current["humidity"]
-        pressure = current["pressure_mb"]
-        condition = current["condition"]["text"]
-        wind_speed = current["wind_kph"]
-        wind_direction = current["wind_dir"]
-        
-        # Extract AQI data (if available)
-        aqi = None
-        pm2_5 = None
-        pm10 = None
-        o3 = None
-        no2 = None
-        so2 = None
-        co = None
-        us_epa_index = None
-        gb_defra_index = None
-        
-        if "air_quality" in current:
-            air_quality = current["air_quality"]
-            # Some fields might be None if not available
-            pm2_5 = air_quality.get("pm2_5")
-            pm10 = air_quality.get("pm10")
-            o3 = air_quality.get("o3")
-            no2 = air_quality.get("no2")
-            so2 = air_quality.get("so2")
-            co = air_quality.get("co")
-            us_epa_index = air_quality.get("us-epa-index")
-            gb_defra_index = air_quality.get("gb-defra-index")
-            
-            # Calculate an average AQI (simplified)
-            valid_values = [v for v in [pm2_5, pm10, o3, no2, so2, co] if v is not None]
-            if valid_values:
-                aqi = sum(valid_values) / len(valid_values)
+# Columns written per poll, in the order of weather_row()
+WEATHER_COLUMNS = (
+    "timestamp", "temperature", "humidity", "pressure", "condition", "wind_speed", "wind_direction", "location",
+    "aqi", "pm2_5", "pm10", "o3", "no2", "so2", "co", "us_epa_index", "gb_defra_index",
+)
+
+# Build the weather_api_data row for one API response
+def weather_row(data, timestamp=None):
+    # Extract relevant data from API response
+    current = data["current"]
+    location = data["location"]["name"]
+    
+    timestamp = timestamp or datetime.now()
+    temperature = current["temp_c"]
+    humidity = current["humidity"]
+    pressure = current["pressure_mb"]
+    condition = current["condition"]["text"]
+    wind_speed = current["wind_kph"]
+    wind_direction = current["wind_dir"]
+    
+    # Extract AQI data (if available)
+    aqi = None
+    pm2_5 = None
+    pm10 = None
+    o3 = None
+    no2 = None
+    so2 = None
+    co = None
+    us_epa_index = None
+    gb_defra_index = None
+    
+    if "air_quality" in current:
+        air_quality = current["air_quality"]
+        # Some fields might be None if not available
+        pm2_5 = air_quality.get("pm2_5")
+        pm10 = air_quality.get("pm10")
+        o3 = air_quality.get("o3")
+        no2 = air_quality.get("no2")
+        so2 = air_quality.get("so2")
+        co = air_quality.get("co")
+        us_epa_index = air_quality.get("us-epa-index")
+        gb_defra_index = air_quality.get("gb-defra-index")
         
-        # Insert data into database
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO weather_api_data 
-            (timestamp, temperature, humidity, pressure, condition, wind_speed, wind_direction, location,
-             aqi, pm2_5, pm10, o3, no2, so2, co, us_epa_index, gb_defra_index)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (timestamp, temperature, humidity, pressure, condition, wind_speed, wind_direction, location,
-             aqi, pm2_5, pm10, o3, no2, so2, co, us_epa_index, gb_defra_index)
+        # US EPA AQI: the highest of the per-pollutant indexes
+        aqi = epa_aqi.reading_aqi(
+            {"pm2_5": pm2_5, "pm10": pm10, "o3": o3, "no2": no2, "so2": so2, "co": co}
         )
-        conn.commit()
-        cursor.close()
-        return True
+    
+    return (timestamp, temperature, humidity, pressure, condition, wind_speed, wind_direction, location,
+            aqi, pm2_5, pm10, o3, no2, so2, co, us_epa_index, gb_defra_index)
+
+# Store weather data in database through `writer` (a DbWriter)
+def store_weather_data(writer, data):
+    try:
+        row = weather_row(data)
     except Exception as e:
-        print(f"Data insertion error: {e}")
+        DB_INSERT_FAILURES.labels(table="weather_api_data").inc()
+        logger.error("Data insertion error: %s", e)
         return False
+    
+    # Insert data into database
+    with DB_INSERT_SECONDS.labels(table="weather_api_data").time():
+        success = writer.insert("weather_api_data", WEATHER_COLUMNS, row)
+    if not success:
+        DB_INSERT_FAILURES.labels(table="weather_api_data").inc()
+    return success
 
 # Main function
 def main():
-    print("Starting weather data collection...")
+    imports_seconds = collector_logging.process_uptime()
+    _, summary = collector_logging.setup_logging("weather_collector")
+    logger.info("Starting weather data collection...")
+    metrics.start_metrics_server(METRICS_PORT)
+    alert_engine = alerts.engine_from_env()
     
     # Wait for database to be ready
-    conn = None
-    while conn is None:
-        print("Attempting to connect to database...")
-        conn = get_db_connection()
-        if conn is None:
-            print("Database not available yet, waiting 5 seconds...")
-            time.sleep(5)
+    writer = open_db_writer()
+    logger.info("Attempting to connect to database...")
+    while not writer.connect():
+        logger.warning("Database not available yet, waiting 5 seconds...")
+        time.sleep(5)
     
-    print("Connected to database successfully")
-    ensure_table_exists(conn)
+    logger.info("Connected to database successfully")
+    startup_pending = True
     
     # Main collection loop
     try:
         while True:
-            print(f"Fetching weather data for {CITY}...")
+            loop_started = time.perf_counter()
+            logger.debug("Fetching weather data for %s...", CITY)
             weather_data = fetch_weather_data()
             
             if weather_data:
-                print("Weather data received:")
-                print(f"Temperature: {weather_data['current']['temp_c']}°C")
-                print(f"Humidity: {weather_data['current']['humidity']}%")
-                print(f"Pressure: {weather_data['current']['pressure_mb']} mb")
-                print(f"Condition: {weather_data['current']['condition']['text']}")
+                summary.count("polls")
+                current = weather_data['current']
                 
-                if 'air_quality' in weather_data['current']:
-                    print("Air Quality Data:")
-                    aq = weather_data['current']['air_quality']
-                    for key, value in aq.items():
-                        if value is not None:
-                            print(f"  {key}: {value}")
+                # Log a sample of the readings as one structured line
+                # (rate-limited by READING_LOG_INTERVAL)
+                fields = {
+                    "rate_limit": "reading",
+                    "temperature": current['temp_c'],
+                    "humidity": current['humidity'],
+                    "pressure": current['pressure_mb'],
+                    "condition": current['condition']['text'],
+                }
+                if 'air_quality' in current:
+                    fields["air_quality"] = {
+                        key: value for key, value in current['air_quality'].items() if value is not None
+                    }
+                logger.info("reading", extra=fields)
                 
-                success = store_weather_data(conn, weather_data)
+                success = store_weather_data(writer, weather_data)
                 if success:
-                    print("Weather data stored successfully")
+                    logger.debug("Weather data stored successfully")
+                    if startup_pending:
+                        startup_pending = False
+                        collector_logging.report_startup(logger, imports_seconds, STARTUP_SECONDS)
                 else:
-                    print("Failed to store weather data")
-                    # Reconnect to database if needed
-                    conn = get_db_connection()
-                    if conn is not None:
-                        ensure_table_exists(conn)
+                    logger.warning("Failed to store weather data")
+                    summary.count("insert_failures")
+                
+                # Evaluate alert rules on the poll, using the table's column names
+                if alert_engine is not None:
+                    air_quality = current.get('air_quality', {})
+                    alert_engine.observe("weather_api_data", datetime.now(), {
+                        "temperature": current['temp_c'],
+                        "humidity": current['humidity'],
+                        "pressure": current['pressure_mb'],
+                        "wind_speed": current['wind_kph'],
+                        "pm2_5": air_quality.get('pm2_5'),
+                        "pm10": air_quality.get('pm10'),
+                        "o3": air_quality.get('o3'),
+                        "no2": air_quality.get('no2'),
+                        "so2": air_quality.get('so2'),
+                        "co": air_quality.get('co'),
+                        "us_epa_index": air_quality.get('us-epa-index'),
+                        "gb_defra_index": air_quality.get('gb-defra-index'),
+                    })
             else:
-                print("Failed to fetch weather data")
+                logger.warning("Failed to fetch weather data")
+                summary.count("fetch_failures")
             
+            LOOP_SECONDS.observe(time.perf_counter() - loop_started)
+
             # Wait before next API call (5 minutes to respect API limits)
-            print("Waiting 5 minutes before next update...")
+            logger.debug("Waiting 5 minutes before next update...")
             time.sleep(300)  # 5 minutes
             
     except KeyboardInterrupt:
-        print("Weather data collection stopped by user")
+        logger.info("Weather data collection stopped by user")
     finally:
-        if conn:
-            conn.close()
+        writer.close()
 
 if __name__ == "__main__":
     main()